@@ -1,19 +1,53 @@
 # admin_app.py - Aplicación Flask para administración y limpieza de datos
 
+import gzip
+import hashlib
+import io
+import multiprocessing
 import os
+import zipfile
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain
+from urllib.request import urlopen
 import pandas as pd
+import numpy as np
 from flask import Flask, request, jsonify, render_template_string, session, redirect, url_for
 from dotenv import load_dotenv
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Opcional: solo se necesita para cargar archivos Parquet
+    pq = None
+from psycopg2 import DataError
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 import logging
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import re
 from functools import wraps
 import secrets
 import time
 import uuid
 
+from app.services.rollup_service import refrescar_rollups, refrescar_cubo_mensual
+from app.services.cardinalidad_service import refrescar_sketches
+from app.services.stats_service import refrescar_estadisticas, leer_estadisticas
+from app.services.proveedor_service import refrescar_resumen_proveedores
+from app.services.institucion_service import refrescar_perfiles_instituciones
+from app.utils.columnar import construir_snapshot
+from app.utils.indices import (
+    INDICES_UNICOS, sql_indice, asegurar_columnas, indices_pendientes, construir_pendientes
+)
+from app.utils.manifiesto import (
+    sha256_archivo, reclamar_archivo, iniciar_carga, registrar_bloque, completar_carga, olvidar_anio
+)
+from app.utils.version_datos import incrementar_version
+from app.utils.trabajos import (
+    encolar_trabajo, obtener_trabajo, cancelar_trabajo, reportar_progreso, trabajo_activo
+)
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -45,8 +79,13 @@ logger.info(f"Conectando a la base de datos con usuario: {DATABASE_URL.split(':/
 Session = sessionmaker(bind=engine)
 
 
-def verificar_indices():
-    """Verifica y crea todos los índices necesarios para búsquedas y agregaciones"""
+def verificar_indices(usuario=None):
+    """
+    Verifica columnas e índices sin DDL bloqueante: agrega las columnas que
+    falten y, si hay índices faltantes o inválidos, encola un trabajo 'indices'
+    que los construye con CREATE INDEX CONCURRENTLY (a menos que ya haya uno).
+    Retorna la lista de índices pendientes.
+    """
 
     # Primero intentar crear la extensión unaccent (requiere permisos especiales)
     try:
@@ -63,91 +102,193 @@ def verificar_indices():
         except:
             pass
 
-    # Luego crear los índices (esto no requiere permisos especiales)
-    indices_sql = """
-    -- =============================================
-    -- AGREGAR COLUMNA created_at SI NO EXISTE
-    -- =============================================
-    ALTER TABLE contratos.contratos
-    ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
-
-    -- =============================================
-    -- ÍNDICES B-TREE PARA FILTROS Y ORDENAMIENTO
-    -- =============================================
-    CREATE INDEX IF NOT EXISTS idx_contratos_importe
-        ON contratos.contratos(importe DESC NULLS LAST);
-
-    CREATE INDEX IF NOT EXISTS idx_contratos_proveedor
-        ON contratos.contratos(proveedor_contratista);
-
-    CREATE INDEX IF NOT EXISTS idx_contratos_rfc
-        ON contratos.contratos(rfc);
-
-    CREATE INDEX IF NOT EXISTS idx_contratos_siglas_inst
-        ON contratos.contratos(siglas_institucion);
+    try:
+        asegurar_columnas(engine)
+        pendientes = indices_pendientes(engine)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron verificar columnas e índices: {e}")
+        return []
+
+    if not pendientes:
+        logger.info("✅ Todos los índices verificados")
+        return pendientes
+
+    nombres = ', '.join(p['nombre'] for p in pendientes)
+    trabajo_id = trabajo_activo(engine, 'indices')
+    if trabajo_id is None:
+        trabajo_id = encolar_trabajo(engine, 'indices', usuario=usuario)
+    logger.info(f"⚠️ Índices pendientes ({nombres}): se construyen en el trabajo {trabajo_id}")
+    return pendientes
+
+
+def anios_en_dataframe(df):
+    """Obtiene los años (anio_fuente) presentes en un DataFrame limpio"""
+    if 'anio_fuente' not in df.columns:
+        return []
+    anios = set()
+    for valor in df['anio_fuente'].dropna().unique():
+        try:
+            anios.add(int(valor))
+        except (ValueError, TypeError):
+            continue
+    return sorted(anios)
+
+
+# Resúmenes que se recalculan después de una carga: (nombre, refresco(session, anios) -> detalle).
+# Cada uno escribe sus propias tablas y corre con su sesión. Los perfiles se calculan
+# desde contratos.rollup_contratos, así que esperan a REFRESCO_ROLLUPS; el resto lee
+# contratos.contratos y corre en paralelo desde el inicio.
+REFRESCO_ROLLUPS = ('Rollups', lambda s, anios: f"{refrescar_rollups(s, anios=anios)} celdas")
+REFRESCOS_DE_ROLLUPS = (
+    ('Perfiles de proveedores', lambda s, anios: refrescar_resumen_proveedores(s, anios=anios)),
+    ('Perfiles de instituciones', lambda s, anios: refrescar_perfiles_instituciones(s, anios=anios))
+)
+REFRESCOS_RESUMENES = (
+    ('Cubo mensual', lambda s, anios: f"{refrescar_cubo_mensual(s, anios=anios)} celdas"),
+    ('Sketches HyperLogLog', lambda s, anios: f"{refrescar_sketches(s, anios=anios)} celdas"),
+    # CONCURRENTLY: /api/stats sigue leyendo la vista mientras se recalcula
+    ('Vista de estadísticas', lambda s, anios: refrescar_estadisticas(s))
+)
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_anio
-        ON contratos.contratos(anio_fuente);
+# Refrescos de resúmenes simultáneos (conexiones a la vez)
+RESUMENES_PARALELO = int(os.getenv('RESUMENES_PARALELO', 3))
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_tipo_contratacion
-        ON contratos.contratos(tipo_contratacion);
+# Tablas reescritas por los refrescos: se analizan al final para que el planner vea sus filas nuevas
+TABLAS_RESUMEN = (
+    'contratos.rollup_contratos', 'contratos.cubo_mensual', 'contratos.rollup_hll',
+    'contratos.resumen_proveedores', 'contratos.perfil_instituciones'
+)
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_tipo_procedimiento
-        ON contratos.contratos(tipo_procedimiento);
+# Consultas más comunes de la aplicación web: se corren una vez después de la carga
+# para que sus páginas ya estén en el caché de PostgreSQL en la primera petición
+CONSULTAS_CALENTAMIENTO = {
+    'estadisticas': "SELECT * FROM contratos.stats_summary",
+    'catalogo_filtros': """
+        SELECT siglas_institucion, institucion_nombre, SUM(num_contratos)
+        FROM contratos.rollup_contratos
+        WHERE siglas_institucion IS NOT NULL
+        GROUP BY siglas_institucion, institucion_nombre
+        ORDER BY 3 DESC LIMIT 100
+    """,
+    'anios': "SELECT DISTINCT anio_fuente FROM contratos.rollup_contratos",
+    'agregados_ultimo_anio': """
+        SELECT rfc_group_key, SUM(num_contratos), SUM(monto_total)
+        FROM contratos.rollup_contratos
+        WHERE anio_fuente = (SELECT MAX(anio_fuente) FROM contratos.rollup_contratos)
+        GROUP BY rfc_group_key
+        ORDER BY 3 DESC NULLS LAST LIMIT 100
+    """
+}
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_estatus
-        ON contratos.contratos(estatus_contrato);
+# URLs de la aplicación web que se piden al final (ej. http://127.0.0.1:8000/api/stats), separadas por coma
+CALENTAR_URLS = [u.strip() for u in os.getenv('CALENTAR_URLS', '').split(',') if u.strip()]
 
-    -- =============================================
-    -- ÍNDICES GIN PARA FULL TEXT SEARCH
-    -- =============================================
-    CREATE INDEX IF NOT EXISTS idx_contratos_titulo_gin
-        ON contratos.contratos USING gin(to_tsvector('spanish', COALESCE(titulo_contrato, '')));
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_titulo_exp_gin
-        ON contratos.contratos USING gin(to_tsvector('spanish', COALESCE(titulo_expediente, '')));
+def _refrescar_resumen(nombre, refresco, anios):
+    """Corre un refresco en su propia sesión y transacción; retorna True si terminó"""
+    db_session = Session()
+    try:
+        detalle = refresco(db_session, anios)
+        db_session.commit()
+        logger.info(f"✅ Refrescado: {nombre}{f' ({detalle})' if detalle is not None else ''}")
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo refrescar {nombre}: {e}")
+        db_session.rollback()
+        return False
+    finally:
+        db_session.close()
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_descripcion_gin
-        ON contratos.contratos USING gin(to_tsvector('spanish', COALESCE(descripcion_contrato, '')));
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_proveedor_gin
-        ON contratos.contratos USING gin(to_tsvector('spanish', COALESCE(proveedor_contratista, '')));
+def calentar_consultas():
+    """Corre CONSULTAS_CALENTAMIENTO y pide CALENTAR_URLS; retorna los segundos de cada una"""
+    tiempos = {}
+    with engine.connect() as conn:
+        for nombre, sql in CONSULTAS_CALENTAMIENTO.items():
+            inicio = time.time()
+            try:
+                conn.execute(text(sql)).fetchall()
+                tiempos[nombre] = round(time.time() - inicio, 3)
+            except Exception as e:
+                logger.warning(f"⚠️ Calentamiento {nombre}: {e}")
+            conn.rollback()
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_institucion_gin
-        ON contratos.contratos USING gin(to_tsvector('spanish', COALESCE(institucion, '')));
+    for url in CALENTAR_URLS:
+        inicio = time.time()
+        try:
+            with urlopen(url, timeout=30) as respuesta:
+                respuesta.read()
+            tiempos[url] = round(time.time() - inicio, 3)
+        except Exception as e:
+            logger.warning(f"⚠️ Calentamiento {url}: {e}")
+    return tiempos
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_siglas_inst_gin
-        ON contratos.contratos USING gin(to_tsvector('spanish', COALESCE(siglas_institucion, '')));
 
-    -- =============================================
-    -- ÍNDICES COMPUESTOS PARA AGREGACIONES (GROUP BY + SUM)
-    -- =============================================
-    CREATE INDEX IF NOT EXISTS idx_contratos_proveedor_importe
-        ON contratos.contratos(proveedor_contratista, rfc, importe);
+def actualizar_resumenes(anios=None):
+    """
+    Mantenimiento después de cada carga (anios = años afectados, None = todos):
+    1. ANALYZE de contratos.contratos (las estadísticas del planner quedan viejas
+       después de insertar o borrar muchas filas, y los refrescos las usan).
+    2. Rollups, cubo mensual, sketches y la vista de estadísticas, en paralelo
+       (RESUMENES_PARALELO); los perfiles, en cuanto terminan los rollups (si
+       fallan, los perfiles no se tocan). Luego el snapshot columnar si está activo.
+    3. ANALYZE de las tablas de resúmenes reescritas.
+    4. Sube la versión de los datos: los workers web descartan sus cachés.
+    5. Calienta las consultas más comunes (calentar_consultas).
+    Un paso que falla no detiene a los siguientes. Retorna True si todo terminó.
+    """
+    exito = True
+    inicio = time.time()
 
-    CREATE INDEX IF NOT EXISTS idx_contratos_institucion_importe
-        ON contratos.contratos(siglas_institucion, institucion, importe);
+    try:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("ANALYZE contratos.contratos"))
+        logger.info("✅ Estadísticas del planner de contratos actualizadas")
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo analizar contratos.contratos: {e}")
+        exito = False
+
+    with ThreadPoolExecutor(max_workers=max(1, RESUMENES_PARALELO)) as pool:
+        rollups = pool.submit(_refrescar_resumen, *REFRESCO_ROLLUPS, anios)
+        futuros = [pool.submit(_refrescar_resumen, *refresco, anios) for refresco in REFRESCOS_RESUMENES]
+        if rollups.result():
+            futuros += [pool.submit(_refrescar_resumen, *refresco, anios) for refresco in REFRESCOS_DE_ROLLUPS]
+        else:
+            logger.warning("⚠️ Perfiles no refrescados: dependen de los rollups")
+            exito = False
+        resultados = [futuro.result() for futuro in futuros]
+    exito = exito and all(resultados)
+    logger.info(f"Resúmenes actualizados en {time.time() - inicio:.1f}s (años: {anios or 'todos'})")
+
+    # Snapshot columnar (solo si la aplicación lo usa en este servidor)
+    if os.getenv('SNAPSHOT_ENABLED', 'false').lower() == 'true':
+        try:
+            with engine.connect() as conn:
+                filas = construir_snapshot(conn, os.getenv('SNAPSHOT_DIR', 'data/snapshot'))
+            logger.info(f"✅ Snapshot columnar publicado: {filas:,} contratos")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo construir el snapshot columnar: {e}")
+            exito = False
 
-    -- =============================================
-    -- ÍNDICE COMBINADO PARA BÚSQUEDA MULTI-COLUMNA
-    -- =============================================
-    CREATE INDEX IF NOT EXISTS idx_contratos_desc_titulo_fts
-        ON contratos.contratos USING gin(to_tsvector('spanish',
-            COALESCE(descripcion_contrato, '') || ' ' ||
-            COALESCE(titulo_contrato, '') || ' ' ||
-            COALESCE(titulo_expediente, '')));
-    """
+    try:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(f"ANALYZE {', '.join(TABLAS_RESUMEN)}"))
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron analizar las tablas de resúmenes: {e}")
+        exito = False
 
     try:
-        db_session = Session()
-        db_session.execute(text(indices_sql))
-        db_session.commit()
-        db_session.close()
-        logger.info("✅ Todos los índices verificados/creados")
-        return True
+        with engine.begin() as conn:
+            version = incrementar_version(conn, anios)
+        logger.info(f"✅ Versión de los datos: {version} (los workers web descartan sus cachés)")
     except Exception as e:
-        logger.warning(f"⚠️ No se pudieron crear índices: {e}")
-        return False
+        logger.warning(f"⚠️ No se pudo actualizar la versión de los datos: {e}")
+        exito = False
+
+    tiempos = calentar_consultas()
+    logger.info(f"Mantenimiento posterior a la carga en {time.time() - inicio:.1f}s; calentamiento: {tiempos}")
+
+    return exito
 
 
 # Decorador para requerir autenticación
@@ -438,20 +579,33 @@ ADMIN_TEMPLATE = """
         </div>
 
         <div class="section">
-            <h2>📤 Cargar Archivo CSV</h2>
+            <h2>📤 Cargar Archivo</h2>
             <div class="upload-area" onclick="document.getElementById('fileInput').click()">
-                <p>🔍 Haz clic o arrastra un archivo CSV aquí</p>
+                <p>🔍 Haz clic o arrastra un archivo CSV, CSV comprimido (.csv.gz, .zip) o Parquet aquí</p>
                 <p style="font-size: 0.9em; color: #999; margin-top: 10px;">Máximo 500MB | Soporta UTF-8, Latin-1, CP1252</p>
             </div>
-            <input type="file" id="fileInput" accept=".csv" onchange="handleFileSelect(event)">
+            <input type="file" id="fileInput" accept=".csv,.gz,.zip,.parquet" onchange="handleFileSelect(event)">
             <div class="selected-file" id="selectedFile"></div>
+            <label style="display: block; margin: 10px 0; color: #666;">
+                <input type="checkbox" id="forceReload"> Volver a cargar aunque el archivo ya se haya cargado
+            </label>
+            <label style="display: block; margin: 10px 0; color: #666;">
+                <input type="checkbox" id="updateExisting"> Actualizar contratos existentes que cambiaron (estatus, fechas, importes)
+            </label>
+            <label style="display: block; margin: 10px 0; color: #666;">
+                <input type="checkbox" id="profileOnly"> Solo analizar el archivo (no carga nada)
+            </label>
+            <label style="display: block; margin: 10px 0; color: #666;">
+                <input type="checkbox" id="replaceYear"> Reemplazar el año completo (el año del nombre del archivo)
+            </label>
 
             <div class="progress" id="progress">
                 <div class="progress-bar" id="progressBar">0%</div>
             </div>
 
             <button class="btn" id="uploadBtn" onclick="uploadFile()" disabled>Cargar y Limpiar Datos</button>
-            <button class="btn btn-danger" onclick="clearDuplicates()">Limpiar Duplicados</button>
+            <button class="btn btn-danger" id="cancelBtn" onclick="cancelJob()" style="display: none;">Cancelar Trabajo</button>
+            <button class="btn btn-danger" id="clearBtn" onclick="clearDuplicates()">Limpiar Duplicados</button>
 
             <div class="log" id="log"></div>
         </div>
@@ -499,6 +653,8 @@ ADMIN_TEMPLATE = """
             }
         }
 
+        let currentJobId = null;
+
         async function uploadFile() {
             if (!selectedFile) {
                 alert('Por favor selecciona un archivo primero');
@@ -507,6 +663,22 @@ ADMIN_TEMPLATE = """
 
             const formData = new FormData();
             formData.append('file', selectedFile);
+            const profileOnly = document.getElementById('profileOnly').checked;
+            if (profileOnly) {
+                formData.append('perfil', '1');
+            }
+            if (document.getElementById('forceReload').checked) {
+                formData.append('forzar', '1');
+            }
+            if (document.getElementById('updateExisting').checked) {
+                formData.append('actualizar', '1');
+            }
+            if (!profileOnly && document.getElementById('replaceYear').checked) {
+                if (!confirm('¿Reemplazar TODOS los contratos del año del archivo?')) {
+                    return;
+                }
+                formData.append('reemplazar_anio', '1');
+            }
 
             const uploadBtn = document.getElementById('uploadBtn');
             const progress = document.getElementById('progress');
@@ -515,15 +687,11 @@ ADMIN_TEMPLATE = """
             uploadBtn.disabled = true;
             progress.style.display = 'block';
             progressBar.style.width = '10%';
-            progressBar.textContent = '10%';
+            progressBar.textContent = profileOnly ? 'Analizando...' : 'Subiendo...';
 
-            addLog('Iniciando carga de archivo...', 'info');
-            addLog('Detectando encoding y validando estructura...', 'info');
+            addLog(profileOnly ? 'Analizando archivo (sin cargar)...' : 'Iniciando carga de archivo...', 'info');
 
             try {
-                progressBar.style.width = '30%';
-                progressBar.textContent = '30%';
-
                 const response = await fetch('/api/upload', {
                     method: 'POST',
                     body: formData
@@ -531,55 +699,185 @@ ADMIN_TEMPLATE = """
 
                 const data = await response.json();
 
-                if (response.ok) {
-                    progressBar.style.width = '100%';
-                    progressBar.textContent = '100%';
-
-                    addLog('✓ Proceso completado exitosamente', 'success');
-                    addLog(`→ Registros procesados: ${data.registros_procesados}`, 'info');
-                    addLog(`→ Registros insertados: ${data.registros_insertados}`, 'success');
-                    addLog(`→ Omitidos (duplicados): ${data.registros_duplicados}`, 'warning');
-                    addLog(`→ Con errores: ${data.registros_con_errores}`, 'error');
-
-                    if (data.advertencias && data.advertencias.length > 0) {
-                        addLog('\\nAdvertencias:', 'warning');
-                        data.advertencias.forEach(adv => addLog(`  • ${adv}`, 'warning'));
-                    }
-
-                    loadStats();
+                if (response.ok && data.perfil) {
+                    showProfile(data.perfil);
+                    finishJob();
+                } else if (response.ok) {
+                    addLog(`✓ Archivo recibido (trabajo #${data.trabajo_id}), procesando en segundo plano...`, 'success');
+                    startJob(data.trabajo_id);
                 } else {
                     addLog(`✗ Error: ${data.error}`, 'error');
                     if (data.detalles) {
                         addLog(`Detalles: ${data.detalles}`, 'error');
                     }
+                    finishJob();
                 }
             } catch (error) {
                 addLog(`✗ Error en la carga: ${error.message}`, 'error');
-            } finally {
-                uploadBtn.disabled = false;
-                setTimeout(() => {
-                    progress.style.display = 'none';
-                }, 3000);
+                finishJob();
+            }
+        }
+
+        function startJob(jobId) {
+            currentJobId = jobId;
+            document.getElementById('uploadBtn').disabled = true;
+            document.getElementById('clearBtn').disabled = true;
+            document.getElementById('cancelBtn').style.display = 'inline-block';
+            document.getElementById('progress').style.display = 'block';
+            pollJob(jobId);
+        }
+
+        function describeProgress(job) {
+            const p = job.progreso || {};
+            if (job.estado === 'pendiente') return 'En cola...';
+            if (job.tipo === 'limpieza_duplicados') {
+                if (p.duplicados_encontrados === undefined) return 'Buscando duplicados...';
+                return `${(p.registros_eliminados || 0).toLocaleString()} de ${p.duplicados_encontrados.toLocaleString()} eliminados`;
+            }
+            if (job.tipo === 'indices') {
+                if (!p.indice) return 'Revisando índices...';
+                return `${p.indice} (${p.numero} de ${p.total}): ${p.phase}`;
+            }
+            return `${(p.registros_leidos || 0).toLocaleString()} filas leídas`;
+        }
+
+        function showUploadResult(r) {
+            if (r.omitido) {
+                addLog('→ El archivo ya se había cargado completo: no se procesó de nuevo', 'warning');
+                return;
+            }
+            if (r.registros_eliminados !== undefined && !r.cancelado) {
+                addLog(`→ Año reemplazado: ${r.registros_eliminados || 0} registros anteriores`, 'warning');
+            }
+            if (r.reanudado_desde) {
+                addLog(`→ Carga reanudada después del bloque ${r.reanudado_desde} (los totales incluyen la carga anterior)`, 'info');
+            }
+            addLog(`→ Registros procesados: ${r.registros_procesados || 0}`, 'info');
+            addLog(`→ Registros insertados: ${r.registros_insertados || 0}`, 'success');
+            if (r.registros_actualizados || r.registros_sin_cambios) {
+                addLog(`→ Registros actualizados: ${r.registros_actualizados || 0}`, 'success');
+                addLog(`→ Sin cambios: ${r.registros_sin_cambios || 0}`, 'info');
+            }
+            addLog(`→ Omitidos (duplicados): ${r.registros_duplicados || 0}`, 'warning');
+            addLog(`→ Con errores: ${r.registros_con_errores || 0}`, 'error');
+
+            if (r.advertencias && r.advertencias.length > 0) {
+                addLog('Advertencias:', 'warning');
+                r.advertencias.forEach(adv => addLog(`  • ${adv}`, 'warning'));
+            }
+
+            if (r.indices_pendientes && r.indices_pendientes.length > 0) {
+                addLog(`Índices en construcción (en segundo plano): ${r.indices_pendientes.join(', ')}`, 'info');
+            }
+        }
+
+        function showProfile(p) {
+            const pct = x => `${(x * 100).toFixed(1)}%`;
+            addLog(`✓ Análisis en ${p.segundos}s de ${p.filas_leidas.toLocaleString()} filas${p.muestra ? ' (muestra: primeras filas del archivo)' : ''}`, 'success');
+            addLog(`→ Nuevos estimados: ${p.nuevos_estimados.toLocaleString()}`, 'success');
+            addLog(`→ Ya existentes en la base: ${p.duplicados_existentes.toLocaleString()} (códigos existentes: ${p.codigos_existentes.toLocaleString()})`, 'warning');
+            addLog(`→ Duplicados dentro del archivo: ${p.duplicados_en_archivo.toLocaleString()}`, 'warning');
+            addLog(`→ RFC: ${p.rfc.validos.toLocaleString()} válidos, ${p.rfc.no_estandar.toLocaleString()} no estándar, ${p.rfc.vacios.toLocaleString()} vacíos, ${p.rfc.intercambiados.toLocaleString()} intercambiados con el proveedor`, 'info');
+            if (p.rfc.ejemplos_no_estandar.length > 0) {
+                addLog(`  • Ej. no estándar: ${p.rfc.ejemplos_no_estandar.join(', ')}`, 'warning');
+            }
+            addLog(`→ Fechas no reconocidas: ${p.fechas_invalidas.toLocaleString()}`, p.fechas_invalidas ? 'warning' : 'info');
+            addLog(`→ Importes en $0: ${p.importes_cero.toLocaleString()}; códigos generados: ${p.codigos_generados.toLocaleString()}`, 'info');
+            addLog(`→ Por año: ${Object.entries(p.anios).map(([a, n]) => `${a}: ${n.toLocaleString()}`).join(', ') || 'sin datos'}`, 'info');
+            if (p.columnas_faltantes.length > 0) {
+                addLog(`→ Columnas faltantes: ${p.columnas_faltantes.join(', ')}`, 'error');
+            }
+            const conNulos = Object.entries(p.nulos).filter(([c, x]) => x > 0 && !p.columnas_faltantes.includes(c));
+            if (conNulos.length > 0) {
+                addLog(`→ Nulos: ${conNulos.map(([c, x]) => `${c} ${pct(x)}`).join(', ')}`, 'info');
+            }
+        }
+
+        function showDuplicatesResult(r) {
+            addLog(`  - Registros analizados: ${r.registros_totales || 0}`, 'info');
+            addLog(`  - Duplicados encontrados: ${r.duplicados_encontrados || 0}`, 'info');
+            addLog(`  - Duplicados eliminados: ${r.registros_eliminados || 0}`, 'success');
+            addLog(`  - Registros finales: ${r.registros_finales || 0}`, 'info');
+        }
+
+        async function pollJob(jobId) {
+            const progressBar = document.getElementById('progressBar');
+            try {
+                const response = await fetch(`/api/jobs/${jobId}`);
+                const job = await response.json();
+
+                if (!response.ok) {
+                    addLog(`✗ Error: ${job.error}`, 'error');
+                    finishJob();
+                    return;
+                }
+
+                progressBar.style.width = '100%';
+                progressBar.textContent = describeProgress(job);
+
+                if (job.estado === 'pendiente' || job.estado === 'en_proceso') {
+                    setTimeout(() => pollJob(jobId), 2000);
+                    return;
+                }
+
+                if (job.estado === 'completado') {
+                    addLog('✓ Proceso completado exitosamente', 'success');
+                } else if (job.estado === 'cancelado') {
+                    addLog('✗ Trabajo cancelado (lo ya procesado se conserva)', 'warning');
+                } else {
+                    addLog(`✗ Error: ${job.mensaje || 'Ver logs del servidor'}`, 'error');
+                }
+
+                const r = job.resultado || job.progreso || {};
+                if (job.tipo === 'limpieza_duplicados') {
+                    showDuplicatesResult(r);
+                } else {
+                    showUploadResult(r);
+                }
+
+                loadStats();
+                finishJob();
+            } catch (error) {
+                addLog(`✗ Error al consultar el progreso: ${error.message}`, 'error');
+                setTimeout(() => pollJob(jobId), 5000);
             }
         }
 
+        async function cancelJob() {
+            if (!currentJobId || !confirm('¿Cancelar el trabajo en curso? Lo ya procesado se conserva.')) {
+                return;
+            }
+            try {
+                const response = await fetch(`/api/jobs/${currentJobId}/cancel`, { method: 'POST' });
+                const data = await response.json();
+                addLog(response.ok ? 'Cancelación solicitada...' : `✗ Error: ${data.error}`, response.ok ? 'warning' : 'error');
+            } catch (error) {
+                addLog(`✗ Error al cancelar: ${error.message}`, 'error');
+            }
+        }
+
+        function finishJob() {
+            currentJobId = null;
+            document.getElementById('uploadBtn').disabled = !selectedFile;
+            document.getElementById('clearBtn').disabled = false;
+            document.getElementById('cancelBtn').style.display = 'none';
+            setTimeout(() => {
+                document.getElementById('progress').style.display = 'none';
+            }, 3000);
+        }
+
         async function clearDuplicates() {
             if (!confirm('¿Estás seguro de que quieres eliminar los registros duplicados? Se conservará solo una copia de cada contrato.')) {
                 return;
             }
 
             try {
-                addLog('Analizando y eliminando duplicados...', 'warning');
                 const response = await fetch('/api/clear', { method: 'POST' });
                 const data = await response.json();
 
                 if (response.ok) {
-                    addLog(`✓ Duplicados eliminados exitosamente`, 'success');
-                    addLog(`  - Registros analizados: ${data.registros_totales || 0}`, 'info');
-                    addLog(`  - Duplicados encontrados: ${data.duplicados_encontrados || 0}`, 'info');
-                    addLog(`  - Duplicados eliminados: ${data.registros_eliminados || 0}`, 'success');
-                    addLog(`  - Registros finales: ${data.registros_finales || 0}`, 'info');
-                    loadStats();
+                    addLog(`Limpieza de duplicados en cola (trabajo #${data.trabajo_id}), se elimina por lotes sin bloquear búsquedas...`, 'warning');
+                    startJob(data.trabajo_id);
                 } else {
                     addLog(`✗ Error: ${data.error}`, 'error');
                 }
@@ -675,6 +973,23 @@ class DataCleaner:
         'origen': 'anio_fuente',
     }
 
+    # Formatos de fecha en el orden en que se prueban, con el patrón de texto que los identifica
+    FORMATOS_FECHA = [
+        ('%d/%m/%Y', r'[0-9]{2}/[0-9]{2}/[0-9]{4}'),                                 # 01/09/2025
+        ('%Y-%m-%d', r'[0-9]{4}-[0-9]{2}-[0-9]{2}'),                                 # 2025-03-21
+        ('%d-%m-%Y', r'[0-9]{2}-[0-9]{2}-[0-9]{4}'),                                 # 21-03-2025
+        ('%Y/%m/%d', r'[0-9]{4}/[0-9]{2}/[0-9]{2}'),                                 # 2025/03/21
+        ('%Y-%m-%d %H:%M:%S', r'[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}'),  # 2025-03-21 00:00:00
+    ]
+
+    # Campos de negocio que forman la huella de contenido (anio_fuente no: es el año del archivo)
+    CAMPOS_HUELLA = [
+        'codigo_contrato', 'codigo_expediente', 'titulo_contrato', 'titulo_expediente',
+        'descripcion_contrato', 'tipo_contratacion', 'tipo_procedimiento', 'proveedor_contratista',
+        'rfc', 'institucion', 'siglas_institucion', 'importe', 'importe_contrato', 'moneda',
+        'fecha_inicio_contrato', 'fecha_fin_contrato', 'estatus_contrato', 'direccion_anuncio'
+    ]
+
     def __init__(self):
         self.advertencias = []
         self.stats = {
@@ -687,12 +1002,12 @@ class DataCleaner:
 
     @staticmethod
     def detectar_encoding(file_path):
-        """Detecta el encoding correcto del archivo CSV"""
+        """Detecta el encoding correcto del archivo CSV (también dentro de .csv.gz o .zip)"""
         encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252', 'iso-8859-1']
 
         for encoding in encodings:
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
+                with io.TextIOWrapper(abrir_archivo(file_path), encoding=encoding) as f:
                     f.read(1024)  # Leer primeros 1KB
                 logger.info(f"Encoding detectado: {encoding}")
                 return encoding
@@ -702,107 +1017,167 @@ class DataCleaner:
         logger.warning("No se pudo detectar encoding, usando utf-8 por defecto")
         return 'utf-8'
 
-    def detectar_rfc_proveedor_intercambiados(self, rfc, proveedor):
-        """Detecta si RFC y Proveedor están intercambiados y los corrige"""
-        if not rfc or not proveedor:
-            return rfc, proveedor
+    # --------------------------------------------
+    # Auxiliares vectorizados
+    # --------------------------------------------
 
-        rfc_str = str(rfc).strip()
-        prov_str = str(proveedor).strip()
+    @staticmethod
+    def _texto(serie):
+        """str(valor) de cada elemento (los NaN quedan como 'nan', igual que str())"""
+        return serie.astype(object).astype(str)
 
-        # Si el "RFC" es muy largo (>20 chars), probablemente es el proveedor
-        if len(rfc_str) > 20 and len(prov_str) <= 13:
-            logger.warning(f"RFC/Proveedor intercambiados detectado: RFC={rfc_str[:30]}, Prov={prov_str}")
-            self.stats['rfc_intercambiados'] += 1
-            self.advertencias.append(f"RFC/Proveedor intercambiados corregidos: {prov_str}")
-            return prov_str, rfc_str
+    @staticmethod
+    def _verdaderos(serie):
+        """bool(valor) de cada elemento (NaN cuenta como verdadero, igual que en Python)"""
+        return serie.to_numpy(dtype=object).astype(bool)
 
-        return rfc_str, prov_str
+    @classmethod
+    def _vacios(cls, serie):
+        """Máscara de `pd.isna(valor) or not valor` por elemento"""
+        vacios = serie.isna().to_numpy()
+        vacios[~vacios] = ~cls._verdaderos(serie[~vacios])
+        return vacios
 
-    def limpiar_texto(self, texto):
-        """Limpia y normaliza texto"""
-        if pd.isna(texto):
-            return None
-        texto = str(texto).strip()
+    @staticmethod
+    def _columna(serie, mascara, valores, relleno=None):
+        """Columna con `valores` en las filas de la máscara y `relleno` en el resto"""
+        dtype = object if relleno is None else np.float64
+        salida = np.full(len(serie), relleno, dtype=dtype)
+        salida[mascara] = valores
+        return pd.Series(salida, index=serie.index, dtype=dtype)
+
+    @staticmethod
+    def _sin_vacios(texto):
+        """Valores de una serie de texto con None en lugar de cadenas vacías"""
+        valores = texto.to_numpy(dtype=object)
+        valores[valores == ''] = None
+        return valores
+
+    @staticmethod
+    def _a_float(valor):
+        try:
+            return float(valor)
+        except ValueError:
+            return np.nan
+
+    # --------------------------------------------
+    # Limpieza por columna
+    # --------------------------------------------
+
+    def detectar_rfc_proveedor_intercambiados(self, df):
+        """Detecta filas con RFC y Proveedor intercambiados y los corrige en el DataFrame"""
+        revisar = self._verdaderos(df['rfc']) & self._verdaderos(df['proveedor_contratista'])
+        rfc = self._texto(df.loc[revisar, 'rfc']).str.strip()
+        proveedor = self._texto(df.loc[revisar, 'proveedor_contratista']).str.strip()
+
+        # Si el "RFC" es muy largo (>20 chars), probablemente es el proveedor
+        intercambiados = ((rfc.str.len() > 20) & (proveedor.str.len() <= 13)).to_numpy()
+
+        df['rfc'] = df['rfc'].astype(object)
+        df['proveedor_contratista'] = df['proveedor_contratista'].astype(object)
+        df.loc[revisar, 'rfc'] = np.where(intercambiados, proveedor, rfc)
+        df.loc[revisar, 'proveedor_contratista'] = np.where(intercambiados, rfc, proveedor)
+
+        total = int(intercambiados.sum())
+        if total:
+            logger.warning(f"RFC/Proveedor intercambiados detectados: {total}")
+            self.stats['rfc_intercambiados'] += total
+            self.advertencias.extend(
+                f"RFC/Proveedor intercambiados corregidos: {prov}" for prov in proveedor[intercambiados]
+            )
+        return df
+
+    def limpiar_texto(self, serie):
+        """Limpia y normaliza una columna de texto"""
+        validos = serie.notna().to_numpy()
+        texto = self._texto(serie[validos]).str.strip()
         # Eliminar espacios múltiples
-        texto = re.sub(r'\s+', ' ', texto)
+        texto = texto.str.replace(r'\s+', ' ', regex=True)
         # Limpiar puntuación excesiva
-        texto = re.sub(r'\.{3,}', '...', texto)
-        return texto if texto else None
+        texto = texto.str.replace(r'\.{3,}', '...', regex=True)
+        return self._columna(serie, validos, self._sin_vacios(texto))
 
-    def limpiar_rfc(self, rfc):
-        """Limpia y valida RFC (permite NULL)"""
-        if pd.isna(rfc) or not rfc:
-            self.stats['rfc_vacios'] += 1
-            return None
+    def limpiar_rfc(self, serie):
+        """Limpia y valida una columna de RFC (permite NULL)"""
+        vacios = self._vacios(serie)
+        self.stats['rfc_vacios'] += int(vacios.sum())
 
-        rfc = str(rfc).strip().upper()
+        rfc = self._texto(serie[~vacios]).str.strip().str.upper()
         # Remover caracteres especiales
-        rfc = re.sub(r'[^A-Z0-9]', '', rfc)
+        rfc = rfc.str.replace(r'[^A-Z0-9]', '', regex=True)
 
-        # Validar longitud (12-13 caracteres)
-        if len(rfc) >= 12 and len(rfc) <= 13:
-            return rfc
+        # Validar longitud (12-13 caracteres); si no cumple, advertir pero permitir
+        no_estandar = rfc[(rfc != '') & ~rfc.str.len().between(12, 13)]
+        if len(no_estandar):
+            logger.warning(f"{len(no_estandar)} RFC con formato no estándar (ej. {', '.join(no_estandar.head(5))})")
 
-        # Si no cumple, advertir pero permitir
-        if rfc:
-            logger.warning(f"RFC con formato no estándar: {rfc}")
-            return rfc
+        return self._columna(serie, ~vacios, self._sin_vacios(rfc))
 
-        return None
+    def limpiar_importe(self, serie):
+        """Convierte una columna de importes a número (permite cero)"""
+        validos = serie.notna().to_numpy()
+        # Eliminar comas, espacios y símbolo de moneda
+        texto = self._texto(serie[validos]).str.replace(',', '', regex=False).str.replace(' ', '', regex=False)
+        texto = texto.str.strip().str.replace(r'[$€£¥]', '', regex=True)
 
-    def limpiar_importe(self, importe_str):
-        """Convierte string de importe a número (permite cero)"""
-        if pd.isna(importe_str):
-            return None
-        try:
-            # Eliminar comas y espacios
-            importe = str(importe_str).replace(',', '').replace(' ', '').strip()
-            # Eliminar símbolo de moneda
-            importe = re.sub(r'[$€£¥]', '', importe)
-            valor = float(importe)
+        # to_numeric localiza los valores numéricos; el valor se toma de float() para no cambiar el redondeo
+        numericos = pd.to_numeric(texto, errors='coerce').notna().to_numpy()
+        valores = np.full(len(texto), np.nan)
+        valores[numericos] = texto[numericos].astype(np.float64)
+        # Lo que to_numeric rechaza pero float() acepta (ej. '1_000')
+        valores[~numericos] = [self._a_float(v) for v in texto[~numericos]]
 
-            # Advertir sobre ceros (pero permitir)
-            if valor == 0:
-                self.stats['importes_cero'] += 1
+        # Advertir sobre ceros (pero permitir)
+        self.stats['importes_cero'] += int((valores == 0).sum())
 
-            # Permitir negativos pero advertir
-            if valor < 0:
-                logger.warning(f"Importe negativo detectado: {valor}")
+        # Permitir negativos pero advertir
+        negativos = int((valores < 0).sum())
+        if negativos:
+            logger.warning(f"Importes negativos detectados: {negativos}")
 
-            return valor
-        except:
-            return None
+        return self._columna(serie, validos, valores, relleno=np.nan)
 
-    def limpiar_fecha(self, fecha):
-        """Convierte fecha a formato ISO (maneja múltiples formatos)"""
-        if pd.isna(fecha):
-            return None
+    def _fecha_por_celda(self, fecha_str, fecha):
+        """Conversión de una sola celda para los valores que no siguen un formato conocido"""
         try:
-            fecha_str = str(fecha).strip()
-
-            # Formatos a intentar
-            formatos = [
-                '%d/%m/%Y',           # 01/09/2025
-                '%Y-%m-%d',           # 2025-03-21
-                '%d-%m-%Y',           # 21-03-2025
-                '%Y/%m/%d',           # 2025/03/21
-                '%Y-%m-%d %H:%M:%S',  # 2025-03-21 00:00:00
-            ]
-
-            for formato in formatos:
+            for formato, _ in self.FORMATOS_FECHA:
                 try:
-                    dt = datetime.strptime(fecha_str, formato)
-                    return dt.date()
-                except:
+                    return datetime.strptime(fecha_str, formato).date()
+                except ValueError:
                     continue
 
             # Intentar con pandas
             return pd.to_datetime(fecha).date()
-        except:
+        except Exception:
             self.stats['fechas_invalidas'] += 1
             return None
 
+    def limpiar_fecha(self, serie):
+        """Convierte una columna de fechas a date (maneja múltiples formatos)"""
+        validos = serie.notna().to_numpy()
+        originales = serie[validos]
+        texto = self._texto(originales).str.strip()
+
+        fechas = np.full(len(texto), None, dtype=object)
+        pendientes = np.ones(len(texto), dtype=bool)
+
+        # Cada formato se convierte en bloque sobre las filas con su patrón; las que fallan siguen pendientes
+        for formato, patron in self.FORMATOS_FECHA:
+            posiciones = np.flatnonzero(pendientes)
+            candidatos = posiciones[texto.iloc[posiciones].str.fullmatch(patron).to_numpy()]
+            if not len(candidatos):
+                continue
+            convertidas = pd.to_datetime(texto.iloc[candidatos], format=formato, errors='coerce')
+            correctas = convertidas.notna().to_numpy()
+            fechas[candidatos[correctas]] = convertidas[correctas].dt.date.to_numpy()
+            pendientes[candidatos[correctas]] = False
+
+        # Formatos no reconocidos: misma conversión por celda de antes
+        for posicion in np.flatnonzero(pendientes):
+            fechas[posicion] = self._fecha_por_celda(texto.iat[posicion], originales.iat[posicion])
+
+        return self._columna(serie, validos, fechas)
+
     def generar_codigo_contrato(self):
         """Genera un código único para contratos sin código"""
         timestamp = int(time.time())
@@ -812,8 +1187,93 @@ class DataCleaner:
         self.advertencias.append(f"Código generado automáticamente: {codigo}")
         return codigo
 
-    def limpiar_dataframe(self, df, anio_archivo=None):
-        """Limpia todo el DataFrame. anio_archivo es el año extraído del nombre del archivo."""
+    @staticmethod
+    def _centavos(importe):
+        """Importe redondeado a centavos como texto (mismo resultado para float y para NUMERIC)"""
+        try:
+            valor = Decimal(str(importe))
+        except InvalidOperation:
+            return ''
+        if not valor.is_finite():
+            return ''
+        valor = valor.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        return str(abs(valor) if valor.is_zero() else valor)
+
+    @classmethod
+    def _campo_huella(cls, serie, campo):
+        """Texto de un campo para la huella ('' si es nulo)"""
+        validos = serie.notna().to_numpy()
+        texto = np.full(len(serie), '', dtype=object)
+        if campo == 'importe':
+            texto[validos] = [cls._centavos(v) for v in serie[validos]]
+        else:
+            texto[validos] = cls._texto(serie[validos]).to_numpy()
+        if campo == 'codigo_contrato':
+            # Los códigos generados cambian en cada carga: no distinguen el contenido
+            texto[pd.Series(texto).str.startswith('AUTO_').to_numpy()] = ''
+        return pd.Series(texto, index=serie.index)
+
+    @classmethod
+    def huella_contenido(cls, df):
+        """
+        md5 (como UUID) de los CAMPOS_HUELLA de cada fila. Sirve igual para el
+        DataFrame limpio y para filas leídas de contratos.contratos, así que dos
+        filas con el mismo contenido tienen la misma huella sin importar cómo llegaron.
+        """
+        campos = [
+            cls._campo_huella(df[campo], campo) if campo in df.columns else pd.Series('', index=df.index)
+            for campo in cls.CAMPOS_HUELLA
+        ]
+        filas = campos[0].str.cat(campos[1:], sep='\x1f')
+        return pd.Series(
+            [str(uuid.UUID(hashlib.md5(fila.encode('utf-8')).hexdigest())) for fila in filas],
+            index=df.index,
+            dtype=object
+        )
+
+    def acumular(self, stats, advertencias):
+        """Suma las stats y advertencias de otro DataCleaner (bloques limpiados en otro proceso)"""
+        for clave, valor in stats.items():
+            self.stats[clave] = self.stats.get(clave, 0) + valor
+        self.advertencias.extend(advertencias)
+
+    @staticmethod
+    def _es_anio_valido(val):
+        """Verifica si el valor es un año válido (4 dígitos entre 2000-2099)"""
+        if pd.isna(val):
+            return False
+        try:
+            num = int(val)
+            return 2000 <= num <= 2099
+        except (ValueError, TypeError):
+            return False
+
+    @classmethod
+    def estrategia_anio(cls, df, anio_archivo=None):
+        """
+        De dónde sale anio_fuente: 'archivo' (año del nombre del archivo), 'columna'
+        (la columna trae años válidos, o no hay fecha de dónde inferirlos) o 'fecha'
+        (inferir de fecha_inicio_contrato). Se decide una vez por archivo con el
+        primer bloque para que todos los bloques usen la misma fuente.
+        """
+        if anio_archivo:
+            return 'archivo'
+
+        df = df.rename(columns=cls.COLUMN_MAPPING)
+        anios_validos = (
+            'anio_fuente' in df.columns
+            and df['anio_fuente'].drop_duplicates().apply(cls._es_anio_valido).any()
+        )
+        if not anios_validos and 'fecha_inicio_contrato' in df.columns:
+            # Sin columna, vacía o sin años válidos (ej: "Plataforma Integral CompraNet")
+            return 'fecha'
+        return 'columna'
+
+    def limpiar_dataframe(self, df, anio_archivo=None, estrategia_anio=None):
+        """
+        Limpia todo el DataFrame. anio_archivo es el año extraído del nombre del archivo;
+        estrategia_anio (ver estrategia_anio) se decide con este DataFrame si no se da.
+        """
         self.anio_archivo = anio_archivo
         logger.info(f"Iniciando limpieza de {len(df)} registros")
         logger.info(f"Columnas en CSV: {list(df.columns)[:10]}...")  # Mostrar primeras 10
@@ -825,18 +1285,19 @@ class DataCleaner:
 
         # Detectar y corregir RFC/Proveedor intercambiados
         if 'rfc' in df.columns and 'proveedor_contratista' in df.columns:
-            df[['rfc', 'proveedor_contratista']] = df.apply(
-                lambda row: pd.Series(self.detectar_rfc_proveedor_intercambiados(
-                    row.get('rfc'), row.get('proveedor_contratista')
-                )),
-                axis=1
-            )
+            df = self.detectar_rfc_proveedor_intercambiados(df)
 
         # Generar códigos para registros sin código
         if 'codigo_contrato' in df.columns:
-            df['codigo_contrato'] = df['codigo_contrato'].apply(
-                lambda x: x if pd.notna(x) and str(x).strip() else self.generar_codigo_contrato()
-            )
+            sin_codigo = self._vacios(df['codigo_contrato'])
+            sin_codigo[~sin_codigo] = (
+                self._texto(df.loc[~sin_codigo, 'codigo_contrato']).str.strip() == ''
+            ).to_numpy()
+            if sin_codigo.any():
+                df['codigo_contrato'] = df['codigo_contrato'].astype(object)
+                df.loc[sin_codigo, 'codigo_contrato'] = [
+                    self.generar_codigo_contrato() for _ in range(int(sin_codigo.sum()))
+                ]
 
         # Limpiar campos de texto
         text_columns = ['titulo_contrato', 'titulo_expediente', 'descripcion_contrato',
@@ -846,68 +1307,1070 @@ class DataCleaner:
 
         for col in text_columns:
             if col in df.columns:
-                df[col] = df[col].apply(self.limpiar_texto)
+                df[col] = self.limpiar_texto(df[col])
 
         # Limpiar RFC
         if 'rfc' in df.columns:
-            df['rfc'] = df['rfc'].apply(self.limpiar_rfc)
+            df['rfc'] = self.limpiar_rfc(df['rfc'])
 
         # Limpiar importes
         if 'importe' in df.columns:
-            df['importe'] = df['importe'].apply(self.limpiar_importe)
+            df['importe'] = self.limpiar_importe(df['importe'])
 
         if 'importe_contrato' in df.columns:
-            df['importe_contrato'] = df['importe_contrato'].apply(
-                lambda x: str(x).replace(',', '').strip() if pd.notna(x) else None
-            )
+            validos = df['importe_contrato'].notna().to_numpy()
+            texto = self._texto(df.loc[validos, 'importe_contrato']).str.replace(',', '', regex=False).str.strip()
+            df['importe_contrato'] = self._columna(df['importe_contrato'], validos, texto.to_numpy(dtype=object))
 
         # Limpiar fechas
         if 'fecha_inicio_contrato' in df.columns:
-            df['fecha_inicio_contrato'] = df['fecha_inicio_contrato'].apply(self.limpiar_fecha)
+            df['fecha_inicio_contrato'] = self.limpiar_fecha(df['fecha_inicio_contrato'])
 
         if 'fecha_fin_contrato' in df.columns:
-            df['fecha_fin_contrato'] = df['fecha_fin_contrato'].apply(self.limpiar_fecha)
-
-        # Determinar el año de la fuente
-        # Prioridad: 1) Año del nombre del archivo, 2) Columna válida, 3) Inferir de fecha
-        def es_anio_valido(val):
-            """Verifica si el valor es un año válido (4 dígitos entre 2000-2099)"""
-            if pd.isna(val):
-                return False
-            try:
-                num = int(val)
-                return 2000 <= num <= 2099
-            except (ValueError, TypeError):
-                return False
+            df['fecha_fin_contrato'] = self.limpiar_fecha(df['fecha_fin_contrato'])
 
-        if self.anio_archivo:
+        # Determinar el año de la fuente con la estrategia del archivo
+        if estrategia_anio is None:
+            estrategia_anio = self.estrategia_anio(df, self.anio_archivo)
+
+        if estrategia_anio == 'archivo':
             # Si hay año del nombre del archivo, usarlo para TODOS los registros
             logger.info(f"Usando año del nombre del archivo: {self.anio_archivo}")
             df['anio_fuente'] = self.anio_archivo
-        elif 'anio_fuente' not in df.columns or df['anio_fuente'].isna().all():
-            # No hay columna o está vacía, inferir de fecha
-            if 'fecha_inicio_contrato' in df.columns:
-                logger.info("Infiriendo año de fecha_inicio_contrato")
-                df['anio_fuente'] = df['fecha_inicio_contrato'].apply(
-                    lambda x: str(x.year) if pd.notna(x) else None
-                )
-        elif not df['anio_fuente'].apply(es_anio_valido).any():
-            # Columna existe pero no tiene años válidos (ej: "Plataforma Integral CompraNet")
-            if 'fecha_inicio_contrato' in df.columns:
-                logger.warning("Los valores de anio_fuente no son años válidos, infiriendo de fecha_inicio_contrato")
-                df['anio_fuente'] = df['fecha_inicio_contrato'].apply(
-                    lambda x: str(x.year) if pd.notna(x) else None
-                )
+        elif estrategia_anio == 'fecha' and 'fecha_inicio_contrato' in df.columns:
+            logger.info("Infiriendo año de fecha_inicio_contrato")
+            df['anio_fuente'] = df['fecha_inicio_contrato'].apply(
+                lambda x: str(x.year) if pd.notna(x) else None
+            )
 
         # Eliminar duplicados por codigo_contrato
         df = df.drop_duplicates(subset=['codigo_contrato'], keep='first')
 
+        # Huella de contenido: la BD rechaza filas con una huella ya cargada
+        df['huella_contenido'] = self.huella_contenido(df)
+
         logger.info(f"Limpieza completada. {len(df)} registros válidos")
         logger.info(f"Estadísticas: {self.stats}")
 
         return df
 
 
+# ============================================
+# CARGA MASIVA
+# ============================================
+
+# Columnas enteras de contratos.contratos que pueden venir como texto o float en el CSV
+COLUMNAS_ENTERAS = ['anio_fuente']
+
+# Filas por bloque al leer el CSV (limita la memoria de una carga)
+TAMANO_BLOQUE = int(os.getenv('CARGA_TAMANO_BLOQUE', 50000))
+
+# Procesos para limpiar bloques en paralelo (1 = limpiar en el proceso actual)
+PROCESOS_LIMPIEZA = int(os.getenv('CARGA_PROCESOS', os.cpu_count() or 1))
+
+# Directorio compartido con scripts/worker_trabajos.py para los archivos en cola
+CARGA_DIR = os.getenv('CARGA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cargas'))
+
+# Extensiones aceptadas (la más larga primero: .csv.gz antes que .csv)
+FORMATOS_CARGA = ('.csv.gz', '.csv', '.zip', '.parquet')
+
+
+def formato_archivo(nombre):
+    """Extensión de FORMATOS_CARGA del nombre del archivo, o None si no se acepta"""
+    nombre = nombre.lower()
+    return next((formato for formato in FORMATOS_CARGA if nombre.endswith(formato)), None)
+
+
+def anio_de_nombre(nombre):
+    """Año del nombre del archivo (ej: contratos_comprasmx_2025.csv -> '2025'), o None"""
+    match = re.search(r'(\d{4})', os.path.basename(nombre))
+    return match.group(1) if match else None
+
+
+def abrir_archivo(ruta):
+    """
+    Flujo binario con el CSV de un archivo .csv, .csv.gz o .zip (con un solo CSV).
+    Los comprimidos se descomprimen al vuelo, sin escribir el CSV a disco.
+    """
+    formato = formato_archivo(ruta)
+    if formato == '.csv.gz':
+        return gzip.open(ruta, 'rb')
+    if formato == '.zip':
+        archivo_zip = zipfile.ZipFile(ruta)
+        miembros = [m for m in archivo_zip.infolist() if not m.is_dir()]
+        if len(miembros) != 1:
+            archivo_zip.close()
+            raise ValueError(f"El ZIP debe contener un solo CSV (contiene {len(miembros)} archivos)")
+        # ZipExtFile mantiene abierto el archivo del ZIP hasta cerrarse
+        return archivo_zip.open(miembros[0])
+    return open(ruta, 'rb')
+
+
+def _sql_actualizar(staging, columnas):
+    """
+    Fusión de la staging con contratos.contratos en una sola sentencia:
+    - Código inexistente: se inserta (ON CONFLICT DO NOTHING, igual que la carga normal).
+    - Código existente una sola vez con otra huella: se actualiza la fila completa,
+      salvo que la nueva huella ya pertenezca a otra fila (sería un duplicado).
+    - Código existente con la misma huella: sin cambios.
+    Los códigos con varias filas (mismo código, distinto título o proveedor) no se
+    tocan: no se sabe cuál de ellas es la que cambió.
+    Retorna una fila (insertados, actualizados, sin_cambios, anios_anteriores).
+    """
+    lista_columnas = ', '.join(columnas)
+    actualizables = [c for c in columnas if c != 'codigo_contrato']
+    return f"""
+        WITH existentes AS MATERIALIZED (
+            SELECT s.codigo_contrato,
+                   COUNT(*) AS copias,
+                   COALESCE(BOOL_OR(c.huella_contenido = s.huella_contenido), FALSE) AS sin_cambios,
+                   MIN(c.anio_fuente) AS anio_anterior
+            FROM {staging} s
+            JOIN contratos.contratos c ON c.codigo_contrato = s.codigo_contrato
+            GROUP BY s.codigo_contrato
+        ),
+        actualizados AS (
+            UPDATE contratos.contratos c
+            SET ({', '.join(actualizables)}) = ROW({', '.join('s.' + col for col in actualizables)})
+            FROM {staging} s
+            JOIN existentes e ON e.codigo_contrato = s.codigo_contrato
+            WHERE c.codigo_contrato = s.codigo_contrato
+              AND e.copias = 1
+              AND NOT e.sin_cambios
+              AND NOT EXISTS (
+                  SELECT 1 FROM contratos.contratos o
+                  WHERE o.huella_contenido = s.huella_contenido
+              )
+            RETURNING 1
+        ),
+        insertados AS (
+            INSERT INTO contratos.contratos ({lista_columnas}, created_at)
+            SELECT {lista_columnas}, NOW() FROM {staging} s
+            WHERE NOT EXISTS (SELECT 1 FROM existentes e WHERE e.codigo_contrato = s.codigo_contrato)
+            ON CONFLICT DO NOTHING
+            RETURNING 1
+        )
+        SELECT (SELECT COUNT(*) FROM insertados),
+               (SELECT COUNT(*) FROM actualizados),
+               (SELECT COUNT(*) FROM existentes WHERE sin_cambios),
+               ARRAY(
+                   SELECT DISTINCT anio_anterior FROM existentes
+                   WHERE copias = 1 AND NOT sin_cambios AND anio_anterior IS NOT NULL
+               )
+    """
+
+
+def _copiar_staging(cursor, staging, lista_columnas, datos):
+    """
+    COPY de datos a la staging. Si el COPY falla por un valor que la columna no
+    acepta (fecha inválida, número fuera de rango...), se deshace hasta un
+    SAVEPOINT y el bloque se bisecta hasta aislar las filas malas; el resto se
+    copia. Retorna el número de filas rechazadas.
+    """
+    buffer = io.StringIO()
+    datos.to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+
+    rechazadas = 0
+    cursor.execute("SAVEPOINT copia_staging")
+    try:
+        cursor.copy_expert(
+            f"COPY {staging} ({lista_columnas}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    except DataError as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT copia_staging")
+        if len(datos) == 1:
+            logger.error(
+                f"Registro {datos['codigo_contrato'].iloc[0]} rechazado: {str(e).strip().splitlines()[0]}"
+            )
+            rechazadas = 1
+        else:
+            mitad = len(datos) // 2
+            rechazadas = (
+                _copiar_staging(cursor, staging, lista_columnas, datos.iloc[:mitad])
+                + _copiar_staging(cursor, staging, lista_columnas, datos.iloc[mitad:])
+            )
+    cursor.execute("RELEASE SAVEPOINT copia_staging")
+    return rechazadas
+
+
+def cargar_contratos(df_limpio, al_confirmar=None, actualizar=False, destino='contratos.contratos'):
+    """
+    Carga un DataFrame limpio en contratos.contratos: COPY a una tabla de staging
+    UNLOGGED y un solo INSERT ... SELECT ... ON CONFLICT DO NOTHING. Se descartan
+    como duplicadas las filas que chocan con la llave (codigo_contrato,
+    titulo_contrato, proveedor_contratista) o con una huella_contenido ya cargada.
+    Todo ocurre en una transacción, así que si algo falla no queda ni la carga ni la staging.
+
+    Con actualizar, la staging se fusiona por codigo_contrato y huella (_sql_actualizar):
+    los contratos republicados con otro estatus, fechas o importes se actualizan en
+    lugar de quedarse con los datos anteriores.
+
+    al_confirmar(cursor, resultado) se ejecuta justo antes del commit, dentro de la
+    misma transacción (lo usa el manifiesto para registrar el bloque).
+
+    destino permite cargar en otra tabla con las mismas columnas (la tabla nueva de
+    una recarga de año); la fusión de actualizar solo aplica a contratos.contratos.
+
+    Retorna {'insertados': n, 'duplicados': n, 'errores': n}; los errores son filas
+    descartadas antes del COPY (sin codigo_contrato o con un año que no es entero)
+    y las que el COPY rechaza por un valor inválido (_copiar_staging las aísla sin
+    perder el resto del bloque).
+    Con actualizar agrega 'actualizados', 'sin_cambios' y 'anios_anteriores' (años
+    que tenían las filas actualizadas, para refrescar sus resúmenes); 'duplicados'
+    son entonces las filas que no se insertaron, actualizaron ni estaban iguales.
+    """
+    columnas = [
+        col for col in [*dict.fromkeys(DataCleaner.COLUMN_MAPPING.values()), 'huella_contenido']
+        if col in df_limpio.columns
+    ]
+    datos = df_limpio[columnas].copy()
+
+    errores = DataCleaner._vacios(datos['codigo_contrato'])
+    if errores.any():
+        logger.error(f"{int(errores.sum())} registros sin codigo_contrato, saltando")
+
+    for col in COLUMNAS_ENTERAS:
+        if col in datos.columns:
+            numeros = pd.to_numeric(datos[col], errors='coerce')
+            invalidos = (datos[col].notna() & (numeros.isna() | (numeros % 1 != 0))).to_numpy()
+            if invalidos.any():
+                logger.error(f"{int(invalidos.sum())} registros con {col} no entero, saltando")
+            errores |= invalidos
+            datos[col] = numeros.where(~invalidos).astype('Int64')
+
+    datos = datos[~errores]
+    resultado = {'insertados': 0, 'duplicados': 0, 'errores': int(errores.sum())}
+    if actualizar:
+        resultado.update({'actualizados': 0, 'sin_cambios': 0, 'anios_anteriores': []})
+    if datos.empty and al_confirmar is None:
+        return resultado
+
+    lista_columnas = ', '.join(columnas)
+    staging = f"contratos.carga_{uuid.uuid4().hex[:12]}"
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        if not datos.empty:
+            cursor.execute(f"""
+                CREATE UNLOGGED TABLE {staging} AS
+                SELECT {lista_columnas} FROM contratos.contratos WITH NO DATA
+            """)
+            rechazadas = _copiar_staging(cursor, staging, lista_columnas, datos)
+            if rechazadas:
+                resultado['errores'] += rechazadas
+            copiadas = len(datos) - rechazadas
+            logger.info(f"{copiadas} registros copiados a {staging}")
+
+            if actualizar:
+                cursor.execute(f"ANALYZE {staging}")
+                cursor.execute(_sql_actualizar(staging, columnas))
+                insertados, actualizados, sin_cambios, anios_anteriores = cursor.fetchone()
+                resultado.update({
+                    'insertados': insertados,
+                    'actualizados': actualizados,
+                    'sin_cambios': sin_cambios,
+                    'duplicados': copiadas - insertados - actualizados - sin_cambios,
+                    'anios_anteriores': list(anios_anteriores)
+                })
+            else:
+                cursor.execute(f"""
+                    INSERT INTO {destino} ({lista_columnas}, created_at)
+                    SELECT {lista_columnas}, NOW() FROM {staging}
+                    ON CONFLICT DO NOTHING
+                """)
+                resultado['insertados'] = cursor.rowcount
+                resultado['duplicados'] = copiadas - cursor.rowcount
+
+            cursor.execute(f"DROP TABLE {staging}")
+
+        if al_confirmar is not None:
+            al_confirmar(cursor, resultado)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return resultado
+
+
+def leer_csv_por_bloques(ruta, encoding, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee el CSV (.csv, .csv.gz o .zip) en DataFrames de tamano_bloque filas. Si el
+    encoding falla a mitad del archivo, lo relee con latin-1 saltando las filas ya
+    entregadas.
+    """
+    entregadas = 0
+    try:
+        with abrir_archivo(ruta) as f:
+            for bloque in pd.read_csv(f, encoding=encoding, chunksize=tamano_bloque):
+                entregadas += len(bloque)
+                yield bloque
+        return
+    except Exception as e:
+        if encoding == 'latin-1':
+            raise
+        # Intentar con encoding alternativo
+        logger.warning(f"Error con {encoding} después de {entregadas} filas, intentando latin-1: {e}")
+
+    omitir = entregadas
+    with abrir_archivo(ruta) as f:
+        for bloque in pd.read_csv(f, encoding='latin-1', chunksize=tamano_bloque):
+            if omitir >= len(bloque):
+                omitir -= len(bloque)
+                continue
+            yield bloque.iloc[omitir:]
+            omitir = 0
+
+
+def leer_parquet_por_bloques(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee un Parquet en DataFrames de tamano_bloque filas, grupo de filas por grupo
+    de filas, proyectando solo las columnas de DataCleaner.COLUMN_MAPPING.
+    """
+    if pq is None:
+        raise ValueError("Para cargar archivos Parquet se necesita pyarrow (pip install pyarrow)")
+
+    archivo = pq.ParquetFile(ruta)
+    columnas = [c for c in archivo.schema_arrow.names if c in DataCleaner.COLUMN_MAPPING]
+    logger.info(
+        f"Parquet con {archivo.metadata.num_rows} filas en {archivo.num_row_groups} grupos; "
+        f"{len(columnas)} de {len(archivo.schema_arrow.names)} columnas leídas"
+    )
+    for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=columnas):
+        yield lote.to_pandas()
+
+
+def leer_por_bloques(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """Bloques de un archivo de carga según su formato (CSV, CSV comprimido o Parquet)"""
+    if formato_archivo(ruta) == '.parquet':
+        return leer_parquet_por_bloques(ruta, tamano_bloque)
+    return leer_csv_por_bloques(ruta, DataCleaner.detectar_encoding(ruta), tamano_bloque)
+
+
+def limpiar_bloque(bloque, anio_archivo=None, estrategia_anio=None):
+    """Limpia un bloque con un DataCleaner propio; retorna (limpio, stats, advertencias)"""
+    cleaner = DataCleaner()
+    limpio = cleaner.limpiar_dataframe(bloque, anio_archivo=anio_archivo, estrategia_anio=estrategia_anio)
+    return limpio, cleaner.stats, cleaner.advertencias
+
+
+def limpiar_bloques(bloques, anio_archivo=None, procesos=PROCESOS_LIMPIEZA, estrategia_anio=None):
+    """
+    Limpia los bloques en un pool de procesos y entrega (filas_leidas, limpio, stats,
+    advertencias) en el orden de lectura, sin importar qué proceso termine primero.
+    Mantiene a lo más procesos + 1 bloques en vuelo para acotar la memoria.
+
+    La estrategia de anio_fuente es la misma para todos los bloques: la dada o la
+    que DataCleaner.estrategia_anio decide con el primer bloque.
+    """
+    def con_estrategia():
+        estrategia = estrategia_anio
+        for bloque in bloques:
+            if estrategia is None:
+                estrategia = DataCleaner.estrategia_anio(bloque, anio_archivo)
+                logger.info(f"Estrategia de año del archivo: {estrategia}")
+            yield bloque, estrategia
+
+    if procesos <= 1:
+        for bloque, estrategia in con_estrategia():
+            yield (len(bloque), *limpiar_bloque(bloque, anio_archivo, estrategia))
+        return
+
+    # spawn: los workers no heredan por fork los hilos del proceso (gunicorn,
+    # cargar_directorio), que pueden tener locks tomados
+    pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+    en_vuelo = deque()
+    try:
+        for bloque, estrategia in con_estrategia():
+            en_vuelo.append((len(bloque), pool.submit(limpiar_bloque, bloque, anio_archivo, estrategia)))
+            if len(en_vuelo) > procesos:
+                filas, futuro = en_vuelo.popleft()
+                yield (filas, *futuro.result())
+        while en_vuelo:
+            filas, futuro = en_vuelo.popleft()
+            yield (filas, *futuro.result())
+    finally:
+        # Si la carga se detiene antes (cancelación o error) no limpiar los bloques restantes
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def codigos_cargados(bloque):
+    """
+    Códigos de contrato que la limpieza conservaría en un bloque crudo (los vacíos
+    reciben un código AUTO_ único, que no se repite en otros bloques). Sirve para
+    reconstruir los códigos vistos de los bloques que se saltan al reanudar.
+    """
+    codigos = bloque.rename(columns=DataCleaner.COLUMN_MAPPING).get('codigo_contrato')
+    if codigos is None:
+        return set()
+    vacios = DataCleaner._vacios(codigos)
+    codigos = codigos[~vacios]
+    codigos = codigos[(DataCleaner._texto(codigos).str.strip() != '').to_numpy()]
+    return set(codigos.astype(str))
+
+
+
+def limpiar_bloques_sin_repetidos(bloques, anio_archivo=None, procesos=PROCESOS_LIMPIEZA, saltar=0):
+    """
+    limpiar_bloques sin los códigos de contrato que ya aparecieron en bloques anteriores
+    (drop_duplicates de la limpieza solo ve el bloque actual), así que el resultado es el
+    mismo que limpiar todo el archivo con drop_duplicates(keep='first').
+
+    Los primeros `saltar` bloques (ya confirmados en una carga que se reanuda) solo aportan
+    sus códigos y la estrategia de año: no se limpian ni se entregan.
+    """
+    codigos_vistos = set()
+    estrategia_anio = None
+
+    def pendientes():
+        nonlocal estrategia_anio
+        for numero, bloque in enumerate(bloques):
+            if numero < saltar:
+                # La estrategia de año se decide con el primer bloque del archivo, igual
+                # que en la carga interrumpida (no con el primer bloque pendiente)
+                if numero == 0:
+                    estrategia_anio = DataCleaner.estrategia_anio(bloque, anio_archivo)
+                codigos_vistos.update(codigos_cargados(bloque))
+                continue
+            yield bloque
+
+    # pendientes() ya recorrió los bloques saltados cuando limpiar_bloques pide el primero
+    bloques_pendientes = pendientes()
+    primero = next(bloques_pendientes, None)
+    if primero is None:
+        return
+
+    bloques_limpios = limpiar_bloques(chain([primero], bloques_pendientes), anio_archivo, procesos, estrategia_anio)
+    for filas_leidas, limpio, stats, advertencias in bloques_limpios:
+        codigos = limpio['codigo_contrato'].astype(str)
+        repetidos = codigos.isin(codigos_vistos).to_numpy()
+        codigos_vistos.update(codigos[~repetidos])
+        yield filas_leidas, limpio[~repetidos], stats, advertencias
+
+# Contadores de la carga que se guardan en el manifiesto
+CONTADORES_CARGA = (
+    'bloques', 'registros_leidos', 'registros_procesados', 'registros_insertados',
+    'registros_actualizados', 'registros_sin_cambios', 'registros_duplicados', 'registros_con_errores'
+)
+
+
+def procesar_archivo(ruta, anio_archivo=None, tamano_bloque=TAMANO_BLOQUE, al_avanzar=None,
+                     procesos=PROCESOS_LIMPIEZA, nombre_archivo=None, forzar=False, actualizar=False,
+                     destino=None):
+    """
+    Lee, limpia y carga un archivo (CSV, .csv.gz, .zip o Parquet) bloque por bloque,
+    con memoria acotada al tamaño del bloque. La limpieza corre en `procesos` procesos,
+    pero los bloques se cargan en el orden del archivo y los códigos ya cargados se
+    arrastran entre bloques, así que el resultado es el mismo que limpiar todo el
+    archivo con drop_duplicates(keep='first').
+
+    El archivo se registra en el manifiesto de cargas por su sha256: si ya se cargó
+    completo no se procesa (resumen['omitido'] = True, salvo con forzar); si una carga
+    anterior se interrumpió, se reanuda después del último bloque confirmado
+    (resumen['reanudado_desde'] = bloques saltados, resumen['filas_previas'] = sus filas).
+
+    Con actualizar, los contratos existentes cuyo contenido cambió se actualizan
+    (cargar_contratos(actualizar=True)). Un archivo completado se vuelve a procesar en
+    este modo, porque una carga normal anterior pudo dejar filas sin actualizar.
+
+    Con destino (otra tabla, ej. la de recargar_anio) las filas se cargan ahí y no se usa
+    el manifiesto: la tabla es desechable y la carga no se puede reanudar.
+
+    al_avanzar(resumen) se llama después de cada bloque; si retorna True la carga se
+    detiene (los bloques ya cargados se conservan) y resumen['cancelado'] queda en True.
+
+    Mientras dura la carga el archivo queda reclamado (manifiesto.reclamar_archivo): si
+    otro trabajo ya lo está cargando se lanza CargaEnCurso y no se carga dos veces en paralelo.
+
+    Retorna (resumen, cleaner); cleaner acumula stats y advertencias de los bloques procesados.
+    """
+    sha256 = sha256_archivo(ruta)
+    reclamo = reclamar_archivo(engine, sha256, anio_archivo) if destino is None else nullcontext()
+    with reclamo:
+        return _procesar_archivo(ruta, sha256, anio_archivo, tamano_bloque, al_avanzar, procesos,
+                                 nombre_archivo, forzar, actualizar, destino)
+
+
+def _procesar_archivo(ruta, sha256, anio_archivo, tamano_bloque, al_avanzar, procesos,
+                      nombre_archivo, forzar, actualizar, destino):
+    """Cuerpo de procesar_archivo, con el archivo ya reclamado"""
+    if destino is None:
+        carga = iniciar_carga(engine, sha256, anio_archivo, nombre_archivo or os.path.basename(ruta),
+                              tamano_bloque, forzar=forzar)
+        if carga['estado'] == 'completado' and actualizar:
+            carga = iniciar_carga(engine, sha256, anio_archivo, nombre_archivo or os.path.basename(ruta),
+                                  tamano_bloque, forzar=True)
+    else:
+        carga = {'id': None, 'estado': 'en_proceso', 'tamano_bloque': tamano_bloque,
+                 'bloques_completados': 0, 'filas_leidas': 0, 'resumen': {}, 'anios': []}
+    cleaner = DataCleaner()
+
+    resumen = {campo: carga['resumen'].get(campo, 0) for campo in CONTADORES_CARGA}
+    resumen.update({'cancelado': False, 'omitido': False, 'reanudado_desde': 0, 'filas_previas': 0, 'sha256': sha256})
+
+    if carga['estado'] == 'completado':
+        logger.info(f"Archivo {sha256[:12]} ya cargado el {carga['terminado_en']:%d/%m/%Y %H:%M}, se omite")
+        resumen['omitido'] = True
+        resumen['anios'] = carga['anios']
+        return resumen, cleaner
+
+    # Reanudar en las mismas fronteras de bloque que la carga interrumpida
+    tamano_bloque = carga['tamano_bloque']
+    saltar = carga['bloques_completados']
+    if saltar:
+        logger.info(f"Reanudando carga de {sha256[:12]} después del bloque {saltar} ({carga['filas_leidas']} filas)")
+        resumen['reanudado_desde'] = saltar
+        resumen['filas_previas'] = carga['filas_leidas']
+
+    anios = set(carga['anios'])
+
+    anterior = time.time()
+    bloques_limpios = limpiar_bloques_sin_repetidos(leer_por_bloques(ruta, tamano_bloque), anio_archivo,
+                                                    procesos, saltar=saltar)
+    for filas_leidas, limpio, stats, advertencias in bloques_limpios:
+        cleaner.acumular(stats, advertencias)
+        anios.update(anios_en_dataframe(limpio))
+
+        def al_confirmar(cursor, resultado):
+            resumen['bloques'] += 1
+            resumen['registros_leidos'] += filas_leidas
+            resumen['registros_procesados'] += len(limpio)
+            resumen['registros_insertados'] += resultado['insertados']
+            resumen['registros_actualizados'] += resultado.get('actualizados', 0)
+            resumen['registros_sin_cambios'] += resultado.get('sin_cambios', 0)
+            resumen['registros_duplicados'] += resultado['duplicados']
+            resumen['registros_con_errores'] += resultado['errores']
+            # Las filas actualizadas pudieron cambiar de año: refrescar también el anterior
+            anios.update(resultado.get('anios_anteriores', []))
+            if carga['id'] is not None:
+                registrar_bloque(cursor, carga['id'], {c: resumen[c] for c in CONTADORES_CARGA}, sorted(anios))
+
+        resultado = cargar_contratos(limpio, al_confirmar=al_confirmar, actualizar=actualizar,
+                                     destino=destino or 'contratos.contratos')
+
+        ahora = time.time()
+        segundos = max(ahora - anterior, 0.001)
+        anterior = ahora
+        actualizados = ''
+        if actualizar:
+            actualizados = f"{resultado['actualizados']} actualizados, {resultado['sin_cambios']} sin cambios, "
+        logger.info(
+            f"Bloque {resumen['bloques']}: {filas_leidas} leídos, {len(limpio)} limpios, "
+            f"{resultado['insertados']} nuevos, {actualizados}{resultado['duplicados']} duplicados "
+            f"({filas_leidas / segundos:,.0f} filas/s) - acumulado {resumen['registros_leidos']} filas"
+        )
+
+        if al_avanzar is not None and al_avanzar(resumen):
+            logger.warning(f"Carga cancelada después de {resumen['registros_leidos']} filas")
+            resumen['cancelado'] = True
+            break
+    else:
+        if carga['id'] is not None:
+            completar_carga(engine, carga['id'], resumen['registros_leidos'])
+
+    resumen['anios'] = sorted(anios)
+    return resumen, cleaner
+
+
+def resumir_advertencias(cleaner):
+    """Primeras advertencias de la limpieza más los totales de cada tipo"""
+    advertencias_lista = cleaner.advertencias[:10]  # Solo primeras 10
+    if cleaner.stats['rfc_intercambiados'] > 0:
+        advertencias_lista.append(f"{cleaner.stats['rfc_intercambiados']} RFC/Proveedor intercambiados corregidos")
+    if cleaner.stats['rfc_vacios'] > 0:
+        advertencias_lista.append(f"{cleaner.stats['rfc_vacios']} registros sin RFC")
+    if cleaner.stats['importes_cero'] > 0:
+        advertencias_lista.append(f"{cleaner.stats['importes_cero']} contratos con importe $0")
+    if cleaner.stats['codigos_generados'] > 0:
+        advertencias_lista.append(f"{cleaner.stats['codigos_generados']} códigos generados automáticamente")
+    return advertencias_lista
+
+
+# ============================================
+# PERFIL DE UN ARCHIVO (SIN CARGAR)
+# ============================================
+
+# Filas perfiladas como máximo (0 = todo el archivo); el resto del archivo no se lee
+PERFIL_MAX_FILAS = int(os.getenv('PERFIL_MAX_FILAS', 200000))
+
+# RFC como queda después de limpiar_rfc: persona moral (12) o física (13)
+RFC_VALIDO = r'[A-Z]{3,4}[0-9]{6}[A-Z0-9]{3}'
+
+# Filas del bloque que ya existen en contratos.contratos, en una sola consulta:
+# chocan con la llave (código, título, proveedor) o con la huella, igual que el
+# ON CONFLICT DO NOTHING de la carga; códigos existentes es lo que actualizaría el modo actualizar
+SQL_EXISTENTES = """
+    SELECT
+        COUNT(*) FILTER (WHERE EXISTS (
+                   SELECT 1 FROM contratos.contratos c
+                   WHERE c.codigo_contrato = f.codigo
+                     AND c.titulo_contrato = f.titulo
+                     AND c.proveedor_contratista = f.proveedor
+               ) OR EXISTS (
+                   SELECT 1 FROM contratos.contratos c WHERE c.huella_contenido = f.huella
+               )) AS existentes,
+        COUNT(*) FILTER (WHERE EXISTS (
+                   SELECT 1 FROM contratos.contratos c WHERE c.codigo_contrato = f.codigo
+               )) AS codigos_existentes
+    FROM unnest(
+        CAST(:codigos AS text[]), CAST(:titulos AS text[]),
+        CAST(:proveedores AS text[]), CAST(:huellas AS uuid[])
+    ) AS f(codigo, titulo, proveedor, huella)
+"""
+
+
+def _a_lista(serie):
+    """Valores de una columna para un arreglo de PostgreSQL (NaN -> None)"""
+    return [None if pd.isna(v) else str(v) for v in serie]
+
+
+def perfilar_archivo(ruta, anio_archivo=None, max_filas=PERFIL_MAX_FILAS, tamano_bloque=TAMANO_BLOQUE,
+                     procesos=PROCESOS_LIMPIEZA):
+    """
+    Ensayo de una carga: limpia el archivo (o sus primeras max_filas filas) con la
+    misma limpieza que procesar_archivo y reporta qué pasaría, sin escribir nada
+    (la consulta de duplicados corre en una transacción READ ONLY):
+    tasas de nulos por columna después de limpiar, RFC válidos / no estándar /
+    vacíos / intercambiados, fechas que no se pudieron convertir, distribución por
+    año, duplicados dentro del archivo y filas que ya existen en contratos.contratos.
+    Retorna el reporte como dict.
+    """
+    inicio = time.time()
+    columnas = [*dict.fromkeys(DataCleaner.COLUMN_MAPPING.values())]
+    cleaner = DataCleaner()
+    perfil = {
+        'filas_leidas': 0, 'muestra': False, 'registros_procesados': 0,
+        'duplicados_en_archivo': 0, 'duplicados_existentes': 0, 'codigos_existentes': 0
+    }
+    nulos = dict.fromkeys(columnas, 0)
+    presentes = set()
+    rfc = {'validos': 0, 'no_estandar': 0, 'ejemplos_no_estandar': []}
+    anios = {}
+    huellas_vistas = set()
+
+    def bloques_muestra():
+        restantes = max_filas
+        for bloque in leer_por_bloques(ruta, tamano_bloque):
+            if max_filas and restantes <= 0:
+                perfil['muestra'] = True
+                return
+            if max_filas and len(bloque) > restantes:
+                perfil['muestra'] = True
+                bloque = bloque.iloc[:restantes]
+            restantes -= len(bloque)
+            presentes.update(bloque.rename(columns=DataCleaner.COLUMN_MAPPING).columns)
+            yield bloque
+
+    with engine.connect() as conn:
+        conn.execute(text("SET TRANSACTION READ ONLY"))
+
+        # Mismo descarte entre bloques que procesar_archivo
+        bloques_limpios = limpiar_bloques_sin_repetidos(bloques_muestra(), anio_archivo, procesos)
+        for filas_leidas, limpio, stats, advertencias in bloques_limpios:
+            cleaner.acumular(stats, advertencias)
+            perfil['filas_leidas'] += filas_leidas
+            perfil['registros_procesados'] += len(limpio)
+
+            for col in columnas:
+                nulos[col] += int(limpio[col].isna().sum()) if col in limpio.columns else len(limpio)
+
+            if 'rfc' in limpio.columns:
+                con_rfc = limpio['rfc'].dropna().astype(str)
+                validos = con_rfc.str.fullmatch(RFC_VALIDO)
+                rfc['validos'] += int(validos.sum())
+                rfc['no_estandar'] += int((~validos).sum())
+                faltan = 5 - len(rfc['ejemplos_no_estandar'])
+                if faltan > 0:
+                    rfc['ejemplos_no_estandar'].extend(con_rfc[~validos].head(faltan))
+
+            if 'anio_fuente' in limpio.columns:
+                for anio, n in limpio['anio_fuente'].value_counts(dropna=False).items():
+                    clave = 'sin_anio' if pd.isna(anio) else str(anio)
+                    anios[clave] = anios.get(clave, 0) + int(n)
+
+            # Misma huella dos veces en el archivo: el índice único solo deja la primera
+            huellas = limpio['huella_contenido']
+            repetidas = (huellas.duplicated() | huellas.isin(huellas_vistas)).to_numpy()
+            huellas_vistas.update(huellas)
+            unicas = limpio[~repetidas]
+
+            existentes, codigos_existentes = conn.execute(text(SQL_EXISTENTES), {
+                'codigos': _a_lista(unicas['codigo_contrato']),
+                'titulos': _a_lista(unicas.get('titulo_contrato', pd.Series(None, index=unicas.index))),
+                'proveedores': _a_lista(unicas.get('proveedor_contratista', pd.Series(None, index=unicas.index))),
+                'huellas': _a_lista(unicas['huella_contenido'])
+            }).one()
+            perfil['duplicados_existentes'] += existentes
+            perfil['codigos_existentes'] += codigos_existentes
+            perfil['duplicados_en_archivo'] += filas_leidas - len(unicas)
+
+        conn.rollback()
+
+    procesados = perfil['registros_procesados']
+    perfil.update({
+        'columnas_faltantes': [c for c in columnas if c not in presentes and c != 'anio_fuente'],
+        'nulos': {c: round(n / procesados, 4) if procesados else 0 for c, n in nulos.items()},
+        'rfc': {
+            **rfc,
+            'vacios': cleaner.stats['rfc_vacios'],
+            'intercambiados': cleaner.stats['rfc_intercambiados']
+        },
+        'fechas_invalidas': cleaner.stats['fechas_invalidas'],
+        'importes_cero': cleaner.stats['importes_cero'],
+        'codigos_generados': cleaner.stats['codigos_generados'],
+        'anios': dict(sorted(anios.items())),
+        'nuevos_estimados': perfil['filas_leidas'] - perfil['duplicados_en_archivo'] - perfil['duplicados_existentes'],
+        'segundos': round(time.time() - inicio, 2)
+    })
+    logger.info(
+        f"Perfil: {perfil['filas_leidas']} filas{' (muestra)' if perfil['muestra'] else ''}, "
+        f"{perfil['nuevos_estimados']} nuevas, {perfil['duplicados_existentes']} ya existentes, "
+        f"{perfil['duplicados_en_archivo']} duplicadas en el archivo en {perfil['segundos']}s"
+    )
+    return perfil
+
+
+# ============================================
+# RECARGA DE UN AÑO COMPLETO
+# ============================================
+
+def _reemplazar_filas(nueva, anio):
+    """
+    Borra el año y copia la tabla nueva en una sola transacción. Las consultas ven
+    el año anterior completo hasta el commit y el nuevo completo después. Retorna
+    (eliminados, insertados); las filas que chocan con otro año (misma huella o
+    llave) se descartan igual que en una carga.
+    """
+    with engine.begin() as conn:
+        eliminados = conn.execute(text("""
+            DELETE FROM contratos.contratos WHERE anio_fuente = :anio
+        """), {'anio': anio}).rowcount
+        insertados = conn.execute(text(f"""
+            INSERT INTO contratos.contratos SELECT * FROM {nueva}
+            ON CONFLICT DO NOTHING
+        """)).rowcount
+        olvidar_anio(conn, anio)
+
+    # El DELETE deja el año anterior como filas muertas
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text("VACUUM (ANALYZE) contratos.contratos"))
+    return eliminados, insertados
+
+
+def recargar_anio(ruta, anio, al_avanzar=None, nombre_archivo=None, procesos=PROCESOS_LIMPIEZA):
+    """
+    Reemplaza todos los contratos de un año con los del archivo sin que las consultas
+    vean el año a medias: el archivo se limpia y carga en una tabla nueva
+    (LIKE contratos.contratos, con los índices únicos para descartar duplicados igual
+    que una carga normal) y al final el DELETE del año y el INSERT de la tabla nueva
+    corren en una sola transacción.
+
+    contratos.contratos no está particionada: su índice único (idx_contratos_huella)
+    deduplica entre todos los años y no incluye anio_fuente, así que no hay
+    partición del año que intercambiar con DETACH/ATTACH.
+
+    Si se cancela o falla, o si el archivo no trae contratos válidos, el año no cambia.
+    Retorna (resumen, cleaner) como procesar_archivo, con 'registros_eliminados'.
+    """
+    anio = int(anio)
+    nueva = f"contratos.recarga_{anio}_{uuid.uuid4().hex[:8]}"
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE {nueva} (LIKE contratos.contratos INCLUDING DEFAULTS)"))
+        for nombre in INDICES_UNICOS:
+            conn.execute(text(sql_indice(nombre, tabla=nueva)))
+
+    try:
+        resumen, cleaner = procesar_archivo(
+            ruta, anio_archivo=str(anio), al_avanzar=al_avanzar,
+            nombre_archivo=nombre_archivo, procesos=procesos, destino=nueva
+        )
+        resumen['registros_eliminados'] = 0
+        if resumen['cancelado']:
+            return resumen, cleaner
+        if resumen['registros_insertados'] == 0:
+            raise ValueError(f"El archivo no tiene contratos válidos: el año {anio} no se reemplazó")
+
+        eliminados, insertados = _reemplazar_filas(nueva, anio)
+        resumen['registros_eliminados'] = eliminados
+        resumen['registros_duplicados'] += resumen['registros_insertados'] - insertados
+        resumen['registros_insertados'] = insertados
+
+        logger.warning(
+            f"Año {anio} reemplazado: {resumen['registros_eliminados']} registros "
+            f"anteriores, {resumen['registros_insertados']} nuevos"
+        )
+        return resumen, cleaner
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {nueva}"))
+
+
+# ============================================
+# TRABAJOS EN SEGUNDO PLANO (scripts/worker_trabajos.py)
+# ============================================
+
+def _reportar_carga(trabajo):
+    """al_avanzar para procesar_archivo que guarda los contadores en el trabajo"""
+    def al_avanzar(resumen):
+        return reportar_progreso(engine, trabajo['id'], {
+            'bloques': resumen['bloques'],
+            'registros_leidos': resumen['registros_leidos'],
+            'registros_procesados': resumen['registros_procesados'],
+            'registros_insertados': resumen['registros_insertados'],
+            'registros_actualizados': resumen['registros_actualizados'],
+            'registros_duplicados': resumen['registros_duplicados'],
+            'registros_con_errores': resumen['registros_con_errores']
+        })
+    return al_avanzar
+
+
+def ejecutar_trabajo_carga(trabajo):
+    """
+    Carga el archivo de un trabajo 'carga' reportando progreso por bloque.
+    Retorna (estado, resultado) para terminar_trabajo.
+    """
+    parametros = trabajo['parametros']
+    ruta = parametros['ruta']
+    logger.info(f"Trabajo {trabajo['id']}: cargando {parametros.get('nombre_archivo')} (usuario: {trabajo['usuario']})")
+    al_avanzar = _reportar_carga(trabajo)
+
+    # Verificar columnas (huella_contenido) antes de cargar; los índices faltantes se encolan
+    indices = verificar_indices(usuario=trabajo['usuario'])
+
+    try:
+        resumen, cleaner = procesar_archivo(
+            ruta,
+            anio_archivo=parametros.get('anio_archivo'),
+            al_avanzar=al_avanzar,
+            nombre_archivo=parametros.get('nombre_archivo'),
+            forzar=parametros.get('forzar', False),
+            actualizar=parametros.get('actualizar', False)
+        )
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    # Actualizar rollups de los años cargados (también si se canceló: los bloques cargados se quedan).
+    # Incluye los años de bloques de una carga anterior interrumpida que no llegó a este paso.
+    if not resumen['omitido'] and resumen['anios']:
+        actualizar_resumenes(resumen['anios'])
+
+    logger.info(
+        f"Trabajo {trabajo['id']} terminado: {resumen['registros_insertados']} nuevos, "
+        f"{resumen['registros_duplicados']} duplicados, {resumen['registros_con_errores']} errores"
+    )
+
+    resultado = {
+        **resumen,
+        'advertencias': resumir_advertencias(cleaner),
+        'indices_pendientes': [i['nombre'] for i in indices]
+    }
+    return ('cancelado' if resumen['cancelado'] else 'completado'), resultado
+
+
+def ejecutar_trabajo_recarga(trabajo):
+    """
+    Reemplaza un año completo con el archivo de un trabajo 'recarga_anio'
+    (recargar_anio). Retorna (estado, resultado) para terminar_trabajo.
+    """
+    parametros = trabajo['parametros']
+    ruta = parametros['ruta']
+    anio = int(parametros['anio'])
+    logger.warning(
+        f"Trabajo {trabajo['id']}: reemplazando el año {anio} con {parametros.get('nombre_archivo')} "
+        f"(usuario: {trabajo['usuario']})"
+    )
+
+    indices = verificar_indices(usuario=trabajo['usuario'])
+
+    try:
+        resumen, cleaner = recargar_anio(
+            ruta, anio,
+            al_avanzar=_reportar_carga(trabajo),
+            nombre_archivo=parametros.get('nombre_archivo')
+        )
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    # Cancelada: el año no cambió
+    if not resumen['cancelado']:
+        actualizar_resumenes([anio])
+
+    resultado = {
+        **resumen,
+        'advertencias': resumir_advertencias(cleaner),
+        'indices_pendientes': [i['nombre'] for i in indices]
+    }
+    return ('cancelado' if resumen['cancelado'] else 'completado'), resultado
+
+
+# Filas borradas por transacción al limpiar duplicados, y pausa entre lotes (segundos)
+LOTE_DUPLICADOS = int(os.getenv('DUPLICADOS_LOTE', 5000))
+PAUSA_DUPLICADOS = float(os.getenv('DUPLICADOS_PAUSA', 0.1))
+
+
+def ejecutar_trabajo_duplicados(trabajo):
+    """
+    Elimina registros duplicados (misma codigo_contrato, titulo_contrato y
+    proveedor_contratista) sin bloquear las búsquedas: una función de ventana
+    marca las copias sobrantes en una tabla de trabajo y se borran en lotes
+    pequeños por llave, cada uno en su propia transacción corta. De cada grupo se
+    conserva la copia con huella_contenido y, entre ellas, la más antigua.
+
+    También borra los duplicados exactos que anotó scripts/backfill_huellas.py en
+    contratos.huellas_duplicadas (filas sin huella cuya huella ya tiene otra fila),
+    para que no queden filas sin huella y las búsquedas puedan omitir DISTINCT
+    (app/utils/huellas.py).
+    Retorna (estado, resultado) para terminar_trabajo.
+    """
+    tabla = f"contratos.duplicados_trabajo_{trabajo['id']}"
+
+    with engine.begin() as conn:
+        registros_totales = conn.execute(text("SELECT COUNT(*) FROM contratos.contratos")).scalar()
+        con_backfill = conn.execute(text("SELECT to_regclass('contratos.huellas_duplicadas') IS NOT NULL")).scalar()
+        duplicados_backfill = """
+                UNION ALL
+                SELECT c.ctid, c.codigo_contrato, d.huella_contenido
+                FROM contratos.huellas_duplicadas d
+                JOIN contratos.contratos c
+                  ON c.ctid = d.fila AND c.codigo_contrato IS NOT DISTINCT FROM d.codigo_contrato
+                WHERE c.huella_contenido IS NULL
+        """ if con_backfill else ''
+        conn.execute(text(f"DROP TABLE IF EXISTS {tabla}"))
+        # huella_contenido: la huella que ya tiene otra fila (duplicados del backfill), o NULL
+        conn.execute(text(f"""
+            CREATE UNLOGGED TABLE {tabla} AS
+            SELECT ROW_NUMBER() OVER (ORDER BY fila) AS orden, fila, codigo_contrato, huella_contenido
+            FROM (
+                SELECT DISTINCT ON (fila) fila, codigo_contrato, huella_contenido
+                FROM (
+                    SELECT fila, codigo_contrato, NULL::uuid AS huella_contenido
+                    FROM (
+                        SELECT ctid AS fila, codigo_contrato,
+                               ROW_NUMBER() OVER (
+                                   PARTITION BY codigo_contrato, titulo_contrato, proveedor_contratista
+                                   ORDER BY (huella_contenido IS NULL), ctid
+                               ) AS copia
+                        FROM contratos.contratos
+                    ) x
+                    WHERE copia > 1
+                    {duplicados_backfill}
+                ) marcados
+                ORDER BY fila, huella_contenido NULLS LAST
+            ) u
+        """))
+        conn.execute(text(f"CREATE INDEX ON {tabla} (orden)"))
+        conn.execute(text(f"CREATE INDEX ON {tabla} (fila)"))
+        duplicados_encontrados = conn.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+
+    logger.info(f"Trabajo {trabajo['id']}: {duplicados_encontrados} duplicados en {registros_totales} registros")
+    reportar_progreso(engine, trabajo['id'], {
+        'registros_totales': registros_totales,
+        'duplicados_encontrados': duplicados_encontrados,
+        'registros_eliminados': 0
+    })
+
+    registros_eliminados = 0
+    cancelado = completo = False
+    try:
+        for desde in range(1, duplicados_encontrados + 1, LOTE_DUPLICADOS):
+            with engine.begin() as conn:
+                # Solo se borra una copia si sigue existiendo otra fuera de la tabla de trabajo
+                # (protege contra ctid reutilizados después de la marca); un duplicado del
+                # backfill, si sigue sin huella y otra fila tiene la suya
+                registros_eliminados += conn.execute(text(f"""
+                    DELETE FROM contratos.contratos c
+                    USING {tabla} d
+                    WHERE d.orden BETWEEN :desde AND :hasta
+                      AND c.ctid = d.fila
+                      AND c.codigo_contrato IS NOT DISTINCT FROM d.codigo_contrato
+                      AND CASE
+                          WHEN d.huella_contenido IS NULL THEN EXISTS (
+                              SELECT 1 FROM contratos.contratos o
+                              WHERE o.codigo_contrato = c.codigo_contrato
+                                AND o.titulo_contrato IS NOT DISTINCT FROM c.titulo_contrato
+                                AND o.proveedor_contratista IS NOT DISTINCT FROM c.proveedor_contratista
+                                AND o.ctid <> c.ctid
+                                AND NOT EXISTS (SELECT 1 FROM {tabla} w WHERE w.fila = o.ctid)
+                          )
+                          ELSE c.huella_contenido IS NULL AND EXISTS (
+                              SELECT 1 FROM contratos.contratos o
+                              WHERE o.huella_contenido = d.huella_contenido
+                          )
+                      END
+                """), {'desde': desde, 'hasta': desde + LOTE_DUPLICADOS - 1}).rowcount
+
+            if reportar_progreso(engine, trabajo['id'], {'registros_eliminados': registros_eliminados}):
+                logger.warning(f"Trabajo {trabajo['id']}: limpieza cancelada con {registros_eliminados} eliminados")
+                cancelado = True
+                break
+            time.sleep(PAUSA_DUPLICADOS)
+        completo = not cancelado
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {tabla}"))
+            if con_backfill and completo:
+                # Anotaciones atendidas; una fila que no se pudo borrar (su gemela ya no existe)
+                # recibe su huella en el siguiente backfill
+                conn.execute(text("DELETE FROM contratos.huellas_duplicadas"))
+
+    if registros_eliminados:
+        # VACUUM no puede correr en una transacción
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("VACUUM (ANALYZE) contratos.contratos"))
+        logger.info("✅ VACUUM ANALYZE de contratos.contratos completado")
+
+        # Los duplicados eliminados afectan todos los años: reconstruir rollups completos
+        actualizar_resumenes()
+
+    resultado = {
+        'registros_totales': registros_totales,
+        'duplicados_encontrados': duplicados_encontrados,
+        'registros_eliminados': registros_eliminados,
+        'registros_finales': registros_totales - registros_eliminados
+    }
+    logger.warning(
+        f"Trabajo {trabajo['id']}: {registros_eliminados} de {duplicados_encontrados} duplicados eliminados "
+        f"(usuario: {trabajo['usuario']})"
+    )
+    return ('cancelado' if cancelado else 'completado'), resultado
+
+
+def ejecutar_trabajo_indices(trabajo):
+    """
+    Construye con CREATE INDEX CONCURRENTLY los índices faltantes o inválidos,
+    reportando el avance de pg_stat_progress_create_index.
+    Retorna (estado, resultado) para terminar_trabajo.
+    """
+    def al_avanzar(progreso):
+        return reportar_progreso(engine, trabajo['id'], progreso)
+
+    resultado = construir_pendientes(engine, al_avanzar=al_avanzar)
+
+    logger.info(
+        f"Trabajo {trabajo['id']}: {len(resultado['construidos'])} de {len(resultado['pendientes'])} "
+        f"índices construidos, {len(resultado['fallidos'])} fallidos"
+    )
+    if resultado['cancelado']:
+        return 'cancelado', resultado
+    return ('error' if resultado['fallidos'] else 'completado'), resultado
+
+
+# Tipo de trabajo -> función que lo ejecuta y retorna (estado, resultado)
+EJECUTORES_TRABAJO = {
+    'carga': ejecutar_trabajo_carga,
+    'recarga_anio': ejecutar_trabajo_recarga,
+    'limpieza_duplicados': ejecutar_trabajo_duplicados,
+    'indices': ejecutar_trabajo_indices
+}
+
+
 # ============================================
 # RUTAS DE AUTENTICACIÓN
 # ============================================
@@ -959,6 +2422,20 @@ def get_stats():
     try:
         db_session = Session()
 
+        # Primero intentar desde la vista materializada (refrescada en cada carga)
+        try:
+            stats = leer_estadisticas(db_session)
+            if stats is not None:
+                db_session.close()
+                return jsonify({
+                    'total_contratos': stats['total_contratos'],
+                    'ultimo_anio': stats['ultimo_anio'],
+                    'ultima_actualizacion': stats['ultima_actualizacion']
+                })
+        except Exception as e:
+            logger.warning(f"stats_summary no disponible, calculando sobre la tabla: {e}")
+            db_session.rollback()
+
         result = db_session.execute(text("SELECT COUNT(*) FROM contratos.contratos"))
         total_contratos = result.scalar()
 
@@ -993,7 +2470,11 @@ def get_stats():
 @app.route('/api/upload', methods=['POST'])
 @login_required
 def upload_file():
-    """Sube y procesa un archivo CSV con limpieza inteligente"""
+    """
+    Sube un archivo (CSV, .csv.gz, .zip o Parquet) y encola su carga; el worker lo limpia
+    e inserta en segundo plano. Con perfil=1 solo lo analiza (perfilar_archivo) y
+    responde el reporte sin cargar nada.
+    """
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No se proporcionó ningún archivo'}), 400
@@ -1003,181 +2484,119 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'Nombre de archivo vacío'}), 400
 
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'El archivo debe ser CSV'}), 400
+        formato = formato_archivo(file.filename)
+        if formato is None:
+            return jsonify({'error': f"El archivo debe ser {', '.join(FORMATOS_CARGA)}"}), 400
 
-        username = session.get('username', 'unknown')
-        logger.info(f"Procesando archivo: {file.filename} (usuario: {username})")
+        if formato == '.parquet' and pq is None:
+            return jsonify({'error': 'El servidor no tiene pyarrow instalado para leer Parquet'}), 400
 
-        # Guardar temporalmente
-        temp_path = f"/tmp/{uuid.uuid4().hex}.csv"
-        file.save(temp_path)
+        username = session.get('username', 'unknown')
+        logger.info(f"Recibiendo archivo: {file.filename} (usuario: {username})")
 
-        # Detectar encoding
-        encoding = DataCleaner.detectar_encoding(temp_path)
+        # Guardar en el directorio compartido con el worker (comprimido tal cual llegó)
+        os.makedirs(CARGA_DIR, exist_ok=True)
+        ruta = os.path.join(CARGA_DIR, f"{uuid.uuid4().hex}{formato}")
+        file.save(ruta)
 
-        # Leer CSV con encoding correcto
-        try:
-            df = pd.read_csv(temp_path, encoding=encoding)
-        except Exception as e:
-            # Intentar con encoding alternativo
-            logger.warning(f"Error con {encoding}, intentando latin-1: {e}")
-            df = pd.read_csv(temp_path, encoding='latin-1')
-
-        logger.info(f"Archivo leído: {len(df)} filas, {len(df.columns)} columnas")
-
-        # Extraer año del nombre del archivo (ej: contratos_comprasmx_2025.csv -> 2025)
-        anio_archivo = None
-        import re
-        match = re.search(r'(\d{4})', file.filename)
-        if match:
-            anio_archivo = match.group(1)
+        anio_archivo = anio_de_nombre(file.filename)
+        if anio_archivo:
             logger.info(f"Año extraído del nombre del archivo: {anio_archivo}")
 
-        # Limpiar datos
-        cleaner = DataCleaner()
-        df_limpio = cleaner.limpiar_dataframe(df, anio_archivo=anio_archivo)
-
-        # Insertar en base de datos
-        db_session = Session()
-        registros_insertados = 0
-        registros_duplicados = 0
-        registros_con_errores = 0
-
-        # Obtener solo las columnas que existen en el DataFrame limpio
-        columnas_disponibles = [col for col in df_limpio.columns if col in DataCleaner.COLUMN_MAPPING.values()]
-
-        logger.info(f"Columnas a insertar: {columnas_disponibles}")
-
-        for _, row in df_limpio.iterrows():
+        if request.form.get('perfil') == '1':
+            # Ensayo: se perfila en la misma petición y no se encola ninguna carga.
+            # Limpia en el proceso del worker web (sin pool de procesos); el perfil
+            # está acotado a PERFIL_MAX_FILAS filas
             try:
-                # Filtrar solo las columnas disponibles
-                datos = {col: row[col] for col in columnas_disponibles if col in row.index and pd.notna(row[col])}
-
-                # Agregar timestamp de carga
-                datos['created_at'] = datetime.now()
-
-                if not datos.get('codigo_contrato'):
-                    logger.error("Registro sin codigo_contrato, saltando")
-                    registros_con_errores += 1
-                    continue
-
-                # Construir query dinámico
-                columnas = ', '.join(datos.keys())
-                placeholders = ', '.join([f":{col}" for col in datos.keys()])
-
-                query = text(f"""
-                    INSERT INTO contratos.contratos ({columnas})
-                    VALUES ({placeholders})
-                    ON CONFLICT (codigo_contrato, titulo_contrato, proveedor_contratista) DO NOTHING
-                """)
-
-                result = db_session.execute(query, datos)
-
-                # Si rowcount es 0, fue duplicado
-                if result.rowcount == 0:
-                    registros_duplicados += 1
-                else:
-                    registros_insertados += 1
-
-                # Commit cada 100 registros
-                if (registros_insertados + registros_duplicados) % 100 == 0:
-                    db_session.commit()
-                    logger.info(f"Procesados {registros_insertados + registros_duplicados} registros")
+                perfil = perfilar_archivo(ruta, anio_archivo=anio_archivo, procesos=1)
+            finally:
+                os.remove(ruta)
+            return jsonify({'message': 'Archivo analizado, no se cargó nada', 'perfil': perfil}), 200
+
+        if request.form.get('reemplazar_anio') == '1':
+            if not anio_archivo:
+                os.remove(ruta)
+                return jsonify({'error': 'Para reemplazar un año, el nombre del archivo debe incluirlo (ej. contratos_2024.csv)'}), 400
+
+            trabajo_id = encolar_trabajo(engine, 'recarga_anio', {
+                'ruta': ruta,
+                'nombre_archivo': file.filename,
+                'anio': anio_archivo
+            }, usuario=username)
+            logger.warning(f"Reemplazo del año {anio_archivo} con {file.filename} encolado como trabajo {trabajo_id}")
+
+            return jsonify({
+                'message': f'Archivo recibido, el año {anio_archivo} se reemplaza en segundo plano',
+                'trabajo_id': trabajo_id
+            }), 202
+
+        trabajo_id = encolar_trabajo(engine, 'carga', {
+            'ruta': ruta,
+            'nombre_archivo': file.filename,
+            'anio_archivo': anio_archivo,
+            # Recargar aunque el manifiesto diga que el archivo ya se cargó completo
+            'forzar': request.form.get('forzar') == '1',
+            # Actualizar los contratos existentes cuyo contenido cambió
+            'actualizar': request.form.get('actualizar') == '1'
+        }, usuario=username)
+
+        logger.info(f"Carga de {file.filename} encolada como trabajo {trabajo_id}")
 
-            except Exception as e:
-                logger.error(f"Error al insertar registro: {e}")
-                registros_con_errores += 1
-                # IMPORTANTE: Hacer rollback para limpiar el estado de la transacción
-                try:
-                    db_session.rollback()
-                except:
-                    pass
-
-        db_session.commit()
-        db_session.close()
-
-        # Limpiar archivo temporal
-        os.remove(temp_path)
+        return jsonify({
+            'message': 'Archivo recibido, la carga se procesa en segundo plano',
+            'trabajo_id': trabajo_id
+        }), 202
 
-        # Verificar/crear índices FTS para búsquedas rápidas
-        verificar_indices()
+    except Exception as e:
+        logger.error(f"Error al recibir archivo: {e}", exc_info=True)
+        return jsonify({'error': str(e), 'detalles': 'Ver logs del servidor'}), 500
 
-        # Preparar advertencias
-        advertencias_lista = cleaner.advertencias[:10]  # Solo primeras 10
-        if cleaner.stats['rfc_intercambiados'] > 0:
-            advertencias_lista.append(f"{cleaner.stats['rfc_intercambiados']} RFC/Proveedor intercambiados corregidos")
-        if cleaner.stats['rfc_vacios'] > 0:
-            advertencias_lista.append(f"{cleaner.stats['rfc_vacios']} registros sin RFC")
-        if cleaner.stats['importes_cero'] > 0:
-            advertencias_lista.append(f"{cleaner.stats['importes_cero']} contratos con importe $0")
-        if cleaner.stats['codigos_generados'] > 0:
-            advertencias_lista.append(f"{cleaner.stats['codigos_generados']} códigos generados automáticamente")
 
-        logger.info(f"Carga completada por {username}: {registros_insertados} nuevos, {registros_duplicados} duplicados, {registros_con_errores} errores")
+@app.route('/api/jobs/<int:trabajo_id>', methods=['GET'])
+@login_required
+def get_job(trabajo_id):
+    """Estado y progreso de un trabajo en segundo plano"""
+    try:
+        trabajo = obtener_trabajo(engine, trabajo_id)
+        if trabajo is None:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+        return jsonify(trabajo)
+    except Exception as e:
+        logger.error(f"Error al consultar trabajo {trabajo_id}: {e}")
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            'message': 'Archivo procesado exitosamente',
-            'registros_procesados': len(df_limpio),
-            'registros_insertados': registros_insertados,
-            'registros_duplicados': registros_duplicados,
-            'registros_con_errores': registros_con_errores,
-            'advertencias': advertencias_lista
-        })
 
+@app.route('/api/jobs/<int:trabajo_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(trabajo_id):
+    """Cancela un trabajo pendiente o solicita detener uno en proceso"""
+    try:
+        estado = cancelar_trabajo(engine, trabajo_id)
+        if estado is None:
+            return jsonify({'error': 'El trabajo no existe o ya terminó'}), 409
+        logger.warning(f"Cancelación del trabajo {trabajo_id} solicitada por {session.get('username', 'unknown')}")
+        return jsonify({'message': 'Cancelación solicitada', 'estado': estado})
     except Exception as e:
-        logger.error(f"Error al procesar archivo: {e}", exc_info=True)
-        return jsonify({'error': str(e), 'detalles': 'Ver logs del servidor'}), 500
+        logger.error(f"Error al cancelar trabajo {trabajo_id}: {e}")
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/clear', methods=['POST'])
 @login_required
 def clear_duplicates():
-    """Elimina registros duplicados conservando solo una copia de cada contrato"""
+    """Encola la eliminación de duplicados (por lotes, en segundo plano)"""
     try:
         username = session.get('username', 'unknown')
-        db_session = Session()
-
-        # Contar registros antes
-        result = db_session.execute(text("SELECT COUNT(*) FROM contratos.contratos"))
-        registros_totales = result.scalar()
-
-        # Eliminar duplicados usando el índice compuesto (codigo_contrato, titulo_contrato, proveedor_contratista)
-        # Conserva el registro con el ctid más pequeño (el más antiguo)
-        query_delete = text("""
-            DELETE FROM contratos.contratos
-            WHERE ctid NOT IN (
-                SELECT MIN(ctid)
-                FROM contratos.contratos
-                GROUP BY codigo_contrato, titulo_contrato, proveedor_contratista
-            )
-        """)
-
-        result = db_session.execute(query_delete)
-        registros_eliminados = result.rowcount
-
-        db_session.commit()
-
-        # Contar registros después
-        result = db_session.execute(text("SELECT COUNT(*) FROM contratos.contratos"))
-        registros_finales = result.scalar()
-
-        db_session.close()
-
-        duplicados_encontrados = registros_totales - registros_finales
-
-        logger.warning(f"Duplicados eliminados por {username}: {registros_eliminados} de {duplicados_encontrados} duplicados")
+        trabajo_id = encolar_trabajo(engine, 'limpieza_duplicados', usuario=username)
+        logger.warning(f"Limpieza de duplicados encolada por {username} como trabajo {trabajo_id}")
 
         return jsonify({
-            'message': 'Duplicados eliminados exitosamente',
-            'registros_totales': registros_totales,
-            'duplicados_encontrados': duplicados_encontrados,
-            'registros_eliminados': registros_eliminados,
-            'registros_finales': registros_finales
-        })
+            'message': 'Limpieza de duplicados en cola',
+            'trabajo_id': trabajo_id
+        }), 202
 
     except Exception as e:
-        logger.error(f"Error al eliminar duplicados: {e}")
+        logger.error(f"Error al encolar la limpieza de duplicados: {e}")
         return jsonify({'error': str(e)}), 500
 
 
@@ -209,6 +209,14 @@ def create_app(config_name=None):
     from app.api.contracts import contracts_bp
     app.register_blueprint(contracts_bp, url_prefix='/api')
 
+    # Blueprint de API de perfiles de proveedores
+    from app.api.proveedores import proveedores_bp
+    app.register_blueprint(proveedores_bp, url_prefix='/api')
+
+    # Blueprint de API de perfiles de instituciones
+    from app.api.instituciones import instituciones_bp
+    app.register_blueprint(instituciones_bp, url_prefix='/api')
+
     # Blueprint de autenticacion
     from app.auth import auth_bp
     app.register_blueprint(auth_bp)
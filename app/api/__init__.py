@@ -3,5 +3,7 @@
 from .search import search_bp
 from .contracts import contracts_bp
 from .stats import stats_bp
+from .proveedores import proveedores_bp
+from .instituciones import instituciones_bp
 
-__all__ = ['search_bp', 'contracts_bp', 'stats_bp']
\ No newline at end of file
+__all__ = ['search_bp', 'contracts_bp', 'stats_bp', 'proveedores_bp', 'instituciones_bp']
\ No newline at end of file
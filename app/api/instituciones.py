@@ -0,0 +1,23 @@
+# app/api/instituciones.py
+
+from flask import Blueprint, jsonify
+from app.services.institucion_service import InstitucionService
+from app import db
+import logging
+
+instituciones_bp = Blueprint('instituciones', __name__)
+logger = logging.getLogger(__name__)
+
+@instituciones_bp.route('/instituciones/<path:siglas>', methods=['GET'])
+def get_perfil_institucion(siglas):
+    """Perfil de gasto y concentración de proveedores de una institución, desde perfil_instituciones"""
+    try:
+        perfil = InstitucionService().obtener_perfil(siglas.strip())
+        if perfil is None:
+            return jsonify({'error': 'Institución no encontrada'}), 404
+        return jsonify(perfil)
+
+    except Exception as e:
+        logger.error(f"Error obteniendo perfil de institución: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Error al obtener el perfil de la institución'}), 500
@@ -0,0 +1,23 @@
+# app/api/proveedores.py
+
+from flask import Blueprint, jsonify
+from app.services.proveedor_service import ProveedorService
+from app import db
+import logging
+
+proveedores_bp = Blueprint('proveedores', __name__)
+logger = logging.getLogger(__name__)
+
+@proveedores_bp.route('/proveedores/<path:clave>', methods=['GET'])
+def get_perfil_proveedor(clave):
+    """Perfil de un proveedor por RFC (o nombre si no tiene RFC válido), desde resumen_proveedores"""
+    try:
+        perfil = ProveedorService().obtener_perfil(clave.strip())
+        if perfil is None:
+            return jsonify({'error': 'Proveedor no encontrado'}), 404
+        return jsonify(perfil)
+
+    except Exception as e:
+        logger.error(f"Error obteniendo perfil de proveedor: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Error al obtener el perfil del proveedor'}), 500
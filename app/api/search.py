@@ -6,6 +6,9 @@ from app.models import Contrato, HistorialBusqueda
 from app.services.search_service import SearchService
 from app.services.aggregation_service import AggregationService
 from app.services.filter_service import FilterService
+from app.services.rollup_service import RollupService
+from app.services.exploracion_service import ExploracionService
+from app.utils.huellas import huellas_completas
 from app import db
 from sqlalchemy import func, case, and_
 import logging
@@ -79,18 +82,31 @@ def search():
 
         logger.info(f"Búsqueda: {query_text}, campos: {search_fields or search_type}, filtros: {filters}, página: {page}, orden: {sort_order}")
 
+        # Si la búsqueda es expresable sobre las dimensiones del rollup (RFC + filtros),
+        # agregados y filtros disponibles se responden desde la tabla pre-agregada
+        rollup_service = RollupService()
+        rfc_rollup = rollup_service.clave_expresable(query_text, search_type, search_fields)
+        usar_rollup = (
+            rfc_rollup is not None
+            and rollup_service.filtros_expresables(filters)
+            and rollup_service.disponible()
+        )
+
         # 1. Obtener agregados COMPLETOS de TODOS los resultados
         # IMPORTANTE: Pasamos los parámetros para que cada agregación use query fresca
         aggregation_service = AggregationService()
         try:
-            agregados = aggregation_service.obtener_agregados_optimizado(
-                base_query,
-                search_service=search_service,
-                query_text=query_text,
-                search_type=search_type,
-                search_fields=search_fields,
-                filters=filters
-            )
+            if usar_rollup:
+                agregados = rollup_service.obtener_agregados(filters, rfc=rfc_rollup)
+            else:
+                agregados = aggregation_service.obtener_agregados_optimizado(
+                    base_query,
+                    search_service=search_service,
+                    query_text=query_text,
+                    search_type=search_type,
+                    search_fields=search_fields,
+                    filters=filters
+                )
             logger.debug(f"Agregados obtenidos: total={agregados['total_contratos']}")
         except Exception as agg_error:
             logger.error(f"Error en agregados: {str(agg_error)}")
@@ -118,8 +134,10 @@ def search():
         if filters:
             base_query = search_service.apply_filters(base_query, filters)
 
-        # Asegurar que no haya duplicados (pueden existir por datos duplicados en BD)
-        base_query = base_query.distinct()
+        # Asegurar que no haya duplicados mientras queden filas legadas sin huella
+        # (con todas las huellas el índice único ya lo garantiza; ver app/utils/huellas.py)
+        if not huellas_completas(db.session):
+            base_query = base_query.distinct()
 
         # 2. Aplicar ordenamiento según el parámetro
         if sort_order == 'monto_desc':
@@ -130,6 +148,8 @@ def search():
             base_query = base_query.order_by(Contrato.fecha_inicio_contrato.desc().nullslast())
         elif sort_order == 'fecha_asc':
             base_query = base_query.order_by(Contrato.fecha_inicio_contrato.asc().nullsfirst())
+        elif sort_order == 'riesgo_desc':
+            base_query = base_query.order_by(Contrato.riesgo_puntaje.desc().nullslast(), Contrato.importe.desc().nullslast())
         # 'relevancia' no tiene ordenamiento específico (orden natural de la query)
 
         # 3. Aplicar paginación
@@ -187,14 +207,16 @@ def search():
             raise  # Re-lanzar para que sea capturado por el except principal
 
         # 4. Obtener filtros disponibles
-        # Reconstruir query base sin ordenamiento ni paginación para los filtros
+        # Reconstruir query base sin filtros, ordenamiento ni paginación: los filtros se
+        # pasan aparte para que cada faceta se cuente como si su selección no existiera
         filter_query = search_service.build_search_query(query_text, search_type, search_fields)
-        if filters:
-            filter_query = search_service.apply_filters(filter_query, filters)
 
         filter_service = FilterService()
         try:
-            filtros_disponibles = filter_service.obtener_filtros_disponibles(filter_query)
+            if usar_rollup:
+                filtros_disponibles = rollup_service.obtener_filtros_disponibles(filters, rfc=rfc_rollup)
+            else:
+                filtros_disponibles = filter_service.obtener_filtros_disponibles(filter_query, filters)
         except Exception as filter_error:
             logger.error(f"Error obteniendo filtros: {str(filter_error)}")
             try:
@@ -214,6 +236,8 @@ def search():
             'proveedores': agregados['top_proveedores'],
             'instituciones': agregados['top_instituciones'],
             'contratos_por_anio': agregados.get('contratos_por_anio', []),
+            # Serie mensual: desde el snapshot columnar o el cubo mensual ([] si no es expresable)
+            'contratos_por_mes': agregados.get('contratos_por_mes', []),
             'contratos': [c.to_dict() for c in contratos],
             'filtros_disponibles': filtros_disponibles,
             'page': page,
@@ -249,6 +273,32 @@ def search():
         except:
             pass
 
+@search_bp.route('/explorar', methods=['POST'])
+def explorar():
+    """Exploración solo por filtros (ej. IMSS + 2023 + licitación pública) sin término de búsqueda"""
+    try:
+        start_time = time.time()
+        data = request.get_json(silent=True) or {}
+        filters = data.get('filters', {})
+
+        resultado = ExploracionService().explorar(filters)
+
+        elapsed_time = time.time() - start_time
+        resultado['tiempo_busqueda'] = f"{elapsed_time:.3f}s"
+        logger.info(f"Exploración: filtros={filters}, total={resultado['total']}, {elapsed_time * 1000:.1f} ms")
+
+        return jsonify(resultado)
+
+    except Exception as e:
+        logger.error(f"Error en exploración: {str(e)}", exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': 'Error al explorar contratos'}), 500
+    finally:
+        try:
+            db.session.remove()
+        except:
+            pass
+
 @search_bp.route('/aggregates', methods=['POST'])
 def get_aggregates_only():
     """Obtiene solo los agregados de TODOS los resultados"""
@@ -454,6 +504,8 @@ def get_all_contracts():
             base_query = base_query.order_by(Contrato.fecha_inicio.desc().nullslast())
         elif sort_order == 'fecha_asc':
             base_query = base_query.order_by(Contrato.fecha_inicio.asc().nullsfirst())
+        elif sort_order == 'riesgo_desc':
+            base_query = base_query.order_by(Contrato.riesgo_puntaje.desc().nullslast(), Contrato.importe.desc().nullslast())
 
         # Limitar a 1000 contratos para evitar problemas de memoria
         contratos = base_query.limit(1000).all()
@@ -1,7 +1,9 @@
 # app/api/stats.py
 
-from flask import Blueprint, jsonify
-from app.services.aggregation_service import AggregationService
+from flask import Blueprint, request, jsonify
+from app.services.stats_service import StatsService
+from app.services.cardinalidad_service import CardinalidadService
+from app import db
 import logging
 
 stats_bp = Blueprint('stats', __name__)
@@ -9,12 +11,34 @@ logger = logging.getLogger(__name__)
 
 @stats_bp.route('/stats', methods=['GET'])
 def get_stats():
-    """Obtiene estadísticas generales de la base de datos"""
+    """Obtiene estadísticas generales de la base de datos (desde contratos.stats_summary)"""
     try:
-        aggregation_service = AggregationService()
-        stats = aggregation_service.get_stats()
+        stats_service = StatsService()
+        stats = stats_service.obtener_estadisticas()
         return jsonify(stats)
         
     except Exception as e:
         logger.error(f"Error obteniendo estadísticas: {str(e)}")
-        return jsonify({'error': 'Error al obtener estadísticas'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Error al obtener estadísticas'}), 500
+
+
+@stats_bp.route('/stats/cardinalidades', methods=['POST'])
+def get_cardinalidades():
+    """
+    Conteos distintos aproximados (HyperLogLog) de proveedores y empresas para
+    una rebanada de filtros (instituciones, tipos, años), con su error relativo
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        filters = data.get('filters', {})
+
+        cardinalidad_service = CardinalidadService()
+        if not cardinalidad_service.es_expresable(filters):
+            return jsonify({'error': 'Solo se admiten filtros por institución, tipo y año'}), 400
+
+        return jsonify(cardinalidad_service.obtener_cardinalidades(filters))
+
+    except Exception as e:
+        logger.error(f"Error obteniendo cardinalidades: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Error al obtener cardinalidades'}), 500
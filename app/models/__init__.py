@@ -2,5 +2,6 @@
 
 from .contrato import Contrato
 from .usuario import Usuario, SesionActiva, HistorialBusqueda, LogAcceso
+from .rollup import RollupContrato, RollupHLL, CuboMensual, ResumenProveedor, PerfilInstitucion
 
-__all__ = ['Contrato', 'Usuario', 'SesionActiva', 'HistorialBusqueda', 'LogAcceso']
+__all__ = ['Contrato', 'Usuario', 'SesionActiva', 'HistorialBusqueda', 'LogAcceso', 'RollupContrato', 'RollupHLL', 'CuboMensual', 'ResumenProveedor', 'PerfilInstitucion']
@@ -1,6 +1,7 @@
 # app/models/contrato.py
 from app import db
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import UUID
 
 class Contrato(db.Model):
     """Modelo de Contrato"""
@@ -30,6 +31,12 @@ class Contrato(db.Model):
     # ⭐ NUEVO: Agregar columna de año de fundación
     anio_fundacion_empresa = db.Column(db.Integer)
 
+    # Puntaje de riesgo 0-100 (scripts/calcular_riesgo.py); NULL = no calculado
+    riesgo_puntaje = db.Column(db.SmallInteger)
+
+    # md5 de los campos de negocio (DataCleaner.huella_contenido); índice único
+    huella_contenido = db.Column(UUID(as_uuid=False))
+
     # Fecha de carga del registro (para saber cuándo se subió)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -67,7 +74,8 @@ class Contrato(db.Model):
             
             # ⭐ NUEVOS CAMPOS AGREGADOS
             'direccion_anuncio': self.direccion_anuncio,
-            'anio_fundacion_empresa': self.anio_fundacion_empresa
+            'anio_fundacion_empresa': self.anio_fundacion_empresa,
+            'riesgo_puntaje': self.riesgo_puntaje
         }
     
     def __repr__(self):
@@ -0,0 +1,113 @@
+# app/models/rollup.py
+from sqlalchemy.dialects.postgresql import JSONB
+from app import db
+
+
+class RollupContrato(db.Model):
+    """Celda del rollup pre-agregado de contratos (ver migrations/create_rollup_tables.sql)"""
+    __tablename__ = 'rollup_contratos'
+    __table_args__ = {'schema': 'contratos'}
+
+    id = db.Column(db.BigInteger, primary_key=True)
+
+    # Dimensiones
+    rfc_group_key = db.Column(db.Text)
+    clave_es_rfc = db.Column(db.Boolean, default=False)
+    siglas_institucion = db.Column(db.Text)
+    anio_fuente = db.Column(db.Integer)
+    tipo_contratacion = db.Column(db.Text)
+    tipo_procedimiento = db.Column(db.Text)
+    estatus_contrato = db.Column(db.Text)
+    institucion_nombre = db.Column(db.Text)
+
+    # Medidas
+    num_contratos = db.Column(db.BigInteger, default=0)
+    monto_total = db.Column(db.Numeric)
+
+    # Atributos descriptivos
+    proveedor_nombre = db.Column(db.Text)
+    rfc = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<RollupContrato {self.rfc_group_key} {self.siglas_institucion} {self.anio_fuente}>'
+
+
+class RollupHLL(db.Model):
+    """Sketches HyperLogLog por celda año × institución × tipo (ver app/utils/hll.py)"""
+    __tablename__ = 'rollup_hll'
+    __table_args__ = {'schema': 'contratos'}
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    anio_fuente = db.Column(db.Integer)
+    siglas_institucion = db.Column(db.Text)
+    tipo_contratacion = db.Column(db.Text)
+    num_contratos = db.Column(db.BigInteger, default=0)
+    hll_proveedores = db.Column(db.LargeBinary, nullable=False)
+    hll_empresas = db.Column(db.LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f'<RollupHLL {self.anio_fuente} {self.siglas_institucion} {self.tipo_contratacion}>'
+
+
+class CuboMensual(db.Model):
+    """Celda del cubo mensual mes × institución × procedimiento × proveedor"""
+    __tablename__ = 'cubo_mensual'
+    __table_args__ = {'schema': 'contratos'}
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    mes = db.Column(db.Date, nullable=False)
+    anio_fuente = db.Column(db.Integer)
+    siglas_institucion = db.Column(db.Text)
+    tipo_procedimiento = db.Column(db.Text)
+    rfc_group_key = db.Column(db.Text)
+    clave_es_rfc = db.Column(db.Boolean, default=False)
+    num_contratos = db.Column(db.BigInteger, default=0)
+    monto_total = db.Column(db.Numeric)
+
+    def __repr__(self):
+        return f'<CuboMensual {self.mes} {self.siglas_institucion} {self.rfc_group_key}>'
+
+
+class ResumenProveedor(db.Model):
+    """Perfil pre-calculado de un proveedor (ver migrations/create_perfiles_tables.sql)"""
+    __tablename__ = 'resumen_proveedores'
+    __table_args__ = {'schema': 'contratos'}
+
+    rfc_group_key = db.Column(db.Text, primary_key=True)
+    clave_es_rfc = db.Column(db.Boolean, primary_key=True, default=False)
+    nombre = db.Column(db.Text)
+    rfc = db.Column(db.Text)
+    num_contratos = db.Column(db.BigInteger, default=0)
+    monto_total = db.Column(db.Numeric)
+    primer_contrato = db.Column(db.Date)
+    ultimo_contrato = db.Column(db.Date)
+    por_anio = db.Column(JSONB)
+    top_instituciones = db.Column(JSONB)
+    tipos_procedimiento = db.Column(JSONB)
+    contratos_mayores = db.Column(JSONB)
+    actualizado_en = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ResumenProveedor {self.rfc_group_key}>'
+
+
+class PerfilInstitucion(db.Model):
+    """Perfil de gasto y concentración por institución y año (anio_fuente NULL = todo el periodo)"""
+    __tablename__ = 'perfil_instituciones'
+    __table_args__ = {'schema': 'contratos'}
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    siglas_institucion = db.Column(db.Text, nullable=False)
+    anio_fuente = db.Column(db.Integer)
+    institucion_nombre = db.Column(db.Text)
+    num_contratos = db.Column(db.BigInteger, default=0)
+    monto_total = db.Column(db.Numeric)
+    num_proveedores = db.Column(db.BigInteger, default=0)
+    top10_share = db.Column(db.Numeric)
+    hhi = db.Column(db.Numeric)
+    adjudicacion_directa_share = db.Column(db.Numeric)
+    adjudicacion_directa_contratos_share = db.Column(db.Numeric)
+    actualizado_en = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<PerfilInstitucion {self.siglas_institucion} {self.anio_fuente}>'
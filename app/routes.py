@@ -5,6 +5,7 @@ from app import db
 from sqlalchemy import func, text
 from datetime import datetime, timedelta
 import threading
+from app.utils.version_datos import version_datos
 
 main_bp = Blueprint('main', __name__)
 
@@ -12,6 +13,8 @@ main_bp = Blueprint('main', __name__)
 _stats_cache = {
     'data': None,
     'last_updated': None,
+    # Versión de los datos con la que se calculó (una carga la sube y el caché se descarta)
+    'version': None,
     'lock': threading.Lock()
 }
 
@@ -29,6 +32,16 @@ def get_filters():
     """
     Obtener opciones disponibles para filtros
     """
+    # Primero intentar desde el rollup pre-agregado (milisegundos)
+    from app.services.rollup_service import RollupService
+    rollup_service = RollupService()
+    if rollup_service.disponible():
+        try:
+            return jsonify(rollup_service.obtener_catalogo_filtros())
+        except Exception as e:
+            print(f"Error obteniendo filtros desde rollup, usando tabla completa: {str(e)}")
+            db.session.rollback()
+
     try:
         from app.models.contrato import Contrato
         
@@ -89,69 +102,36 @@ def get_filters():
         print(f"Error obteniendo filtros: {str(e)}")
         return jsonify({'error': 'Error al obtener filtros'}), 500
 
-def _calculate_stats():
-    """
-    Función privada para calcular estadísticas de la base de datos
-    """
-    from app.models.contrato import Contrato
-
-    # Obtener última actualización (fecha de última carga de datos)
-    ultima_actualizacion = db.session.query(
-        func.max(Contrato.created_at)
-    ).scalar()
-
-    # Formatear fecha para mostrar
-    fecha_formateada = None
-    if ultima_actualizacion:
-        fecha_formateada = ultima_actualizacion.strftime('%d/%m/%Y %H:%M')
-
-    # Obtener año más reciente (solo valores numéricos)
-    # anio_fuente es VARCHAR, filtrar usando regex para solo años de 4 dígitos
-    from sqlalchemy import text
-    ultimo_anio = db.session.query(
-        func.max(
-            func.cast(Contrato.anio_fuente, db.Integer)
-        )
-    ).filter(
-        Contrato.anio_fuente.op('~')(r'^\d{4}$')
-    ).scalar()
-
-    stats = {
-        'total_contratos': db.session.query(func.count(Contrato.codigo_contrato)).scalar() or 0,
-        'total_importe': float(db.session.query(func.sum(Contrato.importe)).scalar() or 0),
-        'proveedores_unicos': db.session.query(func.count(func.distinct(Contrato.proveedor_contratista))).scalar() or 0,
-        'instituciones_unicas': db.session.query(func.count(func.distinct(Contrato.siglas_institucion))).scalar() or 0,
-        'ultima_actualizacion': fecha_formateada or 'Sin datos',
-        'ultimo_anio': ultimo_anio
-    }
-
-    return stats
-
-
 @main_bp.route('/api/stats', methods=['GET'])
 def api_stats():
     """
-    Estadísticas generales de la plataforma (con caché de 1 hora)
+    Estadísticas generales de la plataforma (con caché de 1 hora).
+    Se leen de la vista materializada contratos.stats_summary, que se refresca
+    en cada carga de datos, así que nunca se recorre la tabla de contratos aquí.
+    El caché se descarta antes si cambia la versión de los datos (nueva carga).
     """
     try:
         now = datetime.now()
+        version = version_datos(db.session)
 
         # Verificar si el caché es válido
         with _stats_cache['lock']:
             if (_stats_cache['data'] is not None and
                 _stats_cache['last_updated'] is not None and
+                _stats_cache['version'] == version and
                 (now - _stats_cache['last_updated']).total_seconds() < CACHE_TTL_SECONDS):
                 # Retornar datos del caché
                 return jsonify(_stats_cache['data'])
 
-            # Caché expirado o vacío - calcular nuevas estadísticas
-            print(f"[STATS] Calculando estadísticas (caché expirado o vacío)...")
-            stats = _calculate_stats()
+        # Caché expirado o vacío - leer el resumen (lectura de una fila, fuera del lock)
+        from app.services.stats_service import StatsService
+        stats = StatsService().obtener_estadisticas()
 
-            # Actualizar caché
+        # Actualizar caché
+        with _stats_cache['lock']:
             _stats_cache['data'] = stats
             _stats_cache['last_updated'] = now
-            print(f"[STATS] Caché actualizado a las {now.strftime('%Y-%m-%d %H:%M:%S')}")
+            _stats_cache['version'] = version
 
         return jsonify(stats)
 
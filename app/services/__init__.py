@@ -3,5 +3,11 @@
 from .search_service import SearchService
 from .aggregation_service import AggregationService
 from .filter_service import FilterService
+from .rollup_service import RollupService
+from .stats_service import StatsService
+from .cardinalidad_service import CardinalidadService
+from .exploracion_service import ExploracionService
+from .proveedor_service import ProveedorService
+from .institucion_service import InstitucionService
 
-__all__ = ['SearchService', 'AggregationService', 'FilterService']
\ No newline at end of file
+__all__ = ['SearchService', 'AggregationService', 'FilterService', 'RollupService', 'StatsService', 'CardinalidadService', 'ExploracionService', 'ProveedorService', 'InstitucionService']
@@ -3,6 +3,7 @@
 """Servicio de agregación de datos - Optimizado sin subqueries"""
 from sqlalchemy import func, case, and_
 from app import db
+from app.utils.huellas import huellas_completas
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,20 +22,36 @@ class AggregationService:
         try:
             from app.models import Contrato
 
-            # Helper para obtener una query fresca con DISTINCT para evitar duplicados
+            # DISTINCT solo mientras queden filas legadas sin huella; con todas las huellas
+            # el índice único impide duplicados (ver app/utils/huellas.py)
+            con_distinct = not huellas_completas(db.session)
+
+            # Helper para obtener una query fresca
             def get_fresh_query():
                 if search_service and query_text:
                     q = search_service.build_search_query(query_text, search_type, search_fields)
                     if filters:
                         q = search_service.apply_filters(q, filters)
-                    return q.distinct()
-                return base_query.distinct()
+                else:
+                    q = base_query
+                return q.distinct() if con_distinct else q
+
+            # Si hay snapshot columnar y la búsqueda es chica, solo se piden las huellas a la BD
+            # y se agrega en memoria
+            agregados = self._agregados_desde_snapshot(get_fresh_query())
+            if agregados is not None:
+                return agregados
 
             # Total de contratos y monto total - usando query fresca
-            # Usar COUNT(DISTINCT) para evitar contar duplicados
+            # Con todas las huellas cuenta filas, igual que num_contratos en los rollups;
+            # si no, COUNT(DISTINCT) para no contar duplicados
+            if con_distinct:
+                conteo_total = func.count(func.distinct(Contrato.codigo_contrato))
+            else:
+                conteo_total = func.count(Contrato.codigo_contrato)
             fresh_query = get_fresh_query()
             totales = fresh_query.with_entities(
-                func.count(func.distinct(Contrato.codigo_contrato)).label('total'),
+                conteo_total.label('total'),
                 func.sum(Contrato.importe).label('monto_total')
             ).first()
 
@@ -167,32 +184,78 @@ class AggregationService:
                 'contratos_por_anio': []
             }
     
-    def get_stats(self):
-        """Obtiene estadísticas generales de la base de datos"""
+    def obtener_cardinalidades(self, filters=None):
+        """
+        Conteos distintos (proveedores, empresas, instituciones) de una búsqueda
+        solo de filtros. Si los filtros coinciden con las dimensiones de las celdas
+        de sketches se responden uniendo HyperLogLog en lugar de COUNT(DISTINCT)
+        sobre contratos.contratos; si no, retorna None.
+        """
+        from app.services.cardinalidad_service import CardinalidadService
+
         try:
-            from app.models import Contrato
-            
-            total_contratos = db.session.query(
-                func.count(Contrato.codigo_contrato)
-            ).scalar()
-            
-            total_instituciones = db.session.query(
-                func.count(func.distinct(Contrato.siglas_institucion))
-            ).scalar()
-            
-            total_empresas = db.session.query(
-                func.count(func.distinct(Contrato.rfc))
-            ).scalar()
-            
-            return {
-                'total_contratos': total_contratos,
-                'total_instituciones': total_instituciones,
-                'total_empresas': total_empresas
-            }
+            return CardinalidadService().obtener_cardinalidades(filters)
         except Exception as e:
-            logger.error(f"Error obteniendo estadísticas: {str(e)}")
-            return {
-                'total_contratos': 0,
-                'total_instituciones': 0,
-                'total_empresas': 0
-            }
\ No newline at end of file
+            logger.warning(f"[Agregación] Sin cardinalidades aproximadas: {str(e)}")
+            try:
+                db.session.rollback()
+            except:
+                pass
+            return None
+
+    def _agregados_desde_snapshot(self, query):
+        """
+        Agregados calculados sobre el snapshot columnar (app/utils/columnar.py).
+        Solo se piden a la BD las huellas de las filas (clave única del snapshot)
+        y solo si la búsqueda tiene a lo más SNAPSHOT_MAX_FILAS filas.
+        Retorna None si el snapshot está desactivado, no existe, la búsqueda es
+        más grande que el límite o el snapshot no contiene todas sus filas
+        (en esos casos se usa SQL).
+        """
+        from flask import current_app
+        from app.models import Contrato
+        from app.utils.columnar import obtener_snapshot
+
+        if not current_app.config.get('SNAPSHOT_ENABLED'):
+            return None
+
+        try:
+            snapshot = obtener_snapshot(current_app.config['SNAPSHOT_DIR'])
+            if snapshot is None:
+                return None
+
+            limite = current_app.config.get('SNAPSHOT_MAX_FILAS', 200000)
+            huellas = [
+                h for (h,) in query.with_entities(Contrato.huella_contenido).order_by(None).limit(limite + 1)
+            ]
+            if len(huellas) > limite:
+                logger.info(f"[Agregación] Más de {limite} filas, usando SQL")
+                return None
+
+            filas, faltantes = snapshot.filas(huellas)
+            if faltantes:
+                logger.info(f"[Agregación] Snapshot {snapshot.version} sin {faltantes} filas, usando SQL")
+                return None
+
+            return snapshot.agregar(filas)
+
+        except Exception as e:
+            logger.warning(f"[Agregación] Error usando snapshot columnar: {str(e)}")
+            try:
+                db.session.rollback()
+            except:
+                pass
+            return None
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas generales de la base de datos.
+        Delegado a StatsService, que lee resúmenes pre-calculados.
+        """
+        from app.services.stats_service import StatsService
+        stats = StatsService().obtener_estadisticas()
+        return {
+            'total_contratos': stats['total_contratos'],
+            'total_instituciones': stats['total_instituciones'],
+            'total_empresas': stats['total_empresas']
+        }
\ No newline at end of file
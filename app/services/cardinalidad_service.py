@@ -0,0 +1,184 @@
+# app/services/cardinalidad_service.py
+
+"""Servicio de cardinalidades - Conteos distintos aproximados con HyperLogLog"""
+from sqlalchemy import text
+from app import db
+from app.services.rollup_service import ANIO_FUENTE_SQL
+from app.utils.anios import anios_enteros
+from app.utils.hll import HyperLogLog
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Filas leídas por lote al construir los sketches
+TAMANO_LOTE = 50000
+
+
+def _sketch(valores):
+    """Serializa el sketch de una lista de valores"""
+    hll = HyperLogLog()
+    hll.agregar(valores)
+    return hll.to_bytes()
+
+
+def _insertar_celdas(session, anio, celdas):
+    """Inserta los sketches de las celdas de un año"""
+    if not celdas:
+        return
+    session.execute(text("""
+        INSERT INTO contratos.rollup_hll (
+            anio_fuente, siglas_institucion, tipo_contratacion,
+            num_contratos, hll_proveedores, hll_empresas
+        ) VALUES (:anio, :siglas, :tipo, :num, :proveedores, :empresas)
+    """), [
+        {
+            'anio': anio,
+            'siglas': siglas,
+            'tipo': tipo,
+            'num': celda['num'],
+            'proveedores': _sketch(celda['proveedores']),
+            'empresas': _sketch(celda['empresas'])
+        }
+        for (siglas, tipo), celda in celdas.items()
+    ])
+
+
+def refrescar_sketches(session, anios=None):
+    """
+    Reconstruye los sketches HyperLogLog por celda (año × institución × tipo).
+    Una sola pasada sobre contratos.contratos: un GROUP BY con GROUPING SETS
+    entrega el conteo de cada celda y sus proveedores y RFC distintos, ordenado
+    por año, así que en memoria solo quedan los valores distintos de un año.
+    Con años filtra sobre la columna entera anio_fuente (usa idx_contratos_anio);
+    con anios=None reconstruye todo y una lista sin años válidos no cambia nada.
+
+    No hace commit: el llamador decide la transacción.
+    """
+    filtro_anio = ''
+    params = {}
+    if anios is None:
+        session.execute(text("DELETE FROM contratos.rollup_hll"))
+    else:
+        anios = anios_enteros(anios)
+        if not anios:
+            return 0
+        filtro_anio = 'WHERE anio_fuente = ANY(:anios)'
+        params['anios'] = anios
+        session.execute(text("DELETE FROM contratos.rollup_hll WHERE anio_fuente = ANY(:anios)"), params)
+
+    result = session.execute(
+        text(f"""
+            SELECT anio, siglas_institucion, tipo_contratacion,
+                   proveedor_contratista, rfc,
+                   GROUPING(proveedor_contratista) AS sin_proveedor,
+                   GROUPING(rfc) AS sin_rfc,
+                   COUNT(*) AS num
+            FROM (
+                SELECT {ANIO_FUENTE_SQL} AS anio, siglas_institucion, tipo_contratacion,
+                       proveedor_contratista, rfc
+                FROM contratos.contratos
+                {filtro_anio}
+            ) c
+            GROUP BY GROUPING SETS (
+                (anio, siglas_institucion, tipo_contratacion),
+                (anio, siglas_institucion, tipo_contratacion, proveedor_contratista),
+                (anio, siglas_institucion, tipo_contratacion, rfc)
+            )
+            ORDER BY anio NULLS LAST
+        """).execution_options(stream_results=True),
+        params
+    )
+
+    total_celdas = 0
+    anio_actual = None
+    celdas = {}
+    while True:
+        filas = result.fetchmany(TAMANO_LOTE)
+        if not filas:
+            break
+
+        for fila in filas:
+            if fila.anio != anio_actual:
+                _insertar_celdas(session, anio_actual, celdas)
+                if celdas:
+                    logger.info(f"[HLL] Año {anio_actual}: {len(celdas)} celdas")
+                total_celdas += len(celdas)
+                anio_actual, celdas = fila.anio, {}
+
+            llave = (fila.siglas_institucion, fila.tipo_contratacion)
+            celda = celdas.get(llave)
+            if celda is None:
+                celda = celdas[llave] = {'num': 0, 'proveedores': [], 'empresas': []}
+
+            if not fila.sin_proveedor:
+                if fila.proveedor_contratista is not None:
+                    celda['proveedores'].append(fila.proveedor_contratista)
+            elif not fila.sin_rfc:
+                if fila.rfc is not None:
+                    celda['empresas'].append(fila.rfc)
+            else:
+                celda['num'] = fila.num
+
+    _insertar_celdas(session, anio_actual, celdas)
+    if celdas:
+        logger.info(f"[HLL] Año {anio_actual}: {len(celdas)} celdas")
+    total_celdas += len(celdas)
+
+    return total_celdas
+
+
+class CardinalidadService:
+    """Servicio para conteos distintos (proveedores, empresas, instituciones) por rebanada"""
+
+    # Facetas que coinciden con las dimensiones de las celdas de sketches
+    FILTROS_SOPORTADOS = {'instituciones', 'tipos', 'anios'}
+
+    def es_expresable(self, filters):
+        """Verifica si los filtros se pueden responder con las celdas de sketches"""
+        activos = {k for k, v in (filters or {}).items() if v}
+        return activos <= self.FILTROS_SOPORTADOS
+
+    def obtener_cardinalidades(self, filters=None):
+        """
+        Une los sketches de las celdas que cumplen los filtros.
+        Retorna None si los filtros no son expresables sobre las celdas.
+        instituciones_unicas es exacto (la institución es dimensión de la celda).
+        """
+        if not self.es_expresable(filters):
+            return None
+
+        from app.models import RollupHLL
+
+        query = db.session.query(
+            RollupHLL.siglas_institucion,
+            RollupHLL.num_contratos,
+            RollupHLL.hll_proveedores,
+            RollupHLL.hll_empresas
+        )
+
+        filters = filters or {}
+        if filters.get('instituciones'):
+            query = query.filter(RollupHLL.siglas_institucion.in_(filters['instituciones']))
+        if filters.get('tipos'):
+            query = query.filter(RollupHLL.tipo_contratacion.in_(filters['tipos']))
+        if filters.get('anios'):
+            anios = anios_enteros(filters['anios'])
+            query = query.filter(RollupHLL.anio_fuente.in_(anios))
+
+        proveedores = HyperLogLog()
+        empresas = HyperLogLog()
+        instituciones = set()
+
+        for celda in query:
+            proveedores.unir(HyperLogLog.from_bytes(celda.hll_proveedores))
+            empresas.unir(HyperLogLog.from_bytes(celda.hll_empresas))
+            if celda.siglas_institucion and celda.num_contratos:
+                instituciones.add(celda.siglas_institucion)
+
+        return {
+            'proveedores_unicos': proveedores.cardinalidad(),
+            'empresas_unicas': empresas.cardinalidad(),
+            'instituciones_unicas': len(instituciones),
+            'error_relativo': round(proveedores.error_relativo, 4),
+            'aproximado': True
+        }
@@ -0,0 +1,76 @@
+# app/services/exploracion_service.py
+
+"""Servicio de exploración - Navegación solo por filtros (sin término de búsqueda)"""
+from flask import current_app
+from app import db
+from app.services.filter_service import FilterService
+from app.services.rollup_service import RollupService
+from app.services.aggregation_service import AggregationService
+from app.utils.columnar import obtener_snapshot
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExploracionService:
+    """
+    Resuelve combinaciones de filtros con los índices bitmap del snapshot
+    (AND/OR de bitsets y popcount para facetas). Sin snapshot usa el rollup,
+    que también responde exacto para predicados solo de filtros.
+    """
+
+    def _indice(self):
+        """Snapshot con índices bitmap, o None si no está disponible"""
+        if not current_app.config.get('SNAPSHOT_ENABLED'):
+            return None
+        try:
+            return obtener_snapshot(current_app.config['SNAPSHOT_DIR'])
+        except Exception as e:
+            logger.warning(f"[Exploración] Error abriendo snapshot: {str(e)}")
+            return None
+
+    def explorar(self, filters=None):
+        """Agregados y facetas disyuntivas para una combinación de filtros"""
+        filters = filters or {}
+
+        rollup_service = RollupService()
+        if not rollup_service.filtros_expresables(filters):
+            # Filtros fuera de las facetas (ej. riesgo_min): consultar la tabla de contratos
+            return self._explorar_sql(filters)
+
+        snapshot = self._indice()
+        if snapshot is not None:
+            bits = snapshot.bitmaps.resolver(filters)
+            agregados = snapshot.agregar(snapshot.bitmaps.filas_de(bits))
+            filtros_disponibles = FilterService().formatear_facetas(
+                snapshot.bitmaps.conteos_facetas(filters), filters
+            )
+        else:
+            agregados = rollup_service.obtener_agregados(filters)
+            filtros_disponibles = rollup_service.obtener_filtros_disponibles(filters)
+
+        agregados['cardinalidades'] = AggregationService().obtener_cardinalidades(filters)
+        return self._respuesta(agregados, filtros_disponibles)
+
+    def _explorar_sql(self, filters):
+        """Exploración directa sobre contratos.contratos (filtros no expresables en el índice)"""
+        from app.models import Contrato
+        from app.services.search_service import SearchService
+
+        base_query = SearchService().apply_filters(db.session.query(Contrato), filters)
+        agregados = AggregationService().obtener_agregados_optimizado(base_query)
+        filtros_disponibles = FilterService().obtener_filtros_disponibles(db.session.query(Contrato), filters)
+        return self._respuesta(agregados, filtros_disponibles)
+
+    def _respuesta(self, agregados, filtros_disponibles):
+        """Mismo formato de respuesta que /api/search (sin contratos)"""
+        return {
+            'total': agregados['total_contratos'],
+            'monto_total': agregados['monto_total'],
+            'proveedores': agregados['top_proveedores'],
+            'instituciones': agregados['top_instituciones'],
+            'contratos_por_anio': agregados.get('contratos_por_anio', []),
+            'contratos_por_mes': agregados.get('contratos_por_mes', []),
+            'cardinalidades': agregados.get('cardinalidades'),
+            'filtros_disponibles': filtros_disponibles
+        }
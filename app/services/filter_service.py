@@ -1,106 +1,124 @@
 # app/services/filter_service.py
 
-"""Servicio de filtros - Optimizado sin subqueries"""
-from sqlalchemy import func
+"""Servicio de filtros - Todas las facetas en una sola pasada con GROUPING SETS"""
+from sqlalchemy import func, and_, or_, true, tuple_
 from app import db
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (faceta, columna del modelo, límite de valores a retornar)
+FACETAS = [
+    ('instituciones', 'siglas_institucion', 10),
+    ('tipos', 'tipo_contratacion', 10),
+    ('procedimientos', 'tipo_procedimiento', 10),
+    ('anios', 'anio_fuente', 10),
+    ('estatus', 'estatus_contrato', 5),
+]
+
+
 class FilterService:
     """Servicio para manejar filtros"""
 
-    def obtener_filtros_disponibles(self, base_query):
+    def obtener_filtros_disponibles(self, base_query, filters=None):
         """
-        Obtiene los valores únicos para filtros usando with_entities().
-        Esto permite a PostgreSQL optimizar la query completa y usar índices.
+        Obtiene los valores únicos para filtros con sus conteos.
+
+        base_query es la búsqueda SIN los filtros de facetas; los filtros se pasan
+        aparte para calcular conteos disyuntivos: cada faceta se cuenta como si su
+        propia selección no estuviera aplicada (pero sí las de las demás facetas).
+        Todas las facetas se calculan en una sola query con GROUPING SETS.
         """
         try:
             from app.models import Contrato
-            filtros = {}
-
-            # Top 10 instituciones más frecuentes - usando with_entities()
-            inst_query = base_query.with_entities(
-                Contrato.siglas_institucion,
-                func.count(Contrato.codigo_contrato).label('count')
-            ).filter(
-                Contrato.siglas_institucion.isnot(None)
-            ).group_by(
-                Contrato.siglas_institucion
-            ).order_by(
-                func.count(Contrato.codigo_contrato).desc()
-            ).limit(10)
-
-            filtros['instituciones'] = {
-                i.siglas_institucion: i.count for i in inst_query
-            }
-
-            # Top 10 tipos de contratación
-            tipos_query = base_query.with_entities(
-                Contrato.tipo_contratacion,
-                func.count(Contrato.codigo_contrato).label('count')
-            ).filter(
-                Contrato.tipo_contratacion.isnot(None)
-            ).group_by(
-                Contrato.tipo_contratacion
-            ).order_by(
-                func.count(Contrato.codigo_contrato).desc()
-            ).limit(10)
-
-            filtros['tipos'] = {
-                t.tipo_contratacion: t.count for t in tipos_query
-            }
-
-            # Top 10 tipos de procedimiento
-            proc_query = base_query.with_entities(
-                Contrato.tipo_procedimiento,
-                func.count(Contrato.codigo_contrato).label('count')
-            ).filter(
-                Contrato.tipo_procedimiento.isnot(None)
-            ).group_by(
-                Contrato.tipo_procedimiento
-            ).order_by(
-                func.count(Contrato.codigo_contrato).desc()
-            ).limit(10)
-
-            filtros['procedimientos'] = {
-                p.tipo_procedimiento: p.count for p in proc_query
-            }
-
-            # Top 10 años
-            anios_query = base_query.with_entities(
-                Contrato.anio_fuente,
-                func.count(Contrato.codigo_contrato).label('count')
-            ).filter(
-                Contrato.anio_fuente.isnot(None)
-            ).group_by(
-                Contrato.anio_fuente
-            ).order_by(
-                Contrato.anio_fuente.desc()
-            ).limit(10)
-
-            filtros['anios'] = {
-                str(a.anio_fuente): a.count for a in anios_query
-            }
-
-            # Top 5 estatus
-            estatus_query = base_query.with_entities(
-                Contrato.estatus_contrato,
-                func.count(Contrato.codigo_contrato).label('count')
-            ).filter(
-                Contrato.estatus_contrato.isnot(None)
-            ).group_by(
-                Contrato.estatus_contrato
-            ).order_by(
-                func.count(Contrato.codigo_contrato).desc()
-            ).limit(5)
-
-            filtros['estatus'] = {
-                e.estatus_contrato: e.count for e in estatus_query
-            }
-
-            return filtros
+            from app.services.search_service import SearchService
+
+            condiciones = SearchService().build_filter_conditions(filters)
+            columnas = {faceta: getattr(Contrato, columna) for faceta, columna, _ in FACETAS}
+
+            return self.calcular_facetas(
+                base_query,
+                columnas,
+                condiciones,
+                lambda: func.count(Contrato.codigo_contrato),
+                filters
+            )
 
         except Exception as e:
             logger.error(f"Error obteniendo filtros: {str(e)}")
-            return {}
\ No newline at end of file
+            try:
+                db.session.rollback()
+            except:
+                pass
+            return {}
+
+    def calcular_facetas(self, base_query, columnas, condiciones, medida, filters=None):
+        """
+        Motor de facetas genérico (tabla de contratos o rollup).
+
+        Args:
+            base_query: Query con el predicado de búsqueda, sin filtros de facetas
+            columnas: {faceta: columna} para cada faceta de FACETAS
+            condiciones: {faceta: condición} solo de facetas con selección
+            medida: callable que retorna el agregado a contar (ej. COUNT o SUM)
+            filters: filtros seleccionados (se incluyen siempre en la respuesta)
+        """
+        nombres = [faceta for faceta, _, _ in FACETAS]
+
+        # Condición de conteo por faceta: todas las selecciones excepto la propia
+        condicion_faceta = {}
+        for faceta in nombres:
+            otras = [c for f, c in condiciones.items() if f != faceta]
+            condicion_faceta[faceta] = and_(*otras) if otras else true()
+
+        entidades = [columnas[f] for f in nombres]
+        entidades += [func.grouping(columnas[f]) for f in nombres]
+        entidades += [medida().filter(condicion_faceta[f]) for f in nombres]
+
+        query = base_query.with_entities(*entidades)
+
+        # Una fila solo puede contar si cumple la condición de al menos una faceta
+        if condiciones:
+            query = query.filter(or_(*condicion_faceta.values()))
+
+        query = query.group_by(
+            func.grouping_sets(*[tuple_(columnas[f]) for f in nombres])
+        )
+
+        n = len(nombres)
+        conteos = {faceta: {} for faceta in nombres}
+        for fila in query.all():
+            valores, agrupado, medidas = fila[:n], fila[n:2 * n], fila[2 * n:]
+            for i, faceta in enumerate(nombres):
+                # GROUPING() = 0 indica la columna del grouping set de esta fila
+                if agrupado[i] == 0:
+                    if valores[i] is not None and medidas[i]:
+                        conteos[faceta][valores[i]] = int(medidas[i])
+                    break
+
+        return self.formatear_facetas(conteos, filters)
+
+    def formatear_facetas(self, conteos, filters=None):
+        """
+        Ordena y recorta los conteos {faceta: {valor: conteo}} al formato de respuesta.
+        Años de mayor a menor; las demás facetas por conteo.
+        """
+        filtros = {}
+        for faceta, _, limite in FACETAS:
+            valores = conteos.get(faceta, {})
+            if faceta == 'anios':
+                ordenados = sorted(valores.items(), key=lambda v: str(v[0]), reverse=True)
+            else:
+                ordenados = sorted(valores.items(), key=lambda v: v[1], reverse=True)
+
+            seleccion = {str(v) for v in (filters or {}).get(faceta) or []}
+            visibles = ordenados[:limite]
+            # Mantener visibles los valores seleccionados aunque no estén en el top
+            visibles += [v for v in ordenados[limite:] if str(v[0]) in seleccion]
+
+            if faceta == 'anios':
+                filtros[faceta] = {str(v): c for v, c in visibles}
+            else:
+                filtros[faceta] = {v: c for v, c in visibles}
+
+        return filtros
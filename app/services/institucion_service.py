@@ -0,0 +1,168 @@
+# app/services/institucion_service.py
+
+"""Servicio de instituciones - Perfiles de gasto y concentración desde contratos.perfil_instituciones"""
+from sqlalchemy import text
+from app.utils.anios import anios_enteros
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Procedimientos que cuentan como adjudicación directa (con o sin acento, cualquier variante)
+ES_ADJUDICACION_DIRECTA_SQL = "UPPER(tipo_procedimiento) LIKE 'ADJUDICACI_N DIRECTA%'"
+
+
+def _insertar_perfiles(session, anio_sql, filtro, params):
+    """
+    Inserta perfiles calculados sobre el rollup. anio_sql es la expresión de año
+    de la fila (anio_fuente para perfiles anuales, NULL para el periodo completo).
+    """
+    return session.execute(text(f"""
+        WITH celdas AS (
+            SELECT siglas_institucion, {anio_sql} AS anio_fuente, rfc_group_key,
+                   institucion_nombre, tipo_procedimiento, num_contratos, monto_total
+            FROM contratos.rollup_contratos
+            WHERE siglas_institucion IS NOT NULL {filtro}
+        ),
+        por_proveedor AS (
+            SELECT siglas_institucion, anio_fuente, rfc_group_key,
+                   GREATEST(COALESCE(SUM(monto_total), 0), 0) AS monto,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY siglas_institucion, anio_fuente
+                       ORDER BY GREATEST(COALESCE(SUM(monto_total), 0), 0) DESC
+                   ) AS posicion
+            FROM celdas
+            WHERE rfc_group_key IS NOT NULL
+            GROUP BY 1, 2, 3
+        ),
+        concentracion AS (
+            SELECT siglas_institucion, anio_fuente,
+                   COUNT(*) AS num_proveedores,
+                   SUM(monto) AS monto,
+                   SUM(monto) FILTER (WHERE posicion <= 10) AS monto_top10,
+                   SUM(monto * monto) AS suma_cuadrados
+            FROM por_proveedor
+            GROUP BY 1, 2
+        ),
+        totales AS (
+            SELECT siglas_institucion, anio_fuente,
+                   MAX(institucion_nombre) AS nombre,
+                   SUM(num_contratos) AS num_contratos,
+                   SUM(monto_total) AS monto_total,
+                   COALESCE(SUM(num_contratos) FILTER (WHERE {ES_ADJUDICACION_DIRECTA_SQL}), 0) AS contratos_ad,
+                   GREATEST(COALESCE(SUM(monto_total) FILTER (WHERE {ES_ADJUDICACION_DIRECTA_SQL}), 0), 0) AS monto_ad,
+                   GREATEST(COALESCE(SUM(monto_total), 0), 0) AS monto_positivo
+            FROM celdas
+            GROUP BY 1, 2
+        )
+        INSERT INTO contratos.perfil_instituciones (
+            siglas_institucion, anio_fuente, institucion_nombre, num_contratos, monto_total,
+            num_proveedores, top10_share, hhi,
+            adjudicacion_directa_share, adjudicacion_directa_contratos_share, actualizado_en
+        )
+        SELECT t.siglas_institucion, t.anio_fuente, t.nombre, t.num_contratos, t.monto_total,
+               COALESCE(c.num_proveedores, 0),
+               CASE WHEN c.monto > 0 THEN c.monto_top10 / c.monto END,
+               CASE WHEN c.monto > 0 THEN c.suma_cuadrados / (c.monto * c.monto) * 10000 END,
+               CASE WHEN t.monto_positivo > 0 THEN t.monto_ad / t.monto_positivo END,
+               CASE WHEN t.num_contratos > 0 THEN t.contratos_ad::numeric / t.num_contratos END,
+               NOW()
+        FROM totales t
+        LEFT JOIN concentracion c
+            ON c.siglas_institucion = t.siglas_institucion
+           AND c.anio_fuente IS NOT DISTINCT FROM t.anio_fuente
+    """), params).rowcount
+
+
+def refrescar_perfiles_instituciones(session, anios=None):
+    """
+    Recalcula los perfiles por institución desde el rollup. Con años, recalcula
+    los perfiles anuales de esos años y el perfil del periodo completo de las
+    instituciones afectadas: las que tienen esos años en el rollup nuevo más las
+    que tenían un perfil anual de alguno de ellos (una institución que se quedó
+    sin contratos en un año recargado también cambia su periodo). Con anios=None
+    recalcula todo; una lista sin años válidos no cambia nada. Debe ejecutarse
+    después de refrescar_rollups.
+
+    No hace commit: el llamador decide la transacción.
+    """
+    params = {}
+    if anios is None:
+        session.execute(text("DELETE FROM contratos.perfil_instituciones"))
+        filtro_anual = 'AND anio_fuente IS NOT NULL'
+        filtro_periodo = ''
+    else:
+        params['anios'] = anios_enteros(anios)
+        if not params['anios']:
+            return 0
+        # Se guardan antes de borrar los perfiles anuales de esos años
+        session.execute(text("DROP TABLE IF EXISTS instituciones_refresco"))
+        session.execute(text("""
+            CREATE TEMP TABLE instituciones_refresco ON COMMIT DROP AS
+            SELECT siglas_institucion FROM contratos.rollup_contratos
+            WHERE anio_fuente = ANY(:anios) AND siglas_institucion IS NOT NULL
+            UNION
+            SELECT siglas_institucion FROM contratos.perfil_instituciones
+            WHERE anio_fuente = ANY(:anios)
+        """), params)
+        instituciones_sql = "SELECT siglas_institucion FROM instituciones_refresco"
+        session.execute(text(f"""
+            DELETE FROM contratos.perfil_instituciones
+            WHERE anio_fuente = ANY(:anios)
+               OR (anio_fuente IS NULL AND siglas_institucion IN ({instituciones_sql}))
+        """), params)
+        filtro_anual = 'AND anio_fuente = ANY(:anios)'
+        filtro_periodo = f'AND siglas_institucion IN ({instituciones_sql})'
+
+    filas = _insertar_perfiles(session, 'anio_fuente', filtro_anual, params)
+    filas += _insertar_perfiles(session, 'NULL::integer', filtro_periodo, params)
+
+    logger.info(f"[Instituciones] {filas} perfiles recalculados (años: {anios or 'todos'})")
+    return filas
+
+
+def _formatear_perfil(perfil):
+    """Fila de perfil_instituciones a diccionario de respuesta"""
+    def proporcion(valor):
+        return round(float(valor), 4) if valor is not None else None
+
+    return {
+        'anio': perfil.anio_fuente,
+        'num_contratos': int(perfil.num_contratos or 0),
+        'monto_total': float(perfil.monto_total or 0),
+        'num_proveedores': int(perfil.num_proveedores or 0),
+        'top10_share': proporcion(perfil.top10_share),
+        'hhi': round(float(perfil.hhi), 1) if perfil.hhi is not None else None,
+        'adjudicacion_directa_share': proporcion(perfil.adjudicacion_directa_share),
+        'adjudicacion_directa_contratos_share': proporcion(perfil.adjudicacion_directa_contratos_share)
+    }
+
+
+class InstitucionService:
+    """Servicio para el perfil de gasto de una institución"""
+
+    def obtener_perfil(self, siglas):
+        """
+        Perfil del periodo completo más la serie anual de una institución.
+        Retorna None si la institución no existe.
+        """
+        from app.models import PerfilInstitucion
+
+        perfiles = PerfilInstitucion.query.filter(
+            PerfilInstitucion.siglas_institucion == siglas
+        ).order_by(
+            PerfilInstitucion.anio_fuente.asc().nullsfirst()
+        ).all()
+
+        if not perfiles:
+            return None
+
+        periodo = next((p for p in perfiles if p.anio_fuente is None), None)
+        anuales = [p for p in perfiles if p.anio_fuente is not None]
+
+        return {
+            'siglas': siglas,
+            'nombre': (periodo or perfiles[0]).institucion_nombre,
+            'periodo': _formatear_perfil(periodo) if periodo else None,
+            'por_anio': [_formatear_perfil(p) for p in anuales],
+            'actualizado_en': max(p.actualizado_en for p in perfiles).strftime('%d/%m/%Y %H:%M')
+        }
@@ -0,0 +1,220 @@
+# app/services/proveedor_service.py
+
+"""Servicio de proveedores - Perfiles servidos desde contratos.resumen_proveedores"""
+from sqlalchemy import text
+from app.services.rollup_service import RFC_GENERICO, RFC_GROUP_KEY_SQL, CLAVE_ES_RFC_SQL
+from app.utils.anios import anios_enteros
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Elementos guardados en las listas del perfil
+TOP_INSTITUCIONES = 10
+CONTRATOS_MAYORES = 10
+
+
+def refrescar_resumen_proveedores(session, anios=None):
+    """
+    Recalcula el perfil de los proveedores con contratos en los años indicados
+    (o de todos si anios es None; una lista sin años válidos no cambia nada).
+    Totales, series por año, instituciones y tipos de procedimiento salen del
+    rollup; fechas y contratos mayores de la tabla de contratos. Debe ejecutarse
+    después de refrescar_rollups.
+
+    Con años, los proveedores afectados son los que tienen esos años en el rollup
+    nuevo más los que los tenían en su perfil anterior (por_anio): un proveedor
+    que desapareció de un año recargado o deduplicado pero tiene contratos en
+    otros años se recalcula sin ese año, y uno sin contratos en ningún año se borra.
+
+    No hace commit: el llamador decide la transacción.
+    """
+    params = {'top_instituciones': TOP_INSTITUCIONES, 'contratos_mayores': CONTRATOS_MAYORES}
+    if anios is None:
+        claves_sql = """
+            SELECT DISTINCT rfc_group_key, clave_es_rfc
+            FROM contratos.rollup_contratos
+            WHERE rfc_group_key IS NOT NULL
+        """
+        session.execute(text("DELETE FROM contratos.resumen_proveedores"))
+    else:
+        params['anios'] = anios_enteros(anios)
+        if not params['anios']:
+            return 0
+        # Se guardan antes de borrar los perfiles: después ya no se sabe quién tenía el año
+        session.execute(text("DROP TABLE IF EXISTS proveedores_refresco"))
+        session.execute(text("""
+            CREATE TEMP TABLE proveedores_refresco ON COMMIT DROP AS
+            SELECT rfc_group_key, clave_es_rfc
+            FROM contratos.rollup_contratos
+            WHERE rfc_group_key IS NOT NULL AND anio_fuente = ANY(:anios)
+            UNION
+            SELECT rfc_group_key, clave_es_rfc
+            FROM contratos.resumen_proveedores r
+            WHERE EXISTS (
+                SELECT 1 FROM jsonb_array_elements(r.por_anio) e
+                WHERE (e->>'anio')::integer = ANY(:anios)
+            )
+        """), params)
+        claves_sql = "SELECT rfc_group_key, clave_es_rfc FROM proveedores_refresco"
+        session.execute(text(f"""
+            DELETE FROM contratos.resumen_proveedores r
+            USING ({claves_sql}) c
+            WHERE r.rfc_group_key = c.rfc_group_key AND r.clave_es_rfc = c.clave_es_rfc
+        """))
+
+    result = session.execute(text(f"""
+        WITH claves AS ({claves_sql}),
+        celdas AS (
+            SELECT r.*
+            FROM contratos.rollup_contratos r
+            JOIN claves c USING (rfc_group_key, clave_es_rfc)
+        ),
+        totales AS (
+            SELECT rfc_group_key, clave_es_rfc,
+                   MAX(proveedor_nombre) AS nombre,
+                   MAX(rfc) AS rfc,
+                   SUM(num_contratos) AS num_contratos,
+                   SUM(monto_total) AS monto_total
+            FROM celdas
+            GROUP BY 1, 2
+        ),
+        por_anio AS (
+            SELECT rfc_group_key, clave_es_rfc,
+                   jsonb_agg(jsonb_build_object(
+                       'anio', anio_fuente, 'num_contratos', n, 'monto_total', m
+                   ) ORDER BY anio_fuente) AS datos
+            FROM (
+                SELECT rfc_group_key, clave_es_rfc, anio_fuente,
+                       SUM(num_contratos) AS n, COALESCE(SUM(monto_total), 0) AS m
+                FROM celdas
+                WHERE anio_fuente IS NOT NULL
+                GROUP BY 1, 2, 3
+            ) x
+            GROUP BY 1, 2
+        ),
+        instituciones AS (
+            SELECT rfc_group_key, clave_es_rfc,
+                   jsonb_agg(jsonb_build_object(
+                       'siglas', siglas_institucion, 'nombre', nombre,
+                       'num_contratos', n, 'monto_total', m
+                   ) ORDER BY m DESC) AS datos
+            FROM (
+                SELECT rfc_group_key, clave_es_rfc, siglas_institucion,
+                       MAX(institucion_nombre) AS nombre,
+                       SUM(num_contratos) AS n, COALESCE(SUM(monto_total), 0) AS m,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY rfc_group_key, clave_es_rfc
+                           ORDER BY COALESCE(SUM(monto_total), 0) DESC
+                       ) AS posicion
+                FROM celdas
+                WHERE siglas_institucion IS NOT NULL
+                GROUP BY 1, 2, 3
+            ) x
+            WHERE posicion <= :top_instituciones
+            GROUP BY 1, 2
+        ),
+        procedimientos AS (
+            SELECT rfc_group_key, clave_es_rfc,
+                   jsonb_agg(jsonb_build_object(
+                       'tipo', tipo_procedimiento, 'num_contratos', n, 'monto_total', m
+                   ) ORDER BY n DESC) AS datos
+            FROM (
+                SELECT rfc_group_key, clave_es_rfc, tipo_procedimiento,
+                       SUM(num_contratos) AS n, COALESCE(SUM(monto_total), 0) AS m
+                FROM celdas
+                WHERE tipo_procedimiento IS NOT NULL
+                GROUP BY 1, 2, 3
+            ) x
+            GROUP BY 1, 2
+        ),
+        contratos_proveedor AS MATERIALIZED (
+            SELECT {RFC_GROUP_KEY_SQL} AS rfc_group_key,
+                   {CLAVE_ES_RFC_SQL} AS clave_es_rfc,
+                   codigo_contrato, titulo_contrato, siglas_institucion,
+                   importe, fecha_inicio_contrato
+            FROM contratos.contratos
+            WHERE ({RFC_GROUP_KEY_SQL}, {CLAVE_ES_RFC_SQL}) IN (SELECT rfc_group_key, clave_es_rfc FROM claves)
+        ),
+        fechas AS (
+            SELECT rfc_group_key, clave_es_rfc,
+                   MIN(fecha_inicio_contrato) AS primer_contrato,
+                   MAX(fecha_inicio_contrato) AS ultimo_contrato
+            FROM contratos_proveedor
+            GROUP BY 1, 2
+        ),
+        mayores AS (
+            SELECT rfc_group_key, clave_es_rfc,
+                   jsonb_agg(jsonb_build_object(
+                       'codigo_contrato', codigo_contrato, 'titulo', titulo_contrato,
+                       'siglas_institucion', siglas_institucion, 'importe', importe,
+                       'fecha_inicio', fecha_inicio_contrato
+                   ) ORDER BY posicion) AS datos
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY rfc_group_key, clave_es_rfc
+                    ORDER BY importe DESC NULLS LAST
+                ) AS posicion
+                FROM contratos_proveedor
+            ) x
+            WHERE posicion <= :contratos_mayores
+            GROUP BY 1, 2
+        )
+        INSERT INTO contratos.resumen_proveedores (
+            rfc_group_key, clave_es_rfc, nombre, rfc, num_contratos, monto_total,
+            primer_contrato, ultimo_contrato,
+            por_anio, top_instituciones, tipos_procedimiento, contratos_mayores,
+            actualizado_en
+        )
+        SELECT t.rfc_group_key, t.clave_es_rfc, t.nombre, t.rfc, t.num_contratos, t.monto_total,
+               f.primer_contrato, f.ultimo_contrato,
+               COALESCE(a.datos, '[]'::jsonb),
+               COALESCE(i.datos, '[]'::jsonb),
+               COALESCE(p.datos, '[]'::jsonb),
+               COALESCE(m.datos, '[]'::jsonb),
+               NOW()
+        FROM totales t
+        LEFT JOIN fechas f USING (rfc_group_key, clave_es_rfc)
+        LEFT JOIN por_anio a USING (rfc_group_key, clave_es_rfc)
+        LEFT JOIN instituciones i USING (rfc_group_key, clave_es_rfc)
+        LEFT JOIN procedimientos p USING (rfc_group_key, clave_es_rfc)
+        LEFT JOIN mayores m USING (rfc_group_key, clave_es_rfc)
+    """), params)
+
+    logger.info(f"[Proveedores] {result.rowcount} perfiles recalculados (años: {anios or 'todos'})")
+    return result.rowcount
+
+
+class ProveedorService:
+    """Servicio para el perfil de un proveedor"""
+
+    def obtener_perfil(self, clave):
+        """
+        Perfil del proveedor por RFC o, si no tiene RFC válido, por nombre.
+        Si la clave existe en ambas ramas, se prefiere la del RFC.
+        Retorna None si no existe.
+        """
+        from app.models import ResumenProveedor
+
+        resumen = ResumenProveedor.query.filter(
+            ResumenProveedor.rfc_group_key == clave
+        ).order_by(
+            ResumenProveedor.clave_es_rfc.desc()
+        ).first()
+
+        if resumen is None:
+            return None
+
+        return {
+            'clave': resumen.rfc_group_key,
+            'nombre': resumen.nombre,
+            'rfc': resumen.rfc if resumen.rfc and resumen.rfc != RFC_GENERICO else 'RFC Genérico',
+            'num_contratos': int(resumen.num_contratos or 0),
+            'monto_total': float(resumen.monto_total or 0),
+            'primer_contrato': resumen.primer_contrato.isoformat() if resumen.primer_contrato else None,
+            'ultimo_contrato': resumen.ultimo_contrato.isoformat() if resumen.ultimo_contrato else None,
+            'contratos_por_anio': resumen.por_anio or [],
+            'top_instituciones': resumen.top_instituciones or [],
+            'tipos_procedimiento': resumen.tipos_procedimiento or [],
+            'contratos_mayores': resumen.contratos_mayores or [],
+            'actualizado_en': resumen.actualizado_en.strftime('%d/%m/%Y %H:%M') if resumen.actualizado_en else None
+        }
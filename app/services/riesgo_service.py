@@ -0,0 +1,225 @@
+# app/services/riesgo_service.py
+
+"""Servicio de riesgo - Puntajes de banderas rojas calculados fuera de línea"""
+import io
+from datetime import datetime
+from sqlalchemy import text
+import numpy as np
+import pandas as pd
+from app.services.rollup_service import RFC_GROUP_KEY_SQL
+import logging
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 100000
+
+# Peso de cada bandera en el puntaje (suman 1.0; el puntaje va de 0 a 100)
+PESOS = {
+    'adjudicacion_directa_proveedor': 0.25,
+    'licitacion_un_proveedor': 0.20,
+    'empresa_reciente': 0.30,
+    'monto_atipico': 0.25
+}
+
+# Proveedor con alta proporción de adjudicaciones directas
+MIN_CONTRATOS_PROVEEDOR = 5
+MIN_PROPORCION_AD = 0.8
+
+# Empresa fundada a lo más este número de años antes (o después) del inicio del contrato
+ANIOS_EMPRESA_RECIENTE = 1
+
+# Importe atípico: z robusto (mediana / MAD) sobre log10(importe) dentro del tipo de contratación
+Z_MONTO_ATIPICO = 3.5
+
+COLUMNAS = [
+    'huella_contenido', 'codigo_contrato', 'rfc_group_key', 'codigo_expediente', 'tipo_procedimiento',
+    'tipo_contratacion', 'importe', 'fecha_inicio_contrato', 'anio_fundacion_empresa'
+]
+
+
+def _leer_lotes(conn):
+    """Recorre contratos.contratos en DataFrames de TAMANO_LOTE filas (cursor del lado del servidor)"""
+    result = conn.execute(
+        text(f"""
+            SELECT huella_contenido::text AS huella_contenido,
+                   codigo_contrato,
+                   {RFC_GROUP_KEY_SQL} AS rfc_group_key,
+                   codigo_expediente,
+                   tipo_procedimiento,
+                   tipo_contratacion,
+                   importe::float8 AS importe,
+                   fecha_inicio_contrato,
+                   anio_fundacion_empresa
+            FROM contratos.contratos
+        """).execution_options(stream_results=True)
+    )
+    while True:
+        filas = result.fetchmany(TAMANO_LOTE)
+        if not filas:
+            break
+        yield pd.DataFrame(filas, columns=COLUMNAS)
+
+
+def _clasificar_procedimientos(df):
+    """Máscaras vectorizadas de adjudicación directa y de procedimiento competitivo"""
+    procedimiento = df['tipo_procedimiento'].fillna('').str.upper()
+    es_ad = procedimiento.str.match(r'ADJUDICACI.N DIRECTA')
+    es_competitivo = procedimiento.str.contains('LICITACI') | procedimiento.str.contains('INVITACI')
+    return es_ad, es_competitivo
+
+
+def _log_importe(df):
+    importe = pd.to_numeric(df['importe'], errors='coerce')
+    return np.log10(importe.where(importe > 0))
+
+
+def _primera_pasada(conn):
+    """
+    Estadísticas globales necesarias para las banderas:
+    proporción de adjudicación directa por proveedor, proveedores por expediente
+    competitivo y distribución de log10(importe) por tipo de contratación.
+    """
+    contratos_proveedor = pd.Series(dtype='int64')
+    ad_proveedor = pd.Series(dtype='int64')
+    pares_expediente = []
+    logs_por_tipo = {}
+
+    for df in _leer_lotes(conn):
+        es_ad, es_competitivo = _clasificar_procedimientos(df)
+
+        con_clave = df['rfc_group_key'].notna()
+        contratos_proveedor = contratos_proveedor.add(
+            df.loc[con_clave, 'rfc_group_key'].value_counts(), fill_value=0
+        )
+        ad_proveedor = ad_proveedor.add(
+            df.loc[con_clave & es_ad, 'rfc_group_key'].value_counts(), fill_value=0
+        )
+
+        competitivos = df.loc[es_competitivo & con_clave & df['codigo_expediente'].notna(),
+                              ['codigo_expediente', 'rfc_group_key']]
+        pares_expediente.append(competitivos.drop_duplicates())
+
+        logs = _log_importe(df)
+        validos = logs.notna() & df['tipo_contratacion'].notna()
+        for tipo, grupo in logs[validos].groupby(df.loc[validos, 'tipo_contratacion']):
+            logs_por_tipo.setdefault(tipo, []).append(grupo.to_numpy(dtype=np.float64))
+
+    proporcion_ad = ad_proveedor.reindex(contratos_proveedor.index, fill_value=0) / contratos_proveedor
+    proveedores_ad = set(proporcion_ad[
+        (contratos_proveedor >= MIN_CONTRATOS_PROVEEDOR) & (proporcion_ad >= MIN_PROPORCION_AD)
+    ].index)
+
+    expedientes_un_proveedor = set()
+    if pares_expediente:
+        pares = pd.concat(pares_expediente).drop_duplicates()
+        proveedores_por_expediente = pares.groupby('codigo_expediente').size()
+        expedientes_un_proveedor = set(proveedores_por_expediente[proveedores_por_expediente == 1].index)
+
+    limites_monto = {}
+    for tipo, partes in logs_por_tipo.items():
+        valores = np.concatenate(partes)
+        mediana = np.median(valores)
+        mad = np.median(np.abs(valores - mediana)) * 1.4826
+        if mad > 0:
+            limites_monto[tipo] = mediana + Z_MONTO_ATIPICO * mad
+
+    return proveedores_ad, expedientes_un_proveedor, limites_monto
+
+
+def _banderas(df, proveedores_ad, expedientes_un_proveedor, limites_monto):
+    """Banderas y puntaje de un lote (todo vectorizado)"""
+    es_ad, es_competitivo = _clasificar_procedimientos(df)
+
+    banderas = pd.DataFrame({
+        'huella_contenido': df['huella_contenido'],
+        'codigo_contrato': df['codigo_contrato']
+    })
+    banderas['adjudicacion_directa_proveedor'] = df['rfc_group_key'].isin(proveedores_ad)
+    banderas['licitacion_un_proveedor'] = es_competitivo & df['codigo_expediente'].isin(expedientes_un_proveedor)
+
+    anio_inicio = pd.to_datetime(df['fecha_inicio_contrato'], errors='coerce').dt.year
+    fundacion = pd.to_numeric(df['anio_fundacion_empresa'], errors='coerce')
+    diferencia = anio_inicio - fundacion
+    banderas['empresa_reciente'] = diferencia.between(-ANIOS_EMPRESA_RECIENTE, ANIOS_EMPRESA_RECIENTE).fillna(False)
+
+    limite = df['tipo_contratacion'].map(limites_monto)
+    banderas['monto_atipico'] = (_log_importe(df) > limite).fillna(False)
+
+    puntaje = sum(banderas[bandera].astype(float) * peso for bandera, peso in PESOS.items())
+    banderas['puntaje'] = (puntaje * 100).round().astype(int)
+
+    return banderas
+
+
+# Columnas de contratos.riesgo_banderas en el orden del COPY
+COLUMNAS_BANDERAS = ['huella_contenido', 'codigo_contrato', 'puntaje', *PESOS, 'calculado_en']
+
+
+def _escribir_banderas(conn, banderas):
+    """COPY de las banderas de un lote a contratos.riesgo_banderas (en la transacción de conn)"""
+    buffer = io.StringIO()
+    banderas[COLUMNAS_BANDERAS].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY contratos.riesgo_banderas ({', '.join(COLUMNAS_BANDERAS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def calcular_puntajes(conn):
+    """
+    Calcula las banderas y el puntaje de todos los contratos en dos pasadas por
+    lotes y actualiza contratos.riesgo_banderas y contratos.contratos.riesgo_puntaje
+    (solo las filas cuyo puntaje cambió, para no reescribir toda la tabla).
+
+    Las dos pasadas leen con un cursor del lado del servidor en una conexión
+    aparte; cada lote se escribe con COPY en conn en cuanto se califica, así que
+    en memoria solo hay un lote. Las banderas se guardan por fila (huella_contenido,
+    única; codigo_contrato se repite); las filas sin huella se omiten hasta
+    correr scripts/backfill_huellas.py.
+
+    No hace commit: el llamador decide la transacción.
+    Retorna {'contratos': n, 'con_banderas': n, 'sin_huella': n, 'actualizados': n}.
+    """
+    with conn.engine.connect() as lectura:
+        proveedores_ad, expedientes_un_proveedor, limites_monto = _primera_pasada(lectura)
+        lectura.rollback()
+        logger.info(
+            f"[Riesgo] {len(proveedores_ad)} proveedores con alta adjudicación directa, "
+            f"{len(expedientes_un_proveedor)} expedientes competitivos con un solo proveedor, "
+            f"{len(limites_monto)} tipos con límite de monto"
+        )
+
+        conn.execute(text("TRUNCATE contratos.riesgo_banderas"))
+
+        calculado_en = datetime.utcnow()
+        total = con_banderas = sin_huella = 0
+        for df in _leer_lotes(lectura):
+            banderas = _banderas(df, proveedores_ad, expedientes_un_proveedor, limites_monto)
+            con_huella = banderas['huella_contenido'].notna()
+            sin_huella += int((~con_huella).sum())
+            banderas = banderas[con_huella].assign(calculado_en=calculado_en)
+
+            if not banderas.empty:
+                _escribir_banderas(conn, banderas)
+            total += len(banderas)
+            con_banderas += int((banderas['puntaje'] > 0).sum())
+        lectura.rollback()
+
+    if sin_huella:
+        logger.warning(f"[Riesgo] {sin_huella} contratos sin huella_contenido omitidos (correr backfill_huellas.py)")
+
+    actualizados = conn.execute(text("""
+        UPDATE contratos.contratos c
+        SET riesgo_puntaje = b.puntaje
+        FROM contratos.riesgo_banderas b
+        WHERE c.huella_contenido = b.huella_contenido
+          AND c.riesgo_puntaje IS DISTINCT FROM b.puntaje
+    """)).rowcount
+
+    logger.info(f"[Riesgo] {total} contratos calificados, {con_banderas} con banderas, {actualizados} actualizados")
+    return {'contratos': total, 'con_banderas': con_banderas, 'sin_huella': sin_huella, 'actualizados': actualizados}
@@ -0,0 +1,411 @@
+# app/services/rollup_service.py
+
+"""Servicio de rollups - Responde filtros y agregados desde tablas pre-agregadas"""
+from sqlalchemy import func, text
+from app import db
+from app.utils.anios import anios_enteros
+from app.utils.query_parser import parse_search_query
+import logging
+
+logger = logging.getLogger(__name__)
+
+RFC_GENERICO = 'XAXX010101000'
+
+# Misma regla de agrupación que AggregationService: RFC si es válido, si no el nombre
+RFC_GROUP_KEY_SQL = """
+    CASE WHEN rfc IS NOT NULL AND rfc <> '' AND rfc <> 'XAXX010101000'
+         THEN rfc ELSE proveedor_contratista END
+"""
+
+CLAVE_ES_RFC_SQL = """
+    (rfc IS NOT NULL AND rfc <> '' AND rfc <> 'XAXX010101000')
+"""
+
+# anio_fuente normalizado a un año de 4 dígitos (otro valor queda NULL). Solo para el
+# SELECT: los filtros por año comparan la columna INTEGER directamente para usar idx_contratos_anio
+ANIO_FUENTE_SQL = r"""
+    CASE WHEN anio_fuente::text ~ '^\d{4}$' THEN anio_fuente::text::integer END
+"""
+
+
+def refrescar_rollups(session, anios=None):
+    """
+    Reconstruye las celdas del rollup. Si se indican años, solo recalcula esos
+    años (actualización incremental después de una carga); con anios=None, todo
+    el rollup. Una lista sin años válidos no cambia nada.
+
+    No hace commit: el llamador decide la transacción.
+    """
+    filtro_anio = ''
+    params = {}
+    if anios is None:
+        session.execute(text("DELETE FROM contratos.rollup_contratos"))
+    else:
+        anios = anios_enteros(anios)
+        if not anios:
+            return 0
+        filtro_anio = 'WHERE anio_fuente = ANY(:anios)'
+        params['anios'] = anios
+        session.execute(text("""
+            DELETE FROM contratos.rollup_contratos WHERE anio_fuente = ANY(:anios)
+        """), params)
+
+    result = session.execute(text(f"""
+        INSERT INTO contratos.rollup_contratos (
+            rfc_group_key, clave_es_rfc, siglas_institucion, anio_fuente,
+            tipo_contratacion, tipo_procedimiento, estatus_contrato,
+            num_contratos, monto_total,
+            proveedor_nombre, rfc, institucion_nombre
+        )
+        SELECT
+            {RFC_GROUP_KEY_SQL} AS rfc_group_key,
+            {CLAVE_ES_RFC_SQL} AS clave_es_rfc,
+            siglas_institucion,
+            {ANIO_FUENTE_SQL} AS anio_fuente,
+            tipo_contratacion,
+            tipo_procedimiento,
+            estatus_contrato,
+            COUNT(*) AS num_contratos,
+            SUM(importe) AS monto_total,
+            MAX(proveedor_contratista) AS proveedor_nombre,
+            MAX(rfc) AS rfc,
+            institucion AS institucion_nombre
+        FROM contratos.contratos
+        {filtro_anio}
+        GROUP BY 1, 2, 3, 4, 5, 6, 7, institucion
+    """), params)
+
+    logger.info(f"[Rollup] {result.rowcount} celdas recalculadas (años: {anios or 'todos'})")
+    return result.rowcount
+
+
+def refrescar_cubo_mensual(session, anios=None):
+    """
+    Reconstruye el cubo mensual (mes de fecha_inicio_contrato × institución ×
+    tipo de procedimiento × proveedor). Con años, solo recalcula esos años
+    (igual que refrescar_rollups: una lista sin años válidos no cambia nada).
+    Los contratos sin fecha de inicio no tienen mes y no entran al cubo.
+
+    No hace commit: el llamador decide la transacción.
+    """
+    filtro_anio = ''
+    params = {}
+    if anios is None:
+        session.execute(text("DELETE FROM contratos.cubo_mensual"))
+    else:
+        anios = anios_enteros(anios)
+        if not anios:
+            return 0
+        filtro_anio = 'AND anio_fuente = ANY(:anios)'
+        params['anios'] = anios
+        session.execute(text("""
+            DELETE FROM contratos.cubo_mensual WHERE anio_fuente = ANY(:anios)
+        """), params)
+
+    result = session.execute(text(f"""
+        INSERT INTO contratos.cubo_mensual (
+            mes, anio_fuente, siglas_institucion, tipo_procedimiento,
+            rfc_group_key, clave_es_rfc, num_contratos, monto_total
+        )
+        SELECT
+            date_trunc('month', fecha_inicio_contrato)::date AS mes,
+            {ANIO_FUENTE_SQL} AS anio_fuente,
+            siglas_institucion,
+            tipo_procedimiento,
+            {RFC_GROUP_KEY_SQL} AS rfc_group_key,
+            {CLAVE_ES_RFC_SQL} AS clave_es_rfc,
+            COUNT(*) AS num_contratos,
+            SUM(importe) AS monto_total
+        FROM contratos.contratos
+        WHERE fecha_inicio_contrato IS NOT NULL
+        {filtro_anio}
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """), params)
+
+    logger.info(f"[Rollup] Cubo mensual: {result.rowcount} celdas (años: {anios or 'todos'})")
+    return result.rowcount
+
+
+class RollupService:
+    """Servicio para responder consultas expresables sobre las dimensiones del rollup"""
+
+    # Filtros que son dimensiones del rollup (riesgo_min, por ejemplo, no lo es)
+    FILTROS_ROLLUP = {'instituciones', 'tipos', 'procedimientos', 'anios', 'estatus'}
+
+    def filtros_expresables(self, filters):
+        """Verifica que todos los filtros activos se puedan aplicar sobre el rollup"""
+        return {k for k, v in (filters or {}).items() if v} <= self.FILTROS_ROLLUP
+
+    def disponible(self):
+        """Verifica que el rollup exista y tenga datos"""
+        try:
+            from app.models import RollupContrato
+            return db.session.query(RollupContrato.id).limit(1).first() is not None
+        except Exception as e:
+            logger.warning(f"Rollup no disponible: {str(e)}")
+            try:
+                db.session.rollback()
+            except:
+                pass
+            return False
+
+    @staticmethod
+    def clave_expresable(query_text, search_type, search_fields=None):
+        """
+        Retorna el RFC si la búsqueda equivale a un filtro exacto sobre rfc_group_key
+        (búsqueda simple por RFC válido), o None si requiere la tabla completa.
+        """
+        es_rfc = search_type == 'rfc' or (search_fields and search_fields == ['rfc'])
+        if not es_rfc or not query_text:
+            return None
+
+        if parse_search_query(query_text)['has_operators']:
+            return None
+
+        rfc = query_text.upper()
+        if rfc == RFC_GENERICO:
+            return None
+
+        return rfc
+
+    def _condiciones_filtros(self, filters):
+        """Mismas facetas que SearchService.build_filter_conditions, sobre el rollup"""
+        from app.models import RollupContrato
+
+        condiciones = {}
+
+        if not filters:
+            return condiciones
+
+        if filters.get('instituciones'):
+            condiciones['instituciones'] = RollupContrato.siglas_institucion.in_(filters['instituciones'])
+
+        if filters.get('tipos'):
+            condiciones['tipos'] = RollupContrato.tipo_contratacion.in_(filters['tipos'])
+
+        if filters.get('procedimientos'):
+            condiciones['procedimientos'] = RollupContrato.tipo_procedimiento.in_(filters['procedimientos'])
+
+        if filters.get('anios'):
+            anios = anios_enteros(filters['anios'])
+            condiciones['anios'] = RollupContrato.anio_fuente.in_(anios)
+
+        if filters.get('estatus'):
+            condiciones['estatus'] = RollupContrato.estatus_contrato.in_(filters['estatus'])
+
+        return condiciones
+
+    def _query_base(self, entidades, rfc=None):
+        """Query sobre el rollup restringida a la clave de proveedor (sin filtros de facetas)"""
+        from app.models import RollupContrato
+
+        query = db.session.query(*entidades)
+
+        if rfc:
+            query = query.filter(
+                RollupContrato.rfc_group_key == rfc,
+                RollupContrato.clave_es_rfc.is_(True)
+            )
+
+        return query
+
+    def _query_filtrada(self, entidades, filters=None, rfc=None):
+        """Query sobre el rollup con los mismos filtros que SearchService.apply_filters"""
+        query = self._query_base(entidades, rfc)
+
+        for condicion in self._condiciones_filtros(filters).values():
+            query = query.filter(condicion)
+
+        return query
+
+    def obtener_agregados(self, filters=None, rfc=None):
+        """Mismo formato que AggregationService.obtener_agregados_optimizado"""
+        from app.models import RollupContrato
+
+        num = func.sum(RollupContrato.num_contratos)
+        monto = func.sum(RollupContrato.monto_total)
+
+        totales = self._query_filtrada([num.label('total'), monto.label('monto_total')], filters, rfc).first()
+        total_contratos = int(totales.total or 0)
+        monto_total = float(totales.monto_total or 0)
+
+        proveedores_query = self._query_filtrada([
+            func.max(RollupContrato.proveedor_nombre).label('nombre'),
+            func.max(RollupContrato.rfc).label('rfc'),
+            num.label('num_contratos'),
+            monto.label('monto_total')
+        ], filters, rfc).filter(
+            RollupContrato.proveedor_nombre.isnot(None)
+        ).group_by(
+            RollupContrato.rfc_group_key
+        ).order_by(
+            monto.desc().nullslast()
+        ).limit(20)
+
+        proveedores = [{
+            'nombre': p.nombre,
+            'rfc': p.rfc if p.rfc and p.rfc != RFC_GENERICO else 'RFC Genérico',
+            'num_contratos': int(p.num_contratos),
+            'monto_total': float(p.monto_total or 0)
+        } for p in proveedores_query]
+
+        instituciones_query = self._query_filtrada([
+            func.max(RollupContrato.institucion_nombre).label('nombre'),
+            RollupContrato.siglas_institucion.label('siglas'),
+            num.label('num_contratos'),
+            monto.label('monto_total')
+        ], filters, rfc).filter(
+            RollupContrato.siglas_institucion.isnot(None)
+        ).group_by(
+            RollupContrato.siglas_institucion
+        ).order_by(
+            monto.desc().nullslast()
+        ).limit(20)
+
+        instituciones = [{
+            'nombre': i.nombre,
+            'siglas': i.siglas,
+            'num_contratos': int(i.num_contratos),
+            'monto_total': float(i.monto_total or 0)
+        } for i in instituciones_query]
+
+        por_anio_query = self._query_filtrada([
+            RollupContrato.anio_fuente.label('anio'),
+            num.label('num_contratos'),
+            monto.label('monto_total')
+        ], filters, rfc).filter(
+            RollupContrato.anio_fuente.isnot(None)
+        ).group_by(
+            RollupContrato.anio_fuente
+        ).order_by(
+            RollupContrato.anio_fuente
+        )
+
+        contratos_por_anio = [{
+            'anio': c.anio,
+            'num_contratos': int(c.num_contratos),
+            'monto_total': float(c.monto_total or 0)
+        } for c in por_anio_query]
+
+        logger.info(f"[Rollup] Agregados: {total_contratos} contratos, ${monto_total:,.2f}")
+
+        return {
+            'total_contratos': total_contratos,
+            'monto_total': monto_total,
+            'top_proveedores': proveedores,
+            'top_instituciones': instituciones,
+            'contratos_por_anio': contratos_por_anio,
+            'contratos_por_mes': self.obtener_series_mensuales(filters, rfc)
+        }
+
+    # Facetas que coinciden con las dimensiones del cubo mensual
+    FILTROS_CUBO = {'instituciones', 'procedimientos', 'anios'}
+
+    def obtener_series_mensuales(self, filters=None, rfc=None):
+        """
+        Serie mensual (num_contratos, monto_total) desde el cubo mensual.
+        Retorna [] si algún filtro activo no es dimensión del cubo (tipos, estatus).
+        """
+        from app.models import CuboMensual
+
+        filters = filters or {}
+        if not {k for k, v in filters.items() if v} <= self.FILTROS_CUBO:
+            return []
+
+        query = db.session.query(
+            CuboMensual.mes,
+            func.sum(CuboMensual.num_contratos).label('num_contratos'),
+            func.sum(CuboMensual.monto_total).label('monto_total')
+        )
+
+        if rfc:
+            query = query.filter(
+                CuboMensual.rfc_group_key == rfc,
+                CuboMensual.clave_es_rfc.is_(True)
+            )
+        if filters.get('instituciones'):
+            query = query.filter(CuboMensual.siglas_institucion.in_(filters['instituciones']))
+        if filters.get('procedimientos'):
+            query = query.filter(CuboMensual.tipo_procedimiento.in_(filters['procedimientos']))
+        if filters.get('anios'):
+            anios = anios_enteros(filters['anios'])
+            query = query.filter(CuboMensual.anio_fuente.in_(anios))
+
+        query = query.group_by(CuboMensual.mes).order_by(CuboMensual.mes)
+
+        try:
+            return [{
+                'mes': m.mes.strftime('%Y-%m'),
+                'num_contratos': int(m.num_contratos),
+                'monto_total': float(m.monto_total or 0)
+            } for m in query]
+        except Exception as e:
+            logger.warning(f"[Rollup] Cubo mensual no disponible: {str(e)}")
+            try:
+                db.session.rollback()
+            except:
+                pass
+            return []
+
+    def obtener_filtros_disponibles(self, filters=None, rfc=None):
+        """Mismo formato (y conteos disyuntivos) que FilterService.obtener_filtros_disponibles"""
+        from app.models import RollupContrato
+        from app.services.filter_service import FilterService, FACETAS
+
+        columnas = {faceta: getattr(RollupContrato, columna) for faceta, columna, _ in FACETAS}
+
+        return FilterService().calcular_facetas(
+            self._query_base([RollupContrato.id], rfc),
+            columnas,
+            self._condiciones_filtros(filters),
+            lambda: func.sum(RollupContrato.num_contratos),
+            filters
+        )
+
+    def obtener_catalogo_filtros(self):
+        """Catálogo de /api/filters: instituciones, años y tipos disponibles"""
+        from app.models import RollupContrato
+
+        num = func.sum(RollupContrato.num_contratos)
+
+        # Mismo agrupamiento que la consulta sobre contratos.contratos: (siglas, institución)
+        instituciones = db.session.query(
+            RollupContrato.siglas_institucion,
+            RollupContrato.institucion_nombre,
+            num.label('total')
+        ).filter(
+            RollupContrato.siglas_institucion.isnot(None)
+        ).group_by(
+            RollupContrato.siglas_institucion,
+            RollupContrato.institucion_nombre
+        ).having(
+            num > 10
+        ).order_by(
+            num.desc()
+        ).limit(100).all()
+
+        anios = db.session.query(RollupContrato.anio_fuente).distinct().filter(
+            RollupContrato.anio_fuente.isnot(None)
+        ).order_by(RollupContrato.anio_fuente.desc()).all()
+
+        tipos_contratacion = db.session.query(RollupContrato.tipo_contratacion).distinct().filter(
+            RollupContrato.tipo_contratacion.isnot(None)
+        ).all()
+
+        tipos_procedimiento = db.session.query(RollupContrato.tipo_procedimiento).distinct().filter(
+            RollupContrato.tipo_procedimiento.isnot(None)
+        ).all()
+
+        return {
+            'instituciones': [
+                {
+                    'siglas': inst[0],
+                    'nombre': inst[1] or inst[0],
+                    'total': int(inst[2])
+                }
+                for inst in instituciones
+            ],
+            'anios': [a[0] for a in anios if a[0]],
+            'tipos_contratacion': [t[0] for t in tipos_contratacion if t[0]],
+            'tipos_procedimiento': [t[0] for t in tipos_procedimiento if t[0]]
+        }
@@ -3,7 +3,8 @@
 """Servicio de búsqueda de contratos - Optimizado con Full Text Search"""
 import re
 import unicodedata
-from sqlalchemy import or_, and_, func, String
+from sqlalchemy import or_, and_, func
+from app.utils.anios import anios_enteros
 from app.utils.query_parser import parse_search_query
 
 
@@ -288,41 +289,52 @@ class SearchService:
                 Contrato.siglas_institucion
             ]
     
-    def apply_filters(self, query, filters):
-        """Aplica filtros adicionales a la consulta"""
+    def build_filter_conditions(self, filters):
+        """
+        Construye una condición por faceta de filtro.
+        Retorna dict {faceta: condición} solo con las facetas que tienen selección;
+        FilterService lo usa para calcular conteos disyuntivos (excluyendo cada faceta).
+        """
         from app.models import Contrato
-        
+
+        condiciones = {}
+
         if not filters:
-            return query
-        
+            return condiciones
+
         # Los nombres deben coincidir con lo que envía el frontend
         if filters.get('instituciones'):  # Plural
-            query = query.filter(
-                Contrato.siglas_institucion.in_(filters['instituciones'])
-            )
-        
+            condiciones['instituciones'] = Contrato.siglas_institucion.in_(filters['instituciones'])
+
         if filters.get('tipos'):  # Plural
-            query = query.filter(
-                Contrato.tipo_contratacion.in_(filters['tipos'])
-            )
-        
+            condiciones['tipos'] = Contrato.tipo_contratacion.in_(filters['tipos'])
+
         if filters.get('procedimientos'):  # Plural
-            query = query.filter(
-                Contrato.tipo_procedimiento.in_(filters['procedimientos'])
-            )
+            condiciones['procedimientos'] = Contrato.tipo_procedimiento.in_(filters['procedimientos'])
+
         if filters.get('anios'):  # Plural
-            # anio_fuente puede ser VARCHAR o INTEGER dependiendo de la BD
-            # Manejar ambos casos: comparar como string
-            query = query.filter(
-                Contrato.anio_fuente.cast(String).in_(
-                    [str(a) for a in filters['anios']]
-                )
-            )
-    
-        
+            # anio_fuente es INTEGER: comparar como entero para usar idx_contratos_anio
+            anios = anios_enteros(filters['anios'])
+            condiciones['anios'] = Contrato.anio_fuente.in_(anios)
+
         if filters.get('estatus'):  # Singular
-            query = query.filter(
-                Contrato.estatus_contrato.in_(filters['estatus'])
-            )
-        
-        return query
\ No newline at end of file
+            condiciones['estatus'] = Contrato.estatus_contrato.in_(filters['estatus'])
+
+        # No es faceta: se aplica a todas (puntaje pre-calculado en contratos.riesgo_puntaje)
+        if filters.get('riesgo_min') not in (None, ''):
+            try:
+                condiciones['riesgo_min'] = Contrato.riesgo_puntaje >= int(filters['riesgo_min'])
+            except (ValueError, TypeError):
+                pass
+
+        return condiciones
+
+    def apply_filters(self, query, filters):
+        """Aplica filtros adicionales a la consulta"""
+        if not filters:
+            return query
+
+        for condicion in self.build_filter_conditions(filters).values():
+            query = query.filter(condicion)
+
+        return query
@@ -149,7 +149,8 @@ function toggleSearchHelp() {
 async function buscar(resetFilters = true) {
     const query = document.getElementById('searchInput').value.trim();
     if (!query) {
-        mostrarError('Por favor ingresa un término de búsqueda');
+        // Sin término: explorar solo por filtros
+        await explorar(resetFilters);
         return;
     }
 
@@ -240,6 +241,92 @@ async function buscar(resetFilters = true) {
     }
 }
 
+// ===========================
+// Exploración solo por filtros (sin término de búsqueda)
+// ===========================
+async function explorar(resetFilters = true) {
+    lastQuery = '';
+    lastSearchFields = [];
+    lastSearchType = 'todo';
+
+    if (resetFilters) {
+        activeFilters = {};
+        hiddenProviders.clear();
+        hiddenInstitutions.clear();
+    }
+
+    currentPage = 1;
+
+    document.getElementById('loading').classList.remove('hidden');
+    document.getElementById('resultsArea').classList.add('hidden');
+    document.getElementById('errorMessage').classList.add('hidden');
+
+    try {
+        const response = await fetch('/api/explorar', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                filters: activeFilters
+            })
+        });
+
+        document.getElementById('loading').classList.add('hidden');
+
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || `Error HTTP: ${response.status}`);
+        }
+
+        const data = await response.json();
+
+        if (!data || data.total === 0) {
+            mostrarError('No hay contratos con esos filtros');
+            return;
+        }
+
+        currentSearchData = data;
+        totalCount = data.total;
+        totalPages = 1;
+
+        document.getElementById('resultsArea').classList.remove('hidden');
+
+        renderExplorationSummary(data);
+        renderFilters(data.filtros_disponibles || {});
+        renderAggregates(data, 'todo');
+
+        // La exploración solo trae agregados; los contratos se listan con un término de búsqueda
+        document.getElementById('contratosSection').classList.add('hidden');
+
+        updateActiveFiltersDisplay();
+
+    } catch (error) {
+        console.error('Error en exploración:', error);
+        document.getElementById('loading').classList.add('hidden');
+        mostrarError(error.message || 'Error al explorar los contratos. Por favor intenta de nuevo.');
+    }
+}
+
+function renderExplorationSummary(data) {
+    let summaryHtml = `
+        <strong>Exploración por filtros</strong> |
+        <strong>Total:</strong> ${data.total.toLocaleString()} contratos |
+        <strong>Monto total:</strong> ${formatMoney(data.monto_total)}
+    `;
+
+    // Conteos distintos aproximados (sketches HyperLogLog), si los filtros los permiten
+    const c = data.cardinalidades;
+    if (c) {
+        summaryHtml += ` |
+        <strong>Proveedores:</strong> ≈${c.proveedores_unicos.toLocaleString()} |
+        <strong>Empresas (RFC):</strong> ≈${c.empresas_unicas.toLocaleString()} |
+        <strong>Instituciones:</strong> ${c.instituciones_unicas.toLocaleString()}
+    `;
+    }
+    document.getElementById('resultsSummary').innerHTML = summaryHtml;
+}
+
 // ===========================
 // Render del resumen de resultados
 // ===========================
@@ -504,6 +591,7 @@ function applyFilters() {
 // ===========================
 // Variable global para la gráfica
 let yearlyChartInstance = null;
+let monthlyChartInstance = null;
 
 function renderAggregates(data, searchType) {
     // Mostrar proveedores
@@ -529,6 +617,97 @@ function renderAggregates(data, searchType) {
     } else {
         document.getElementById('chartSection').classList.add('hidden');
     }
+
+    // Mostrar gráfica de gasto mensual (solo si el servidor pudo calcular la serie)
+    if (data.contratos_por_mes && data.contratos_por_mes.length > 0) {
+        renderMonthlyChart(data.contratos_por_mes);
+        document.getElementById('monthlyChartSection').classList.remove('hidden');
+    } else {
+        document.getElementById('monthlyChartSection').classList.add('hidden');
+    }
+}
+
+function renderMonthlyChart(datosMensuales) {
+    const ctx = document.getElementById('monthlyChart');
+    if (!ctx) return;
+
+    // Destruir gráfica anterior si existe
+    if (monthlyChartInstance) {
+        monthlyChartInstance.destroy();
+    }
+
+    // Una línea por año con los 12 meses en el eje X (comparación año contra año)
+    const meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic'];
+    const porAnio = {};
+    datosMensuales.forEach(d => {
+        const [anio, mes] = d.mes.split('-');
+        if (!porAnio[anio]) {
+            porAnio[anio] = new Array(12).fill(0);
+        }
+        porAnio[anio][parseInt(mes, 10) - 1] = d.monto_total / 1000000; // Convertir a millones
+    });
+
+    const anios = Object.keys(porAnio).sort();
+    const datasets = anios.map((anio, i) => {
+        const tono = Math.round(220 + (i * 137) % 140);
+        return {
+            label: anio,
+            data: porAnio[anio],
+            borderColor: `hsl(${tono}, 70%, 55%)`,
+            backgroundColor: `hsla(${tono}, 70%, 55%, 0.1)`,
+            borderWidth: 2,
+            tension: 0.3,
+            fill: false
+        };
+    });
+
+    monthlyChartInstance = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: meses,
+            datasets: datasets
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            interaction: {
+                mode: 'index',
+                intersect: false,
+            },
+            plugins: {
+                legend: {
+                    position: 'top',
+                    labels: {
+                        usePointStyle: true,
+                        padding: 20
+                    }
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return context.dataset.label + ': $' + (context.raw).toFixed(2) + ' MDP';
+                        }
+                    }
+                }
+            },
+            scales: {
+                y: {
+                    title: {
+                        display: true,
+                        text: 'Monto (MDP)'
+                    },
+                    grid: {
+                        color: 'rgba(0, 0, 0, 0.05)'
+                    }
+                },
+                x: {
+                    grid: {
+                        display: false
+                    }
+                }
+            }
+        }
+    });
 }
 
 function renderYearlyChart(datosAnuales) {
@@ -646,7 +825,8 @@ function renderProviders(proveedores) {
     const visibleProviders = allProviders.filter(prov => !hiddenProviders.has(prov.nombre));
 
     const html = visibleProviders.map(prov => `
-        <div class="aggregate-item" data-name="${escapeHtml(prov.nombre)}">
+        <div class="aggregate-item clickable" data-name="${escapeHtml(prov.nombre)}"
+             onclick="showProviderProfile('${escapeHtml(claveProveedor(prov)).replace(/'/g, "\\'")}')">
             <div class="aggregate-info">
                 <div class="aggregate-name">${escapeHtml(prov.nombre || 'Sin nombre')}</div>
                 <div class="aggregate-details">
@@ -673,6 +853,120 @@ function renderProviders(proveedores) {
     }
 }
 
+// Misma clave que el servidor: RFC si es válido, si no el nombre del proveedor
+function claveProveedor(prov) {
+    return prov.rfc && prov.rfc !== 'RFC Genérico' ? prov.rfc : (prov.nombre || '');
+}
+
+async function showProviderProfile(clave) {
+    if (!clave) return;
+
+    try {
+        const response = await fetch(`/api/proveedores/${encodeURIComponent(clave)}`);
+
+        if (response.status === 404) {
+            mostrarError('El perfil de este proveedor aún no está disponible');
+            return;
+        }
+        if (!response.ok) {
+            throw new Error('Error al obtener el perfil');
+        }
+
+        const perfil = await response.json();
+        renderProviderProfile(perfil);
+        document.getElementById('perfilModal').classList.remove('hidden');
+
+    } catch (error) {
+        console.error('Error al obtener el perfil del proveedor:', error);
+        mostrarError('Error al obtener el perfil del proveedor');
+    }
+}
+
+function renderProviderProfile(perfil) {
+    const filas = (items, etiqueta) => items.map(item => `
+        <div class="perfil-fila">
+            <span>${etiqueta(item)}</span>
+            <span>${item.num_contratos !== undefined ? item.num_contratos + ' contratos · ' : ''}${formatMoney(item.monto_total !== undefined ? item.monto_total : item.importe)}</span>
+        </div>
+    `).join('');
+
+    document.getElementById('perfilContenido').innerHTML = `
+        <h3>${escapeHtml(perfil.nombre || perfil.clave)}</h3>
+        <div class="perfil-resumen">
+            <div>RFC<strong>${escapeHtml(perfil.rfc)}</strong></div>
+            <div>Contratos<strong>${perfil.num_contratos.toLocaleString()}</strong></div>
+            <div>Monto total<strong>${formatMoney(perfil.monto_total)}</strong></div>
+            <div>Periodo<strong>${perfil.primer_contrato || 'N/A'} – ${perfil.ultimo_contrato || 'N/A'}</strong></div>
+        </div>
+        <div class="perfil-seccion">
+            <h4>Por año</h4>
+            ${filas(perfil.contratos_por_anio, a => a.anio)}
+            <h4>Principales instituciones</h4>
+            ${filas(perfil.top_instituciones, i => escapeHtml(i.siglas || i.nombre || ''))}
+            <h4>Tipos de procedimiento</h4>
+            ${filas(perfil.tipos_procedimiento, p => escapeHtml(p.tipo || ''))}
+            <h4>Contratos de mayor importe</h4>
+            ${filas(perfil.contratos_mayores, c => escapeHtml(`${c.siglas_institucion || ''} · ${c.titulo || c.codigo_contrato}`))}
+        </div>
+    `;
+}
+
+async function showInstitutionProfile(siglas) {
+    if (!siglas) return;
+
+    try {
+        const response = await fetch(`/api/instituciones/${encodeURIComponent(siglas)}`);
+
+        if (response.status === 404) {
+            mostrarError('El perfil de esta institución aún no está disponible');
+            return;
+        }
+        if (!response.ok) {
+            throw new Error('Error al obtener el perfil');
+        }
+
+        const perfil = await response.json();
+        renderInstitutionProfile(perfil);
+        document.getElementById('perfilModal').classList.remove('hidden');
+
+    } catch (error) {
+        console.error('Error al obtener el perfil de la institución:', error);
+        mostrarError('Error al obtener el perfil de la institución');
+    }
+}
+
+function renderInstitutionProfile(perfil) {
+    const porcentaje = valor => valor === null || valor === undefined ? 'N/A' : (valor * 100).toFixed(1) + '%';
+    const periodo = perfil.periodo || {};
+
+    const filasAnio = perfil.por_anio.map(a => `
+        <div class="perfil-fila">
+            <span>${a.anio}</span>
+            <span>${formatMoney(a.monto_total)} · Top 10: ${porcentaje(a.top10_share)} · HHI: ${a.hhi ?? 'N/A'} · AD: ${porcentaje(a.adjudicacion_directa_share)}</span>
+        </div>
+    `).join('');
+
+    document.getElementById('perfilContenido').innerHTML = `
+        <h3>${escapeHtml(perfil.nombre || perfil.siglas)}</h3>
+        <div class="perfil-resumen">
+            <div>Contratos<strong>${(periodo.num_contratos || 0).toLocaleString()}</strong></div>
+            <div>Monto total<strong>${formatMoney(periodo.monto_total || 0)}</strong></div>
+            <div>Proveedores<strong>${(periodo.num_proveedores || 0).toLocaleString()}</strong></div>
+            <div>Top 10 proveedores<strong>${porcentaje(periodo.top10_share)}</strong></div>
+            <div>HHI<strong>${periodo.hhi ?? 'N/A'}</strong></div>
+            <div>Adjudicación directa<strong>${porcentaje(periodo.adjudicacion_directa_share)}</strong></div>
+        </div>
+        <div class="perfil-seccion">
+            <h4>Por año</h4>
+            ${filasAnio}
+        </div>
+    `;
+}
+
+function closePerfil() {
+    document.getElementById('perfilModal').classList.add('hidden');
+}
+
 function renderInstitutions(instituciones) {
     // Guardar todas las instituciones
     if (instituciones && instituciones.length > 0) {
@@ -683,7 +977,8 @@ function renderInstitutions(instituciones) {
     const visibleInstitutions = allInstitutions.filter(inst => !hiddenInstitutions.has(inst.siglas));
 
     const html = visibleInstitutions.map(inst => `
-        <div class="aggregate-item" data-siglas="${escapeHtml(inst.siglas)}">
+        <div class="aggregate-item clickable" data-siglas="${escapeHtml(inst.siglas)}"
+             onclick="showInstitutionProfile('${escapeHtml(inst.siglas).replace(/'/g, "\\'")}')">
             <div class="aggregate-info">
                 <div class="aggregate-name">${escapeHtml(inst.nombre || inst.siglas)}</div>
                 <div class="aggregate-details">
@@ -919,6 +1214,7 @@ function renderContracts(contratos) {
                 <div class="contract-badges">
                     ${contrato.anio_fuente ? `<span class="contract-badge">${contrato.anio_fuente}</span>` : ''}
                     ${contrato.estatus ? `<span class="contract-badge">${escapeHtml(contrato.estatus)}</span>` : ''}
+                    ${contrato.riesgo_puntaje ? `<span class="contract-badge" title="Puntaje de riesgo (0-100)">Riesgo ${contrato.riesgo_puntaje}</span>` : ''}
                 </div>
                 ${contrato.direccion_anuncio ? `
                     <a href="${escapeHtml(contrato.direccion_anuncio)}" target="_blank" rel="noopener noreferrer" class="contract-link-btn">
@@ -0,0 +1,18 @@
+# app/utils/anios.py
+"""
+Años de filtros y refrescos como enteros (anio_fuente es INTEGER).
+"""
+
+
+def anios_enteros(valores):
+    """
+    Años únicos y ordenados como int; los valores que no son un año
+    ('', 'todos', None) se descartan. Lista vacía si no queda ninguno.
+    """
+    anios = set()
+    for valor in valores or []:
+        try:
+            anios.add(int(valor))
+        except (ValueError, TypeError):
+            pass
+    return sorted(anios)
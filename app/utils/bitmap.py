@@ -0,0 +1,130 @@
+# app/utils/bitmap.py
+"""
+Índices bitmap sobre el snapshot columnar (app/utils/columnar.py).
+
+Por cada faceta de filtro se guarda una matriz (valores × bytes) con un bitset
+empaquetado (np.packbits, 1 bit por contrato) por valor. Las matrices se
+escriben junto al snapshot y se abren memory-mapped, así que los workers las
+comparten. Una combinación de filtros se resuelve con OR dentro de cada faceta
+y AND entre facetas; los conteos de facetas son popcounts de intersecciones.
+"""
+from pathlib import Path
+
+import numpy as np
+
+# Faceta del frontend -> dimensión del snapshot (mismos nombres que FilterService)
+FACETAS_BITMAP = {
+    'instituciones': 'siglas_institucion',
+    'tipos': 'tipo_contratacion',
+    'procedimientos': 'tipo_procedimiento',
+    'anios': 'anio_fuente',
+    'estatus': 'estatus_contrato'
+}
+
+# Bits encendidos por cada valor de byte (numpy < 2.0 no tiene np.bitwise_count)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+_BITWISE_COUNT = getattr(np, 'bitwise_count', None)
+
+# Bytes del buffer de conteos de facetas: las intersecciones se cuentan por tramos de valores
+BYTES_BUFFER = 1024 * 1024
+
+
+def _contar_bytes(bits, out=None):
+    """Bits encendidos por byte (en out si se da, puede ser el mismo arreglo)"""
+    if _BITWISE_COUNT is not None:
+        return _BITWISE_COUNT(bits, out=out)
+    return np.take(_POPCOUNT, bits, out=out)
+
+
+def popcount(bits):
+    """Número de bits encendidos en un bitset empaquetado (o por fila en una matriz)"""
+    return _contar_bytes(bits).sum(axis=-1, dtype=np.int64)
+
+
+def escribir_bitmaps(ruta, columnas, diccionarios):
+    """Escribe bitmap_<dimensión>.npy para cada faceta en el directorio de la versión"""
+    ruta = Path(ruta)
+    for dimension in FACETAS_BITMAP.values():
+        codigos = columnas[dimension]
+        n_valores = len(diccionarios[dimension])
+        matriz = np.zeros((n_valores, (len(codigos) + 7) // 8), dtype=np.uint8)
+        for codigo in range(n_valores):
+            matriz[codigo] = np.packbits(codigos == codigo)
+        np.save(ruta / f'bitmap_{dimension}.npy', matriz)
+
+
+class IndiceBitmap:
+    """Bitsets por valor de faceta (memory-mapped, solo lectura)"""
+
+    def __init__(self, ruta, diccionarios, filas):
+        ruta = Path(ruta)
+        self.filas = filas
+        self.bytes = (filas + 7) // 8
+        self.valores = {}
+        self.matrices = {}
+        for faceta, dimension in FACETAS_BITMAP.items():
+            self.matrices[faceta] = np.load(ruta / f'bitmap_{dimension}.npy', mmap_mode='r')
+            # Los filtros llegan como texto o número: llave str(valor) para todas las facetas
+            self.valores[faceta] = {str(v): i for i, v in enumerate(diccionarios[dimension])}
+
+    def _todos(self):
+        bits = np.full(self.bytes, 0xFF, dtype=np.uint8)
+        sobrantes = self.bytes * 8 - self.filas
+        if sobrantes:
+            bits[-1] = (0xFF << sobrantes) & 0xFF
+        return bits
+
+    def _seleccion(self, faceta, valores):
+        """OR de los bitsets de los valores seleccionados en una faceta"""
+        bits = np.zeros(self.bytes, dtype=np.uint8)
+        for valor in valores:
+            codigo = self.valores[faceta].get(str(valor))
+            if codigo is not None:
+                np.bitwise_or(bits, self.matrices[faceta][codigo], out=bits)
+        return bits
+
+    def resolver(self, filters, excluir=None):
+        """AND de las selecciones de todas las facetas (opcionalmente excepto una)"""
+        bits = self._todos()
+        for faceta in FACETAS_BITMAP:
+            if faceta == excluir or not (filters or {}).get(faceta):
+                continue
+            np.bitwise_and(bits, self._seleccion(faceta, filters[faceta]), out=bits)
+        return bits
+
+    def filas_de(self, bits):
+        """Posiciones (filas del snapshot) de los bits encendidos"""
+        return np.flatnonzero(np.unpackbits(bits, count=self.filas))
+
+    @staticmethod
+    def _popcount_por_valor(matriz, base, buffer):
+        """
+        popcount(matriz[i] & base) de cada valor, por tramos de filas en el buffer
+        (sin copiar la matriz completa de intersecciones)
+        """
+        conteos = np.empty(len(matriz), dtype=np.int64)
+        for inicio in range(0, len(matriz), len(buffer)):
+            fin = min(inicio + len(buffer), len(matriz))
+            tramo = buffer[:fin - inicio]
+            np.bitwise_and(matriz[inicio:fin], base, out=tramo)
+            _contar_bytes(tramo, out=tramo)
+            conteos[inicio:fin] = tramo.sum(axis=1, dtype=np.int64)
+        return conteos
+
+    def conteos_facetas(self, filters):
+        """
+        Conteos disyuntivos por faceta: cada faceta se cuenta con las selecciones
+        de las demás, igual que FilterService.calcular_facetas.
+        Retorna {faceta: {valor: conteo}} sin ordenar ni recortar.
+        """
+        conteos = {}
+        buffer = np.empty((max(1, BYTES_BUFFER // max(self.bytes, 1)), self.bytes), dtype=np.uint8)
+        for faceta, dimension in FACETAS_BITMAP.items():
+            base = self.resolver(filters, excluir=faceta)
+            por_valor = self._popcount_por_valor(self.matrices[faceta], base, buffer)
+            conteos[faceta] = {
+                valor: int(por_valor[codigo])
+                for valor, codigo in self.valores[faceta].items()
+                if por_valor[codigo]
+            }
+        return conteos
@@ -0,0 +1,366 @@
+# app/utils/columnar.py
+"""
+Snapshot columnar de las dimensiones de agregación de contratos.
+
+Cada columna se guarda como un archivo .npy (dimensiones codificadas con
+diccionario en int32, -1 = NULL; importe en float64) y se abre con
+mmap_mode='r', así que todos los workers de gunicorn comparten las mismas
+páginas del sistema operativo. Las filas están ordenadas por huella_contenido
+(única por fila; codigo_contrato se repite) para mapear las filas de una
+búsqueda a posiciones con searchsorted. Las filas sin huella (legadas, antes
+de scripts/backfill_huellas.py) se guardan con clave vacía y no se pueden mapear.
+
+Estructura en disco:
+    <directorio>/ACTUAL            -> nombre de la versión vigente
+    <directorio>/<version>/*.npy   -> columnas
+    <directorio>/<version>/bitmap_*.npy -> índices bitmap por faceta
+    <directorio>/<version>/diccionarios.json
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app.utils.bitmap import escribir_bitmaps, FACETAS_BITMAP, IndiceBitmap
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Dimensiones codificadas con diccionario (mismo orden que el rollup)
+DIMENSIONES = [
+    'rfc_group_key',
+    'siglas_institucion',
+    'anio_fuente',
+    'tipo_contratacion',
+    'tipo_procedimiento',
+    'estatus_contrato',
+    'mes'  # AAAAMM de fecha_inicio_contrato
+]
+
+TAMANO_LOTE = 100000
+# huella_contenido (UUID) como 32 caracteres hex
+ANCHO_HUELLA = 'S32'
+VERSIONES_A_CONSERVAR = 2
+
+
+class _Diccionario:
+    """Codificación incremental valor -> código (en orden de aparición)"""
+
+    def __init__(self):
+        self.codigos = {}
+        self.valores = []
+
+    def codificar(self, serie):
+        for valor in serie.dropna().unique():
+            if valor not in self.codigos:
+                self.codigos[valor] = len(self.valores)
+                self.valores.append(valor)
+        return serie.map(self.codigos).fillna(-1).to_numpy(dtype=np.int32)
+
+
+def _actualizar_maximos(destino, codigos, valores):
+    """Conserva MAX(valor) por código, igual que func.max en las agregaciones SQL"""
+    df = pd.DataFrame({'codigo': codigos, 'valor': valores})
+    df = df[(df['codigo'] >= 0) & df['valor'].notna()]
+    for codigo, valor in df.groupby('codigo')['valor'].max().items():
+        actual = destino.get(codigo)
+        if actual is None or valor > actual:
+            destino[codigo] = valor
+
+
+def escribir_snapshot(lotes, directorio):
+    """
+    Escribe una nueva versión del snapshot a partir de lotes de filas
+    (huella_contenido en hex, rfc_group_key, siglas_institucion, anio_fuente,
+    tipo_contratacion, tipo_procedimiento, estatus_contrato, mes, importe,
+    proveedor_contratista, rfc, institucion) y la publica en ACTUAL.
+
+    Retorna el número de filas escritas.
+    """
+    columnas = ['huella_contenido'] + DIMENSIONES + ['importe', 'proveedor_contratista', 'rfc', 'institucion']
+
+    diccionarios = {dim: _Diccionario() for dim in DIMENSIONES}
+    nombres_proveedor, rfcs_proveedor, nombres_institucion = {}, {}, {}
+    partes = {col: [] for col in ['huella_contenido', 'importe', 'con_proveedor'] + DIMENSIONES}
+
+    for filas in lotes:
+        df = pd.DataFrame(filas, columns=columnas)
+
+        partes['huella_contenido'].append(df['huella_contenido'].fillna('').astype(str).str.encode('ascii').to_numpy())
+        partes['importe'].append(pd.to_numeric(df['importe'], errors='coerce').to_numpy(dtype=np.float64))
+        partes['con_proveedor'].append(df['proveedor_contratista'].notna().to_numpy())
+
+        for dim in DIMENSIONES:
+            partes[dim].append(diccionarios[dim].codificar(df[dim]))
+
+        _actualizar_maximos(nombres_proveedor, partes['rfc_group_key'][-1], df['proveedor_contratista'])
+        _actualizar_maximos(rfcs_proveedor, partes['rfc_group_key'][-1], df['rfc'])
+        _actualizar_maximos(nombres_institucion, partes['siglas_institucion'][-1], df['institucion'])
+
+    columnas_finales = {}
+    if partes['huella_contenido']:
+        huellas = np.concatenate(partes['huella_contenido']).astype(ANCHO_HUELLA)
+    else:
+        huellas = np.array([], dtype=ANCHO_HUELLA)
+    orden = np.argsort(huellas, kind='stable')
+    columnas_finales['huella_contenido'] = huellas[orden]
+
+    for col in ['importe', 'con_proveedor'] + DIMENSIONES:
+        if partes[col]:
+            columnas_finales[col] = np.concatenate(partes[col])[orden]
+        else:
+            columnas_finales[col] = np.array([], dtype=np.int32)
+
+    directorio = Path(directorio)
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    destino = directorio / version
+    destino.mkdir(parents=True, exist_ok=True)
+
+    for col, arreglo in columnas_finales.items():
+        np.save(destino / f'{col}.npy', arreglo)
+
+    metadatos = {
+        'version': version,
+        'filas': int(len(huellas)),
+        'sin_huella': int(np.count_nonzero(huellas == b'')),
+        'diccionarios': {dim: [_a_json(v, dim) for v in d.valores] for dim, d in diccionarios.items()},
+        'proveedor_nombre': [nombres_proveedor.get(i) for i in range(len(diccionarios['rfc_group_key'].valores))],
+        'proveedor_rfc': [rfcs_proveedor.get(i) for i in range(len(diccionarios['rfc_group_key'].valores))],
+        'institucion_nombre': [nombres_institucion.get(i) for i in range(len(diccionarios['siglas_institucion'].valores))]
+    }
+    with open(destino / 'diccionarios.json', 'w', encoding='utf-8') as f:
+        json.dump(metadatos, f, ensure_ascii=False)
+
+    escribir_bitmaps(destino, columnas_finales, metadatos['diccionarios'])
+
+    # Publicar la versión de forma atómica y limpiar versiones viejas
+    temporal = directorio / 'ACTUAL.tmp'
+    temporal.write_text(version)
+    os.replace(temporal, directorio / 'ACTUAL')
+
+    versiones = sorted(p for p in directorio.iterdir() if p.is_dir())
+    for vieja in versiones[:-VERSIONES_A_CONSERVAR]:
+        shutil.rmtree(vieja, ignore_errors=True)
+
+    logger.info(f"[Snapshot] Versión {version} publicada: {len(huellas):,} filas")
+    return int(len(huellas))
+
+
+def _a_json(valor, dimension):
+    """Convierte escalares de numpy a tipos nativos para json (años y meses siempre como int)"""
+    if dimension in ('anio_fuente', 'mes'):
+        return int(valor)
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def construir_snapshot(conn, directorio):
+    """Lee contratos.contratos en lotes (cursor del lado del servidor) y escribe el snapshot"""
+    from app.services.rollup_service import RFC_GROUP_KEY_SQL, ANIO_FUENTE_SQL
+
+    result = conn.execute(
+        text(f"""
+            SELECT replace(huella_contenido::text, '-', '') AS huella_contenido,
+                   {RFC_GROUP_KEY_SQL} AS rfc_group_key,
+                   siglas_institucion,
+                   {ANIO_FUENTE_SQL} AS anio_fuente,
+                   tipo_contratacion,
+                   tipo_procedimiento,
+                   estatus_contrato,
+                   (EXTRACT(YEAR FROM fecha_inicio_contrato) * 100
+                    + EXTRACT(MONTH FROM fecha_inicio_contrato))::integer AS mes,
+                   importe::float8 AS importe,
+                   proveedor_contratista,
+                   rfc,
+                   institucion
+            FROM contratos.contratos
+        """).execution_options(stream_results=True)
+    )
+
+    def lotes():
+        while True:
+            filas = result.fetchmany(TAMANO_LOTE)
+            if not filas:
+                break
+            yield filas
+
+    return escribir_snapshot(lotes(), directorio)
+
+
+class SnapshotColumnar:
+    """Snapshot de solo lectura (memory-mapped) con agregaciones vectorizadas"""
+
+    def __init__(self, ruta):
+        ruta = Path(ruta)
+        archivos = (
+            ['diccionarios.json', 'huella_contenido.npy', 'importe.npy', 'con_proveedor.npy']
+            + [f'{dim}.npy' for dim in DIMENSIONES]
+            + [f'bitmap_{dim}.npy' for dim in FACETAS_BITMAP.values()]
+        )
+        faltantes = [nombre for nombre in archivos if not (ruta / nombre).exists()]
+        if faltantes:
+            raise FileNotFoundError(
+                f"Snapshot {ruta} incompleto (faltan {', '.join(faltantes)}): "
+                f"reconstruirlo con scripts/build_snapshot.py"
+            )
+
+        with open(ruta / 'diccionarios.json', encoding='utf-8') as f:
+            metadatos = json.load(f)
+
+        self.version = metadatos['version']
+        self.diccionarios = metadatos['diccionarios']
+        self.proveedor_nombre = metadatos['proveedor_nombre']
+        self.proveedor_rfc = metadatos['proveedor_rfc']
+        self.institucion_nombre = metadatos['institucion_nombre']
+
+        self.huella_contenido = np.load(ruta / 'huella_contenido.npy', mmap_mode='r')
+        self.importe = np.load(ruta / 'importe.npy', mmap_mode='r')
+        self.con_proveedor = np.load(ruta / 'con_proveedor.npy', mmap_mode='r')
+        self.columnas = {dim: np.load(ruta / f'{dim}.npy', mmap_mode='r') for dim in DIMENSIONES}
+
+        # Índices bitmap por faceta
+        self.bitmaps = IndiceBitmap(ruta, self.diccionarios, len(self.importe))
+
+    def __len__(self):
+        return len(self.importe)
+
+    def filas(self, huellas):
+        """
+        Mapea huella_contenido (una por fila de la búsqueda) -> posición en el snapshot.
+        Retorna (posiciones, faltantes); faltantes > 0 indica que el snapshot está
+        desactualizado o que hay filas sin huella.
+        """
+        if len(huellas) == 0:
+            return np.array([], dtype=np.int64), 0
+        if len(self) == 0:
+            return np.array([], dtype=np.int64), len(huellas)
+
+        buscados = np.array(
+            [str(h).replace('-', '').encode('ascii') for h in huellas if h],
+            dtype=ANCHO_HUELLA
+        )
+        sin_huella = len(huellas) - len(buscados)
+
+        posiciones = np.searchsorted(self.huella_contenido, buscados)
+        posiciones = np.minimum(posiciones, len(self) - 1)
+        encontrados = (self.huella_contenido[posiciones] == buscados) & (buscados != b'')
+
+        posiciones = posiciones[encontrados]
+        return posiciones, sin_huella + int(np.count_nonzero(~encontrados))
+
+    def _top(self, dimension, filas, importe, k, mascara=None):
+        """Top-k por monto de una dimensión: (códigos, conteos, montos)"""
+        codigos = self.columnas[dimension][filas]
+        validos = codigos >= 0
+        if mascara is not None:
+            validos &= mascara
+        codigos = codigos[validos]
+
+        n = len(self.diccionarios[dimension])
+        conteos = np.bincount(codigos, minlength=n)
+        montos = np.bincount(codigos, weights=importe[validos], minlength=n)
+
+        candidatos = np.flatnonzero(conteos)
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(-montos[candidatos], k - 1)[:k]]
+        candidatos = candidatos[np.argsort(-montos[candidatos], kind='stable')]
+        return candidatos, conteos, montos
+
+    def agregar(self, filas, top=20):
+        """Mismo formato que AggregationService.obtener_agregados_optimizado"""
+        importe = np.nan_to_num(self.importe[filas])
+
+        proveedores = []
+        codigos, conteos, montos = self._top(
+            'rfc_group_key', filas, importe, top, mascara=self.con_proveedor[filas]
+        )
+        for c in codigos:
+            rfc = self.proveedor_rfc[c]
+            proveedores.append({
+                'nombre': self.proveedor_nombre[c],
+                'rfc': rfc if rfc and rfc != 'XAXX010101000' else 'RFC Genérico',
+                'num_contratos': int(conteos[c]),
+                'monto_total': float(montos[c])
+            })
+
+        instituciones = []
+        codigos, conteos, montos = self._top('siglas_institucion', filas, importe, top)
+        for c in codigos:
+            instituciones.append({
+                'nombre': self.institucion_nombre[c],
+                'siglas': self.diccionarios['siglas_institucion'][c],
+                'num_contratos': int(conteos[c]),
+                'monto_total': float(montos[c])
+            })
+
+        contratos_por_anio = []
+        anios = self.columnas['anio_fuente'][filas]
+        validos = anios >= 0
+        n = len(self.diccionarios['anio_fuente'])
+        conteos = np.bincount(anios[validos], minlength=n)
+        montos = np.bincount(anios[validos], weights=importe[validos], minlength=n)
+        for c in sorted(np.flatnonzero(conteos), key=lambda c: self.diccionarios['anio_fuente'][c]):
+            contratos_por_anio.append({
+                'anio': int(self.diccionarios['anio_fuente'][c]),
+                'num_contratos': int(conteos[c]),
+                'monto_total': float(montos[c])
+            })
+
+        return {
+            'total_contratos': int(len(filas)),
+            'monto_total': float(importe.sum()),
+            'top_proveedores': proveedores,
+            'top_instituciones': instituciones,
+            'contratos_por_anio': contratos_por_anio,
+            'contratos_por_mes': self._serie_mensual(filas, importe)
+        }
+
+    def _serie_mensual(self, filas, importe):
+        """Conteo y monto por mes (AAAA-MM) de fecha_inicio_contrato"""
+        meses = self.columnas['mes'][filas]
+        validos = meses >= 0
+        n = len(self.diccionarios['mes'])
+        conteos = np.bincount(meses[validos], minlength=n)
+        montos = np.bincount(meses[validos], weights=importe[validos], minlength=n)
+
+        serie = []
+        for c in sorted(np.flatnonzero(conteos), key=lambda c: self.diccionarios['mes'][c]):
+            mes = self.diccionarios['mes'][c]
+            serie.append({
+                'mes': f'{mes // 100:04d}-{mes % 100:02d}',
+                'num_contratos': int(conteos[c]),
+                'monto_total': float(montos[c])
+            })
+        return serie
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def obtener_snapshot(directorio):
+    """
+    Snapshot vigente del proceso (se abre una vez por worker).
+    Si ACTUAL apunta a una versión nueva, se vuelve a abrir. Retorna None si no hay snapshot.
+    """
+    global _snapshot
+
+    puntero = Path(directorio) / 'ACTUAL'
+    try:
+        version = puntero.read_text().strip()
+    except OSError:
+        return None
+
+    if _snapshot is not None and _snapshot.version == version:
+        return _snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = SnapshotColumnar(Path(directorio) / version)
+            logger.info(f"[Snapshot] Versión {version} abierta ({len(_snapshot):,} filas)")
+        return _snapshot
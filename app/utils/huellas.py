@@ -0,0 +1,56 @@
+# app/utils/huellas.py
+"""
+Estado de la deduplicación por huella_contenido
+(migrations/add_huella_contenido.sql).
+
+Las búsquedas y agregaciones omiten DISTINCT solo cuando todas las filas de
+contratos.contratos tienen huella: el índice único garantiza entonces que no
+hay duplicados exactos. Las filas cargadas antes de la columna quedan así
+después de correr, en este orden:
+
+    1. python3 scripts/backfill_huellas.py  (deja en NULL los duplicados exactos
+       y encola el trabajo "limpieza_duplicados")
+    2. el trabajo "limpieza_duplicados" (borra esos duplicados)
+
+Mientras quede alguna fila sin huella se conservan DISTINCT y COUNT(DISTINCT).
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Segundos que un worker reutiliza el estado leído antes de volver a consultarlo
+INTERVALO_HUELLAS = float(os.getenv('HUELLAS_INTERVALO', 60))
+
+_estado = {
+    'valor': None,
+    'leido_en': 0.0,
+    'lock': threading.Lock()
+}
+
+
+def huellas_completas(session):
+    """
+    True si ninguna fila tiene huella_contenido NULL (una búsqueda sobre
+    idx_contratos_huella); se consulta a lo más cada INTERVALO_HUELLAS segundos.
+    False si la columna todavía no existe.
+    """
+    ahora = time.monotonic()
+    with _estado['lock']:
+        if _estado['leido_en'] and ahora - _estado['leido_en'] < INTERVALO_HUELLAS:
+            return _estado['valor']
+
+    try:
+        valor = bool(session.execute(text("""
+            SELECT NOT EXISTS (SELECT 1 FROM contratos.contratos WHERE huella_contenido IS NULL)
+        """)).scalar())
+    except DBAPIError:
+        session.rollback()
+        valor = False
+
+    with _estado['lock']:
+        _estado['valor'] = valor
+        _estado['leido_en'] = ahora
+    return valor
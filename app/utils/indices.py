@@ -0,0 +1,254 @@
+# app/utils/indices.py
+"""
+Índices de contratos.contratos declarados en un solo lugar.
+
+En lugar de re-ejecutar CREATE INDEX IF NOT EXISTS después de cada carga (un
+índice faltante se construiría bloqueando escrituras), se compara el conjunto
+declarado contra el catálogo (pg_indexes + pg_index.indisvalid) y solo los
+índices faltantes o inválidos se construyen con CREATE INDEX CONCURRENTLY,
+desde un trabajo en segundo plano. El avance se lee de
+pg_stat_progress_create_index.
+"""
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA = 'contratos'
+TABLA = 'contratos'
+
+# Segundos entre lecturas de pg_stat_progress_create_index
+INTERVALO_PROGRESO = 2
+
+# Espera máxima por el lock de ALTER TABLE (no hacer fila detrás de consultas largas)
+LOCK_TIMEOUT = '5s'
+
+# Columnas agregadas después del esquema original: nombre -> tipo
+COLUMNAS = {
+    'created_at': 'TIMESTAMP DEFAULT NOW()',
+    # Puntaje de riesgo (lo calcula scripts/calcular_riesgo.py)
+    'riesgo_puntaje': 'SMALLINT',
+    # Huella de contenido (md5 de los campos de negocio, la calcula DataCleaner);
+    # las filas anteriores se llenan con scripts/backfill_huellas.py
+    'huella_contenido': 'UUID'
+}
+
+# Índices deseados: nombre -> definición después de "ON contratos.contratos"
+INDICES = {
+    # B-tree para filtros y ordenamiento
+    'idx_contratos_riesgo': '(riesgo_puntaje DESC NULLS LAST)',
+    'idx_contratos_importe': '(importe DESC NULLS LAST)',
+    'idx_contratos_proveedor': '(proveedor_contratista)',
+    'idx_contratos_rfc': '(rfc)',
+    'idx_contratos_siglas_inst': '(siglas_institucion)',
+    'idx_contratos_anio': '(anio_fuente)',
+    'idx_contratos_tipo_contratacion': '(tipo_contratacion)',
+    'idx_contratos_tipo_procedimiento': '(tipo_procedimiento)',
+    'idx_contratos_estatus': '(estatus_contrato)',
+
+    # Único: la carga rechaza filas cuya huella ya existe (ON CONFLICT DO NOTHING)
+    'idx_contratos_huella': '(huella_contenido)',
+
+    # GIN para full text search
+    'idx_contratos_titulo_gin':
+        "USING gin(to_tsvector('spanish', COALESCE(titulo_contrato, '')))",
+    'idx_contratos_titulo_exp_gin':
+        "USING gin(to_tsvector('spanish', COALESCE(titulo_expediente, '')))",
+    'idx_contratos_descripcion_gin':
+        "USING gin(to_tsvector('spanish', COALESCE(descripcion_contrato, '')))",
+    'idx_contratos_proveedor_gin':
+        "USING gin(to_tsvector('spanish', COALESCE(proveedor_contratista, '')))",
+    'idx_contratos_institucion_gin':
+        "USING gin(to_tsvector('spanish', COALESCE(institucion, '')))",
+    'idx_contratos_siglas_inst_gin':
+        "USING gin(to_tsvector('spanish', COALESCE(siglas_institucion, '')))",
+
+    # Búsqueda multi-columna
+    'idx_contratos_desc_titulo_fts': """USING gin(to_tsvector('spanish',
+        COALESCE(descripcion_contrato, '') || ' ' ||
+        COALESCE(titulo_contrato, '') || ' ' ||
+        COALESCE(titulo_expediente, '')))""",
+
+    # Compuestos para agregaciones (GROUP BY + SUM)
+    'idx_contratos_proveedor_importe': '(proveedor_contratista, rfc, importe)',
+    'idx_contratos_institucion_importe': '(siglas_institucion, institucion, importe)'
+}
+
+INDICES_UNICOS = {'idx_contratos_huella'}
+
+
+def sql_indice(nombre, tabla=None):
+    """
+    CREATE INDEX CONCURRENTLY de un índice declarado. Con otra tabla (ej. la tabla
+    nueva de una recarga, que nadie más ve) se crea sin CONCURRENTLY y con nombre
+    automático, para no chocar con el índice de contratos.contratos.
+    """
+    unico = 'UNIQUE ' if nombre in INDICES_UNICOS else ''
+    if tabla is not None:
+        return f"CREATE {unico}INDEX ON {tabla} {INDICES[nombre]}"
+    return f"CREATE {unico}INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {ESQUEMA}.{TABLA} {INDICES[nombre]}"
+
+
+def asegurar_columnas(engine):
+    """
+    Agrega las columnas declaradas que falten. Consulta primero el catálogo para
+    no pedir el lock de ALTER TABLE cuando ya existen (el caso normal).
+    Retorna la lista de columnas agregadas.
+    """
+    with engine.connect() as conn:
+        existentes = set(conn.execute(text("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = :esquema AND table_name = :tabla
+        """), {'esquema': ESQUEMA, 'tabla': TABLA}).scalars())
+
+    faltantes = [c for c in COLUMNAS if c not in existentes]
+    if faltantes:
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            for columna in faltantes:
+                conn.execute(text(
+                    f"ALTER TABLE {ESQUEMA}.{TABLA} ADD COLUMN IF NOT EXISTS {columna} {COLUMNAS[columna]}"
+                ))
+        logger.info(f"[Índices] Columnas agregadas: {', '.join(faltantes)}")
+    return faltantes
+
+
+def estado_indices(engine):
+    """Índices existentes en la tabla: {nombre: es_valido}"""
+    with engine.connect() as conn:
+        filas = conn.execute(text("""
+            SELECT i.indexname, x.indisvalid
+            FROM pg_indexes i
+            JOIN pg_namespace n ON n.nspname = i.schemaname
+            JOIN pg_class c ON c.relname = i.indexname AND c.relnamespace = n.oid
+            JOIN pg_index x ON x.indexrelid = c.oid
+            WHERE i.schemaname = :esquema AND i.tablename = :tabla
+        """), {'esquema': ESQUEMA, 'tabla': TABLA}).fetchall()
+    return {fila.indexname: fila.indisvalid for fila in filas}
+
+
+def indices_pendientes(engine):
+    """
+    Índices declarados que faltan o quedaron inválidos (un CREATE INDEX
+    CONCURRENTLY interrumpido deja el índice con indisvalid = false).
+    Retorna [{'nombre': ..., 'motivo': 'faltante' | 'invalido'}].
+    """
+    existentes = estado_indices(engine)
+    pendientes = []
+    for nombre in INDICES:
+        if nombre not in existentes:
+            pendientes.append({'nombre': nombre, 'motivo': 'faltante'})
+        elif not existentes[nombre]:
+            pendientes.append({'nombre': nombre, 'motivo': 'invalido'})
+    return pendientes
+
+
+def leer_progreso(conn, pid):
+    """Fila de pg_stat_progress_create_index del backend que construye, o None"""
+    fila = conn.execute(text("""
+        SELECT phase, blocks_total, blocks_done, tuples_total, tuples_done,
+               lockers_total, lockers_done
+        FROM pg_stat_progress_create_index
+        WHERE pid = :pid
+    """), {'pid': pid}).fetchone()
+    return dict(fila._mapping) if fila is not None else None
+
+
+def _vigilar(engine, pid, nombre, al_avanzar, terminado, cancelado):
+    """
+    Hilo que reporta el avance de la construcción. Si al_avanzar retorna True
+    cancela la sentencia en el backend que construye.
+    """
+    with engine.connect() as conn:
+        while not terminado.wait(INTERVALO_PROGRESO):
+            progreso = leer_progreso(conn, pid)
+            conn.rollback()
+            if progreso is None:
+                continue
+            if al_avanzar({'indice': nombre, **progreso}):
+                cancelado.set()
+                conn.execute(text("SELECT pg_cancel_backend(:pid)"), {'pid': pid})
+                conn.rollback()
+                return
+
+
+def construir_indice(engine, nombre, motivo='faltante', al_avanzar=None):
+    """
+    Construye un índice declarado con CREATE INDEX CONCURRENTLY (no bloquea
+    lecturas ni escrituras). Un índice inválido se elimina antes, también
+    concurrentemente. Retorna 'construido', 'cancelado' o lanza la excepción
+    de la base de datos; si la construcción falla el índice inválido se elimina.
+    """
+    terminado = threading.Event()
+    cancelado = threading.Event()
+
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if motivo == 'invalido':
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {ESQUEMA}.{nombre}"))
+
+        vigilante = None
+        if al_avanzar is not None:
+            pid = conn.execute(text("SELECT pg_backend_pid()")).scalar()
+            vigilante = threading.Thread(
+                target=_vigilar, args=(engine, pid, nombre, al_avanzar, terminado, cancelado), daemon=True
+            )
+            vigilante.start()
+
+        try:
+            conn.execute(text(sql_indice(nombre)))
+        except DBAPIError:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {ESQUEMA}.{nombre}"))
+            if cancelado.is_set():
+                logger.warning(f"[Índices] Construcción de {nombre} cancelada")
+                return 'cancelado'
+            raise
+        finally:
+            terminado.set()
+            if vigilante is not None:
+                vigilante.join()
+
+    logger.info(f"[Índices] {nombre} construido")
+    return 'construido'
+
+
+def construir_pendientes(engine, al_avanzar=None):
+    """
+    Construye uno por uno los índices faltantes o inválidos. Un índice que falla
+    (ej. el único de huella con duplicados) no detiene a los demás.
+    al_avanzar(progreso) recibe el avance de cada construcción; si retorna True
+    se cancela la actual y no se construyen las siguientes.
+    Retorna {'pendientes', 'construidos', 'fallidos', 'cancelado'}.
+    """
+    pendientes = indices_pendientes(engine)
+    resultado = {
+        'pendientes': [p['nombre'] for p in pendientes],
+        'construidos': [],
+        'fallidos': {},
+        'cancelado': False
+    }
+
+    for numero, pendiente in enumerate(pendientes, 1):
+        nombre = pendiente['nombre']
+        logger.info(f"[Índices] Construyendo {nombre} ({pendiente['motivo']}, {numero}/{len(pendientes)})")
+
+        def avance(progreso):
+            return al_avanzar({**progreso, 'numero': numero, 'total': len(pendientes)})
+
+        try:
+            estado = construir_indice(engine, nombre, pendiente['motivo'],
+                                      al_avanzar=avance if al_avanzar else None)
+        except DBAPIError as e:
+            logger.error(f"[Índices] No se pudo construir {nombre}: {e.orig}")
+            resultado['fallidos'][nombre] = str(e.orig).strip()
+            continue
+
+        if estado == 'cancelado':
+            resultado['cancelado'] = True
+            break
+        resultado['construidos'].append(nombre)
+
+    return resultado
@@ -0,0 +1,183 @@
+# app/utils/manifiesto.py
+"""
+Manifiesto de cargas sobre contratos.manifiesto_cargas
+(migrations/create_manifiesto_cargas.sql).
+
+Identifica cada archivo por el sha256 de su contenido y el año de su nombre.
+Un archivo ya completado no se vuelve a procesar; uno interrumpido se reanuda
+desde el último bloque confirmado. registrar_bloque corre en la transacción
+de la carga del bloque (cursor de psycopg2), el resto en transacciones propias.
+
+Mientras un proceso carga un archivo lo tiene reclamado (reclamar_archivo), así
+que otro trabajo no puede cargarlo en paralelo ni reanudarlo a la vez.
+"""
+import hashlib
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import text
+
+# Bytes leídos por iteración al calcular el sha256
+TAMANO_LECTURA = 1024 * 1024
+
+# Espacio de nombres de los advisory locks de archivos: la primera llave es
+# hashtext(CLASE_LOCK_CARGA), así no choca con locks de otros usos (cada uno con su nombre)
+CLASE_LOCK_CARGA = 'lalupa.carga'
+
+
+class CargaEnCurso(Exception):
+    """Otro proceso está cargando el mismo archivo"""
+
+
+_COLUMNAS = """
+    id, sha256, anio_archivo, nombre_archivo, estado, tamano_bloque,
+    bloques_completados, filas_leidas, filas_totales, resumen, anios,
+    creado_en, actualizado_en, terminado_en
+"""
+
+
+def crear_tabla_manifiesto(engine):
+    """Crea la tabla del manifiesto si no existe"""
+    sql_file = Path(__file__).parent.parent.parent / 'migrations' / 'create_manifiesto_cargas.sql'
+    with engine.begin() as conn:
+        conn.execute(text(sql_file.read_text()))
+
+
+def sha256_archivo(ruta):
+    """sha256 (hex) del contenido del archivo, leído por partes"""
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for parte in iter(lambda: f.read(TAMANO_LECTURA), b''):
+            digest.update(parte)
+    return digest.hexdigest()
+
+
+def _a_dict(fila):
+    if fila is None:
+        return None
+    carga = dict(fila._mapping)
+    carga['anios'] = list(carga['anios'] or [])
+    return carga
+
+
+@contextmanager
+def reclamar_archivo(engine, sha256, anio_archivo):
+    """
+    Reclama el archivo (sha256 + año del nombre) con un advisory lock de sesión
+    en una conexión propia, abierta mientras dure la carga. Lanza CargaEnCurso si
+    otro proceso ya lo tiene. El lock se suelta al salir, o solo si el proceso
+    muere (Postgres lo libera al cerrarse la conexión), así que no queda una carga
+    reclamada para siempre.
+    """
+    params = {
+        'clase': CLASE_LOCK_CARGA,
+        'clave': f"{sha256}:{int(anio_archivo) if anio_archivo else 0}"
+    }
+    conn = engine.connect()
+    try:
+        obtenido = conn.execute(
+            text("SELECT pg_try_advisory_lock(hashtext(:clase), hashtext(:clave))"), params
+        ).scalar()
+        conn.commit()
+        if not obtenido:
+            raise CargaEnCurso(f"El archivo {sha256[:12]} ya se está cargando en otro trabajo")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:clase), hashtext(:clave))"), params)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def iniciar_carga(engine, sha256, anio_archivo, nombre_archivo, tamano_bloque, forzar=False):
+    """
+    Registro del manifiesto para el archivo: el existente (completado o a medias)
+    o uno nuevo. Con forzar, un registro existente se reinicia desde cero.
+    Una carga a medias conserva su tamano_bloque para reanudar en las mismas fronteras.
+    """
+    params = {
+        'sha256': sha256,
+        'anio_archivo': int(anio_archivo) if anio_archivo else None,
+        'nombre_archivo': nombre_archivo,
+        'tamano_bloque': tamano_bloque
+    }
+    with engine.begin() as conn:
+        fila = conn.execute(text(f"""
+            SELECT {_COLUMNAS} FROM contratos.manifiesto_cargas
+            WHERE sha256 = :sha256 AND COALESCE(anio_archivo, 0) = COALESCE(:anio_archivo, 0)
+            FOR UPDATE
+        """), params).fetchone()
+
+        if fila is None:
+            fila = conn.execute(text(f"""
+                INSERT INTO contratos.manifiesto_cargas (sha256, anio_archivo, nombre_archivo, tamano_bloque)
+                VALUES (:sha256, :anio_archivo, :nombre_archivo, :tamano_bloque)
+                RETURNING {_COLUMNAS}
+            """), params).fetchone()
+        elif forzar:
+            fila = conn.execute(text(f"""
+                UPDATE contratos.manifiesto_cargas
+                SET estado = 'en_proceso', nombre_archivo = :nombre_archivo, tamano_bloque = :tamano_bloque,
+                    bloques_completados = 0, filas_leidas = 0, filas_totales = NULL,
+                    resumen = '{{}}'::jsonb, anios = '{{}}', actualizado_en = NOW(), terminado_en = NULL
+                WHERE id = :id
+                RETURNING {_COLUMNAS}
+            """), {**params, 'id': fila.id}).fetchone()
+    return _a_dict(fila)
+
+
+def registrar_bloque(cursor, carga_id, resumen, anios):
+    """
+    Marca un bloque más como completado con los contadores acumulados.
+    Recibe el cursor de la transacción que cargó el bloque: ambos se confirman juntos.
+    """
+    cursor.execute("""
+        UPDATE contratos.manifiesto_cargas
+        SET bloques_completados = %(bloques)s, filas_leidas = %(filas_leidas)s,
+            resumen = %(resumen)s::jsonb, anios = %(anios)s, actualizado_en = NOW()
+        WHERE id = %(id)s
+    """, {
+        'id': carga_id,
+        'bloques': resumen['bloques'],
+        'filas_leidas': resumen['registros_leidos'],
+        'resumen': json.dumps(resumen, default=str),
+        'anios': [int(a) for a in anios]
+    })
+
+
+def anios_cargados(engine, sha256, anio_archivo):
+    """
+    Años con bloques ya confirmados de la carga del archivo (completa o a medias);
+    lista vacía si el archivo no está en el manifiesto
+    """
+    with engine.connect() as conn:
+        anios = conn.execute(text("""
+            SELECT anios FROM contratos.manifiesto_cargas
+            WHERE sha256 = :sha256 AND COALESCE(anio_archivo, 0) = COALESCE(:anio_archivo, 0)
+        """), {'sha256': sha256, 'anio_archivo': int(anio_archivo) if anio_archivo else None}).scalar()
+    return list(anios or [])
+
+
+def completar_carga(engine, carga_id, filas_totales):
+    """Marca la carga como completada (el archivo ya no se vuelve a procesar)"""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE contratos.manifiesto_cargas
+            SET estado = 'completado', filas_totales = :filas_totales,
+                terminado_en = NOW(), actualizado_en = NOW()
+            WHERE id = :id
+        """), {'id': carga_id, 'filas_totales': filas_totales})
+
+
+def olvidar_anio(conn, anio):
+    """
+    Borra del manifiesto las cargas con filas del año (sus filas se reemplazaron con
+    una recarga): si se vuelven a subir, se procesan de nuevo. Corre en la
+    transacción del llamador (conexión de SQLAlchemy).
+    """
+    return conn.execute(text("""
+        DELETE FROM contratos.manifiesto_cargas
+        WHERE anio_archivo = :anio OR :anio = ANY(anios)
+    """), {'anio': int(anio)}).rowcount
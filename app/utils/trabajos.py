@@ -0,0 +1,196 @@
+# app/utils/trabajos.py
+"""
+Cola de trabajos en segundo plano sobre contratos.trabajos
+(migrations/create_trabajos_tables.sql).
+
+El panel encola y consulta; scripts/worker_trabajos.py reclama los pendientes
+con FOR UPDATE SKIP LOCKED, así que varios workers nunca toman el mismo
+trabajo. Cada operación corre en su propia transacción corta para que el
+progreso sea visible de inmediato. La cancelación es cooperativa: el trabajo
+la detecta la siguiente vez que reporta progreso.
+
+Mientras un trabajo corre, su worker tiene un advisory lock de sesión con el id
+del trabajo; un trabajo en_proceso cuyo lock está libre quedó huérfano.
+"""
+import json
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import text
+
+ESTADOS_FINALES = ('completado', 'error', 'cancelado')
+
+# Espacio de nombres de los advisory locks de trabajos: la primera llave es
+# hashtext(CLASE_LOCK_TRABAJO) y la segunda el id del trabajo
+CLASE_LOCK_TRABAJO = 'lalupa.trabajo'
+
+_COLUMNAS = """
+    id, tipo, estado, parametros, progreso, resultado, mensaje, cancelar, usuario,
+    creado_en, iniciado_en, actualizado_en, terminado_en
+"""
+
+
+def crear_tabla_trabajos(engine):
+    """Crea la tabla de trabajos si no existe"""
+    sql_file = Path(__file__).parent.parent.parent / 'migrations' / 'create_trabajos_tables.sql'
+    with engine.begin() as conn:
+        conn.execute(text(sql_file.read_text()))
+
+
+def _a_dict(fila):
+    if fila is None:
+        return None
+    trabajo = dict(fila._mapping)
+    for campo in ('creado_en', 'iniciado_en', 'actualizado_en', 'terminado_en'):
+        if trabajo[campo] is not None:
+            trabajo[campo] = trabajo[campo].strftime('%d/%m/%Y %H:%M:%S')
+    return trabajo
+
+
+def encolar_trabajo(engine, tipo, parametros=None, usuario=None):
+    """Agrega un trabajo pendiente y retorna su id"""
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            INSERT INTO contratos.trabajos (tipo, parametros, usuario)
+            VALUES (:tipo, CAST(:parametros AS JSONB), :usuario)
+            RETURNING id
+        """), {'tipo': tipo, 'parametros': json.dumps(parametros or {}), 'usuario': usuario}).scalar()
+
+
+def trabajo_activo(engine, tipo):
+    """Id de un trabajo pendiente o en proceso del tipo indicado, o None"""
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT id FROM contratos.trabajos
+            WHERE tipo = :tipo AND estado IN ('pendiente', 'en_proceso')
+            ORDER BY id
+            LIMIT 1
+        """), {'tipo': tipo}).scalar()
+
+
+@contextmanager
+def reclamar_trabajo(engine, tipos=None):
+    """
+    Toma el trabajo pendiente más antiguo (de los tipos indicados), lo marca
+    en_proceso y entrega el trabajo como diccionario (None si no hay pendientes).
+
+    El lock del trabajo se toma en una conexión propia, en la misma transacción
+    que lo marca en_proceso, y se conserva mientras dure el bloque with: nadie ve
+    el trabajo en_proceso sin su lock. Si el worker muere, Postgres libera el lock
+    al cerrarse la conexión y liberar_huerfanos lo puede marcar como error.
+    """
+    filtro_tipo = 'AND tipo = ANY(:tipos)' if tipos else ''
+    conn = engine.connect()
+    try:
+        fila = conn.execute(text(f"""
+            UPDATE contratos.trabajos
+            SET estado = 'en_proceso', iniciado_en = NOW(), actualizado_en = NOW()
+            WHERE id = (
+                SELECT id FROM contratos.trabajos
+                WHERE estado = 'pendiente' {filtro_tipo}
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING {_COLUMNAS}
+        """), {'tipos': list(tipos or [])}).fetchone()
+        if fila is None:
+            conn.commit()
+            yield None
+            return
+
+        params = {'clase': CLASE_LOCK_TRABAJO, 'id': fila.id}
+        conn.execute(text("SELECT pg_advisory_lock(hashtext(:clase), :id)"), params)
+        conn.commit()
+        try:
+            yield _a_dict(fila)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:clase), :id)"), params)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def reportar_progreso(engine, trabajo_id, progreso):
+    """
+    Guarda los contadores del trabajo (se combinan con los anteriores).
+    Retorna True si se solicitó cancelarlo.
+    """
+    with engine.begin() as conn:
+        return bool(conn.execute(text("""
+            UPDATE contratos.trabajos
+            SET progreso = progreso || CAST(:progreso AS JSONB), actualizado_en = NOW()
+            WHERE id = :id
+            RETURNING cancelar
+        """), {'id': trabajo_id, 'progreso': json.dumps(progreso, default=str)}).scalar())
+
+
+def terminar_trabajo(engine, trabajo_id, estado, resultado=None, mensaje=None):
+    """Marca el trabajo como completado, error o cancelado"""
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE contratos.trabajos
+            SET estado = :estado, resultado = CAST(:resultado AS JSONB), mensaje = :mensaje,
+                terminado_en = NOW(), actualizado_en = NOW()
+            WHERE id = :id
+        """), {
+            'id': trabajo_id,
+            'estado': estado,
+            'resultado': json.dumps(resultado, default=str) if resultado is not None else None,
+            'mensaje': mensaje
+        })
+
+
+def obtener_trabajo(engine, trabajo_id):
+    """Trabajo como diccionario, o None si no existe"""
+    with engine.connect() as conn:
+        fila = conn.execute(text(f"""
+            SELECT {_COLUMNAS} FROM contratos.trabajos WHERE id = :id
+        """), {'id': trabajo_id}).fetchone()
+    return _a_dict(fila)
+
+
+def cancelar_trabajo(engine, trabajo_id):
+    """
+    Cancela un trabajo: si está pendiente se cancela de inmediato; si está en
+    proceso se marca para que el worker lo detenga. Retorna el nuevo estado o
+    None si el trabajo no existe o ya había terminado.
+    """
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE contratos.trabajos
+            SET cancelar = TRUE,
+                estado = CASE WHEN estado = 'pendiente' THEN 'cancelado' ELSE estado END,
+                terminado_en = CASE WHEN estado = 'pendiente' THEN NOW() ELSE terminado_en END,
+                actualizado_en = NOW()
+            WHERE id = :id AND estado IN ('pendiente', 'en_proceso')
+            RETURNING estado
+        """), {'id': trabajo_id}).scalar()
+
+
+def liberar_huerfanos(engine):
+    """
+    Marca como error los trabajos en_proceso cuyo worker ya no tiene su lock
+    (se detuvo a media ejecución). Los que siguen corriendo no se tocan, aunque
+    lleven mucho tiempo sin reportar progreso. Retorna cuántos.
+    """
+    huerfanos = 0
+    with engine.connect() as conn:
+        ids = conn.execute(text("SELECT id FROM contratos.trabajos WHERE estado = 'en_proceso'")).scalars().all()
+        conn.commit()
+        for trabajo_id in ids:
+            params = {'clase': CLASE_LOCK_TRABAJO, 'id': trabajo_id}
+            if not conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:clase), :id)"), params).scalar():
+                continue
+            try:
+                # Con el lock tomado, el estado ya no cambia: el worker termina el trabajo antes de soltarlo
+                huerfanos += conn.execute(text("""
+                    UPDATE contratos.trabajos
+                    SET estado = 'error', mensaje = 'El worker se detuvo antes de terminar',
+                        terminado_en = NOW(), actualizado_en = NOW()
+                    WHERE id = :id AND estado = 'en_proceso'
+                """), params).rowcount
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(hashtext(:clase), :id)"), params)
+                conn.commit()
+    return huerfanos
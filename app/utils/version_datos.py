@@ -0,0 +1,68 @@
+# app/utils/version_datos.py
+"""
+Versión de los datos sobre contratos.version_datos
+(migrations/create_version_datos.sql).
+
+El mantenimiento posterior a cada carga (admin_app.actualizar_resumenes) sube
+la versión; cada worker web la relee a lo más cada INTERVALO_VERSION segundos y,
+si cambió, descarta lo que tenga en caché (ej. _stats_cache de app/routes.py).
+El snapshot columnar no la necesita: se vuelve a abrir cuando cambia su ACTUAL.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Segundos que un worker reutiliza la versión leída antes de volver a consultarla
+INTERVALO_VERSION = float(os.getenv('VERSION_DATOS_INTERVALO', 10))
+
+_version = {
+    'valor': None,
+    'leida_en': 0.0,
+    'lock': threading.Lock()
+}
+
+
+def crear_tabla_version(engine):
+    """Crea la tabla de la versión (con su única fila) si no existe"""
+    sql_file = Path(__file__).parent.parent.parent / 'migrations' / 'create_version_datos.sql'
+    with engine.begin() as conn:
+        conn.execute(text(sql_file.read_text()))
+
+
+def incrementar_version(conn, anios=None):
+    """
+    Sube la versión de los datos y la retorna. Corre en la transacción del
+    llamador (conexión de SQLAlchemy).
+    """
+    return conn.execute(text("""
+        UPDATE contratos.version_datos
+        SET version = version + 1, anios = :anios, actualizado_en = NOW()
+        WHERE id = 1
+        RETURNING version
+    """), {'anios': [int(a) for a in anios or []]}).scalar()
+
+
+def version_datos(session):
+    """
+    Versión de los datos vista por este proceso; la consulta a lo más cada
+    INTERVALO_VERSION segundos. Retorna None si la tabla no existe.
+    """
+    ahora = time.monotonic()
+    with _version['lock']:
+        if _version['leida_en'] and ahora - _version['leida_en'] < INTERVALO_VERSION:
+            return _version['valor']
+
+    try:
+        valor = session.execute(text("SELECT version FROM contratos.version_datos WHERE id = 1")).scalar()
+    except DBAPIError:
+        session.rollback()
+        valor = None
+
+    with _version['lock']:
+        _version['valor'] = valor
+        _version['leida_en'] = ahora
+    return valor
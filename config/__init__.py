@@ -21,6 +21,13 @@ class Config:
     # Cache
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300
+
+    # Snapshot columnar para agregaciones (ver scripts/build_snapshot.py)
+    SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', 'false').lower() == 'true'
+    SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', 'data/snapshot')
+    # Máximo de filas de una búsqueda para pedir sus huellas y agregar en el snapshot;
+    # por encima se usan las agregaciones SQL
+    SNAPSHOT_MAX_FILAS = int(os.environ.get('SNAPSHOT_MAX_FILAS', '200000'))
     
     # ===== CONFIGURACIÓN DE LOGGING =====
     # Directorio de logs
@@ -0,0 +1,25 @@
+-- Huella de contenido de cada contrato
+--
+-- md5 (guardado como UUID) de los campos de negocio normalizados; la calcula
+-- DataCleaner.huella_contenido al limpiar cada carga. El índice único hace que
+-- la carga (INSERT ... ON CONFLICT DO NOTHING) rechace filas ya cargadas, incluso
+-- si llegan en otro archivo. Las filas anteriores se llenan, en este orden, con:
+--     1. python3 scripts/backfill_huellas.py
+--        (las filas cuya huella ya existe quedan en NULL: son duplicados exactos;
+--        se anotan en contratos.huellas_duplicadas y se encola "limpieza_duplicados")
+--     2. el trabajo "limpieza_duplicados" del panel (borra esos duplicados)
+-- Las búsquedas omiten DISTINCT solo cuando ninguna fila tiene huella NULL
+-- (app/utils/huellas.py).
+
+ALTER TABLE contratos.contratos
+ADD COLUMN IF NOT EXISTS huella_contenido UUID;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_contratos_huella
+    ON contratos.contratos(huella_contenido);
+
+-- Duplicados exactos encontrados por el backfill (fila y huella que ya tenía otra)
+CREATE TABLE IF NOT EXISTS contratos.huellas_duplicadas (
+    fila TID NOT NULL,
+    codigo_contrato TEXT,
+    huella_contenido UUID NOT NULL
+);
@@ -0,0 +1,32 @@
+-- Manifiesto de cargas de archivos
+--
+-- Una fila por archivo cargado (sha256 del contenido + año del nombre del
+-- archivo, que cambia el anio_fuente de las filas). Cada bloque cargado se
+-- registra en la misma transacción que su INSERT, así que una carga
+-- interrumpida se reanuda exactamente desde el último bloque confirmado y un
+-- archivo ya completado no se vuelve a procesar.
+-- scripts/worker_trabajos.py aplica este archivo al iniciar.
+-- estado: en_proceso -> completado
+
+CREATE TABLE IF NOT EXISTS contratos.manifiesto_cargas (
+    id SERIAL PRIMARY KEY,
+    sha256 CHAR(64) NOT NULL,
+    anio_archivo INTEGER,
+    nombre_archivo TEXT,
+    estado VARCHAR(20) NOT NULL DEFAULT 'en_proceso',
+    -- Las fronteras de bloque dependen del tamaño: se reanuda con el mismo
+    tamano_bloque INTEGER NOT NULL,
+    bloques_completados INTEGER NOT NULL DEFAULT 0,
+    filas_leidas BIGINT NOT NULL DEFAULT 0,
+    -- Filas del archivo (se conoce al completar la carga)
+    filas_totales BIGINT,
+    -- Contadores acumulados de los bloques completados (insertados, duplicados, etc.)
+    resumen JSONB NOT NULL DEFAULT '{}'::jsonb,
+    anios INTEGER[] NOT NULL DEFAULT '{}',
+    creado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+    actualizado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+    terminado_en TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_manifiesto_archivo
+    ON contratos.manifiesto_cargas(sha256, COALESCE(anio_archivo, 0));
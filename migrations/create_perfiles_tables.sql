@@ -0,0 +1,52 @@
+-- Tablas de perfiles pre-calculados (proveedores e instituciones)
+-- Se actualizan después de cada carga desde el panel de administración
+-- o completas con: python3 scripts/refresh_perfiles.py
+
+-- Resumen por proveedor, con la misma clave que AggregationService:
+--   RFC si es válido, si no el nombre del proveedor (clave_es_rfc indica cuál).
+CREATE TABLE IF NOT EXISTS contratos.resumen_proveedores (
+    rfc_group_key TEXT NOT NULL,
+    clave_es_rfc BOOLEAN NOT NULL DEFAULT FALSE,
+    nombre TEXT,
+    rfc TEXT,
+    num_contratos BIGINT NOT NULL DEFAULT 0,
+    monto_total NUMERIC,
+    primer_contrato DATE,
+    ultimo_contrato DATE,
+    por_anio JSONB,             -- [{anio, num_contratos, monto_total}]
+    top_instituciones JSONB,    -- top 10 por monto
+    tipos_procedimiento JSONB,  -- mezcla de tipos de procedimiento
+    contratos_mayores JSONB,    -- 10 contratos de mayor importe
+    actualizado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (rfc_group_key, clave_es_rfc)
+);
+
+GRANT SELECT ON contratos.resumen_proveedores TO PUBLIC;
+
+-- Perfil de gasto por institución y año, con métricas de concentración de proveedores.
+-- anio_fuente NULL = todo el periodo (las métricas de concentración no se pueden sumar entre años).
+--   top10_share: participación de los 10 proveedores con mayor monto
+--   hhi: índice Herfindahl-Hirschman sobre la participación por monto (0 - 10,000)
+--   adjudicacion_directa_share / _contratos_share: participación por monto / por número de contratos
+CREATE TABLE IF NOT EXISTS contratos.perfil_instituciones (
+    id BIGSERIAL PRIMARY KEY,
+    siglas_institucion TEXT NOT NULL,
+    anio_fuente INTEGER,
+    institucion_nombre TEXT,
+    num_contratos BIGINT NOT NULL DEFAULT 0,
+    monto_total NUMERIC,
+    num_proveedores BIGINT NOT NULL DEFAULT 0,
+    top10_share NUMERIC,
+    hhi NUMERIC,
+    adjudicacion_directa_share NUMERIC,
+    adjudicacion_directa_contratos_share NUMERIC,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_perfil_instituciones_siglas_anio
+    ON contratos.perfil_instituciones(siglas_institucion, COALESCE(anio_fuente, 0));
+
+CREATE INDEX IF NOT EXISTS idx_perfil_instituciones_anio
+    ON contratos.perfil_instituciones(anio_fuente);
+
+GRANT SELECT ON contratos.perfil_instituciones TO PUBLIC;
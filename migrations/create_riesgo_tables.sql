@@ -0,0 +1,43 @@
+-- Puntajes de riesgo (banderas rojas) calculados fuera de línea
+-- con: python3 scripts/calcular_riesgo.py
+--
+-- riesgo_puntaje (0-100) vive en la tabla de contratos para que búsquedas y
+-- resultados puedan ordenar y filtrar con un índice normal. NULL = no calculado.
+-- El detalle de las banderas queda en contratos.riesgo_banderas.
+
+ALTER TABLE contratos.contratos
+ADD COLUMN IF NOT EXISTS riesgo_puntaje SMALLINT;
+
+CREATE INDEX IF NOT EXISTS idx_contratos_riesgo
+    ON contratos.contratos(riesgo_puntaje DESC NULLS LAST);
+
+-- Una fila por contrato: la llave es huella_contenido (codigo_contrato se repite)
+CREATE TABLE IF NOT EXISTS contratos.riesgo_banderas (
+    huella_contenido UUID NOT NULL,
+    codigo_contrato TEXT,
+    puntaje SMALLINT NOT NULL,
+    -- El proveedor recibe casi todos sus contratos por adjudicación directa
+    adjudicacion_directa_proveedor BOOLEAN NOT NULL DEFAULT FALSE,
+    -- Procedimiento competitivo (licitación/invitación) cuyo expediente tiene un solo proveedor
+    licitacion_un_proveedor BOOLEAN NOT NULL DEFAULT FALSE,
+    -- Empresa fundada poco antes (o después) del inicio del contrato
+    empresa_reciente BOOLEAN NOT NULL DEFAULT FALSE,
+    -- Importe atípico para su tipo de contratación
+    monto_atipico BOOLEAN NOT NULL DEFAULT FALSE,
+    calculado_en TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Tablas creadas antes tenían codigo_contrato como llave primaria; se recalculan completas
+ALTER TABLE contratos.riesgo_banderas ADD COLUMN IF NOT EXISTS huella_contenido UUID;
+ALTER TABLE contratos.riesgo_banderas DROP CONSTRAINT IF EXISTS riesgo_banderas_pkey;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_riesgo_banderas_huella
+    ON contratos.riesgo_banderas(huella_contenido);
+
+CREATE INDEX IF NOT EXISTS idx_riesgo_banderas_codigo
+    ON contratos.riesgo_banderas(codigo_contrato);
+
+CREATE INDEX IF NOT EXISTS idx_riesgo_banderas_puntaje
+    ON contratos.riesgo_banderas(puntaje DESC);
+
+GRANT SELECT ON contratos.riesgo_banderas TO PUBLIC;
@@ -0,0 +1,96 @@
+-- Crear tabla de rollup pre-agregado de contratos
+-- Granularidad: (rfc_group_key, siglas_institucion, institucion_nombre, anio_fuente,
+--                tipo_contratacion, tipo_procedimiento, estatus_contrato) con conteo y suma de importe.
+-- institucion_nombre es dimensión para que /api/filters agrupe por (siglas, institución) como la tabla.
+-- Permite responder /api/filters y búsquedas expresables sobre estas dimensiones
+-- (ej: búsqueda por RFC + filtros) sin recorrer contratos.contratos.
+--
+-- rfc_group_key usa la misma regla que AggregationService:
+--   RFC si es válido (no NULL, no vacío, no genérico XAXX010101000), si no el nombre del proveedor.
+-- clave_es_rfc indica cuál de las dos ramas se usó para que el filtro por RFC sea exacto.
+
+CREATE TABLE IF NOT EXISTS contratos.rollup_contratos (
+    id BIGSERIAL PRIMARY KEY,
+    rfc_group_key TEXT,
+    clave_es_rfc BOOLEAN NOT NULL DEFAULT FALSE,
+    siglas_institucion TEXT,
+    anio_fuente INTEGER,
+    tipo_contratacion TEXT,
+    tipo_procedimiento TEXT,
+    estatus_contrato TEXT,
+    num_contratos BIGINT NOT NULL DEFAULT 0,
+    monto_total NUMERIC,
+    institucion_nombre TEXT,
+    -- Atributos descriptivos (MAX por celda, igual que en las agregaciones en línea)
+    proveedor_nombre TEXT,
+    rfc TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_anio
+    ON contratos.rollup_contratos(anio_fuente);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_siglas
+    ON contratos.rollup_contratos(siglas_institucion);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_rfc_group_key
+    ON contratos.rollup_contratos(rfc_group_key, clave_es_rfc);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_tipo_contratacion
+    ON contratos.rollup_contratos(tipo_contratacion);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_tipo_procedimiento
+    ON contratos.rollup_contratos(tipo_procedimiento);
+
+-- Dar permisos de lectura
+GRANT SELECT ON contratos.rollup_contratos TO PUBLIC;
+
+COMMENT ON TABLE contratos.rollup_contratos IS
+'Rollup pre-agregado de contratos. Se reconstruye por año después de cada carga desde el panel de administración
+o completo con: python3 scripts/refresh_rollups.py';
+
+-- Sketches HyperLogLog por celda (año × institución × tipo de contratación)
+-- para conteos aproximados de proveedores y empresas (RFC) distintos.
+-- Los sketches se unen al consultar (ver app/utils/hll.py).
+CREATE TABLE IF NOT EXISTS contratos.rollup_hll (
+    id BIGSERIAL PRIMARY KEY,
+    anio_fuente INTEGER,
+    siglas_institucion TEXT,
+    tipo_contratacion TEXT,
+    num_contratos BIGINT NOT NULL DEFAULT 0,
+    hll_proveedores BYTEA NOT NULL,
+    hll_empresas BYTEA NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_hll_anio
+    ON contratos.rollup_hll(anio_fuente);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_hll_siglas
+    ON contratos.rollup_hll(siglas_institucion);
+
+GRANT SELECT ON contratos.rollup_hll TO PUBLIC;
+
+-- Cubo mensual: mes (de fecha_inicio_contrato) × institución × tipo de procedimiento × proveedor
+-- para series de gasto mensual y comparaciones año contra año.
+-- anio_fuente se guarda para poder recalcular solo los años cargados.
+CREATE TABLE IF NOT EXISTS contratos.cubo_mensual (
+    id BIGSERIAL PRIMARY KEY,
+    mes DATE NOT NULL,
+    anio_fuente INTEGER,
+    siglas_institucion TEXT,
+    tipo_procedimiento TEXT,
+    rfc_group_key TEXT,
+    clave_es_rfc BOOLEAN NOT NULL DEFAULT FALSE,
+    num_contratos BIGINT NOT NULL DEFAULT 0,
+    monto_total NUMERIC
+);
+
+CREATE INDEX IF NOT EXISTS idx_cubo_mensual_anio
+    ON contratos.cubo_mensual(anio_fuente);
+
+CREATE INDEX IF NOT EXISTS idx_cubo_mensual_rfc_group_key
+    ON contratos.cubo_mensual(rfc_group_key, clave_es_rfc);
+
+CREATE INDEX IF NOT EXISTS idx_cubo_mensual_siglas
+    ON contratos.cubo_mensual(siglas_institucion);
+
+GRANT SELECT ON contratos.cubo_mensual TO PUBLIC;
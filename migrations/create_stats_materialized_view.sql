@@ -1,22 +1,28 @@
 -- Crear vista materializada para estadísticas de contratos
 -- Esta vista pre-calcula las estadísticas para mejorar el rendimiento
+-- La leen /api/stats (app/routes.py y app/api/stats.py) a través de StatsService,
+-- y se refresca después de cada carga desde el panel de administración.
 
 -- Eliminar la vista materializada si existe
 DROP MATERIALIZED VIEW IF EXISTS contratos.stats_summary;
 
 -- Crear la vista materializada
+-- anio_fuente puede ser VARCHAR: solo se consideran años de 4 dígitos
 CREATE MATERIALIZED VIEW contratos.stats_summary AS
 SELECT
     COUNT(*) as total_contratos,
     SUM(importe) as total_importe,
     COUNT(DISTINCT proveedor_contratista) as proveedores_unicos,
     COUNT(DISTINCT siglas_institucion) as instituciones_unicas,
-    MAX(fecha_inicio) as ultima_actualizacion,
-    MAX(anio_fuente) as ultimo_anio
+    MAX(created_at) as ultima_actualizacion,
+    MAX(CASE WHEN anio_fuente::text ~ '^\d{4}$' THEN anio_fuente::text::integer END) as ultimo_anio,
+    COUNT(DISTINCT rfc) as empresas_unicas,
+    1 as id
 FROM contratos.contratos;
 
 -- Crear índice único para poder usar REFRESH CONCURRENTLY
-CREATE UNIQUE INDEX idx_stats_summary_unique ON contratos.stats_summary ((1));
+-- (CONCURRENTLY requiere un índice único sobre columnas, no sobre expresiones)
+CREATE UNIQUE INDEX idx_stats_summary_unique ON contratos.stats_summary (id);
 
 -- Dar permisos de lectura
 GRANT SELECT ON contratos.stats_summary TO PUBLIC;
@@ -24,4 +30,4 @@ GRANT SELECT ON contratos.stats_summary TO PUBLIC;
 -- Comentario para documentación
 COMMENT ON MATERIALIZED VIEW contratos.stats_summary IS
 'Vista materializada que contiene estadísticas pre-calculadas de la base de datos de contratos.
-Se actualiza diariamente mediante un cron job o manualmente con: REFRESH MATERIALIZED VIEW CONCURRENTLY contratos.stats_summary;';
+Se actualiza después de cada carga de datos, diariamente mediante un cron job o manualmente con: REFRESH MATERIALIZED VIEW CONCURRENTLY contratos.stats_summary;';
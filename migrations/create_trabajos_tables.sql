@@ -0,0 +1,29 @@
+-- Cola de trabajos en segundo plano (cargas de archivos y mantenimiento)
+--
+-- El panel de administración encola trabajos y consulta su progreso;
+-- scripts/worker_trabajos.py los ejecuta (y aplica este archivo al iniciar).
+-- estado: pendiente -> en_proceso -> completado | error | cancelado
+
+CREATE TABLE IF NOT EXISTS contratos.trabajos (
+    id SERIAL PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    parametros JSONB NOT NULL DEFAULT '{}'::jsonb,
+    -- Contadores que el trabajo va reportando (filas leídas, insertadas, etc.)
+    progreso JSONB NOT NULL DEFAULT '{}'::jsonb,
+    resultado JSONB,
+    mensaje TEXT,
+    -- Cancelación solicitada; el trabajo la revisa cada vez que reporta progreso
+    cancelar BOOLEAN NOT NULL DEFAULT FALSE,
+    usuario VARCHAR(100),
+    creado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+    iniciado_en TIMESTAMP,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT NOW(),
+    terminado_en TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_trabajos_pendientes
+    ON contratos.trabajos(id) WHERE estado = 'pendiente';
+
+CREATE INDEX IF NOT EXISTS idx_trabajos_creado
+    ON contratos.trabajos(creado_en DESC);
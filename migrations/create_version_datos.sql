@@ -0,0 +1,17 @@
+-- Versión de los datos de contratos
+--
+-- Una sola fila cuyo número sube después de cada carga (al terminar el
+-- mantenimiento posterior: ANALYZE, resúmenes y vista de estadísticas). Los
+-- workers web la consultan para descartar sus cachés en memoria en cuanto hay
+-- datos nuevos, en lugar de esperar a que expire el TTL.
+-- scripts/worker_trabajos.py aplica este archivo al iniciar.
+
+CREATE TABLE IF NOT EXISTS contratos.version_datos (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    -- Años afectados por la última carga ('{}' = todos)
+    anios INTEGER[] NOT NULL DEFAULT '{}',
+    actualizado_en TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO contratos.version_datos (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
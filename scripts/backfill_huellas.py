@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Script para calcular la huella de contenido (huella_contenido) de los contratos
+cargados antes de que existiera la columna.
+
+Usa la misma función que la limpieza de cargas (DataCleaner.huella_contenido),
+por lotes y con una transacción corta por lote. Si la huella de una fila ya
+pertenece a otra, la fila es un duplicado exacto: se deja en NULL, se anota en
+contratos.huellas_duplicadas y al terminar se encola el trabajo
+"limpieza_duplicados", que la borra. Hasta que ese trabajo termine quedan filas
+sin huella y las búsquedas conservan DISTINCT (app/utils/huellas.py).
+
+Uso:
+    python3 scripts/backfill_huellas.py
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+import pandas as pd
+
+from admin_app import DataCleaner
+from app.utils.trabajos import crear_tabla_trabajos, encolar_trabajo, trabajo_activo
+
+TAMANO_LOTE = 50000
+
+
+def backfill_huellas():
+    """Calcular y guardar la huella de las filas que no la tienen"""
+
+    database_url = os.environ.get('ADMIN_DATABASE_URL') or os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("✗ ERROR: ADMIN_DATABASE_URL o DATABASE_URL no está configurada")
+        return False
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    print(f"\n{'=' * 80}")
+    print(f"CALCULANDO HUELLAS DE CONTENIDO - {timestamp}")
+    print(f"{'=' * 80}\n")
+
+    engine = create_engine(database_url)
+    sql_file = Path(__file__).parent.parent / 'migrations' / 'add_huella_contenido.sql'
+    columnas = ', '.join(DataCleaner.CAMPOS_HUELLA)
+
+    try:
+        start_time = datetime.now()
+
+        with engine.connect() as conn:
+            print("1. Verificando columna e índice único...")
+            conn.execute(text(sql_file.read_text()))
+            # Los duplicados se vuelven a anotar: las filas sin huella se recorren todas otra vez
+            conn.execute(text("DELETE FROM contratos.huellas_duplicadas"))
+            conn.commit()
+
+        print("2. Calculando huellas por lotes...")
+        actualizadas = duplicadas = 0
+        with engine.connect() as lectura:
+            result = lectura.execute(text(f"""
+                SELECT ctid::text AS fila, {columnas}
+                FROM contratos.contratos
+                WHERE huella_contenido IS NULL
+            """).execution_options(stream_results=True))
+            while True:
+                filas = result.fetchmany(TAMANO_LOTE)
+                if not filas:
+                    break
+
+                lote = pd.DataFrame(filas, columns=['fila', *DataCleaner.CAMPOS_HUELLA])
+                lote['huella_contenido'] = DataCleaner.huella_contenido(lote)
+
+                buffer = io.StringIO()
+                lote[['fila', 'codigo_contrato', 'huella_contenido']].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+
+                conn = engine.raw_connection()
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        CREATE TEMP TABLE huellas_lote (fila TEXT, codigo_contrato TEXT, huella_contenido UUID)
+                        ON COMMIT DROP
+                    """)
+                    cursor.copy_expert("COPY huellas_lote FROM STDIN WITH (FORMAT csv)", buffer)
+                    # Una huella por lote (la primera fila) y solo si nadie más la tiene;
+                    # el codigo_contrato protege contra un ctid reutilizado entre lectura y escritura
+                    cursor.execute("""
+                        UPDATE contratos.contratos c
+                        SET huella_contenido = h.huella_contenido
+                        FROM (
+                            SELECT DISTINCT ON (huella_contenido) fila, codigo_contrato, huella_contenido
+                            FROM huellas_lote
+                            ORDER BY huella_contenido, fila::tid
+                        ) h
+                        WHERE c.ctid = h.fila::tid
+                          AND c.codigo_contrato = h.codigo_contrato
+                          AND c.huella_contenido IS NULL
+                          AND NOT EXISTS (
+                              SELECT 1 FROM contratos.contratos o
+                              WHERE o.huella_contenido = h.huella_contenido
+                          )
+                    """)
+                    actualizadas += cursor.rowcount
+                    # Las filas del lote que siguen sin huella son duplicados exactos
+                    cursor.execute("""
+                        INSERT INTO contratos.huellas_duplicadas (fila, codigo_contrato, huella_contenido)
+                        SELECT h.fila::tid, h.codigo_contrato, h.huella_contenido
+                        FROM huellas_lote h
+                        JOIN contratos.contratos c
+                          ON c.ctid = h.fila::tid AND c.codigo_contrato = h.codigo_contrato
+                        WHERE c.huella_contenido IS NULL
+                    """)
+                    duplicadas += cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.close()
+
+                print(f"   {actualizadas:,} huellas guardadas, {duplicadas:,} filas duplicadas")
+
+        with engine.connect() as conn:
+            print("3. Actualizando estadísticas del planner...")
+            conn.execute(text("ANALYZE contratos.contratos"))
+            conn.commit()
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"\n✓ Huellas calculadas: {actualizadas:,} filas en {elapsed:.2f} segundos")
+        if duplicadas:
+            print(f"⚠️  {duplicadas:,} filas son duplicados exactos y quedaron sin huella")
+            crear_tabla_trabajos(engine)
+            trabajo_id = trabajo_activo(engine, 'limpieza_duplicados') or encolar_trabajo(
+                engine, 'limpieza_duplicados', usuario='backfill_huellas'
+            )
+            print(f"   Se eliminan con el trabajo {trabajo_id} (limpieza_duplicados); hasta que termine "
+                  f"las búsquedas conservan DISTINCT")
+        print()
+        return True
+
+    except Exception as e:
+        print(f"\n✗ ERROR al calcular huellas: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    success = backfill_huellas()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Script para construir el snapshot columnar de agregaciones (app/utils/columnar.py).
+
+Escribe una nueva versión en SNAPSHOT_DIR y la publica en ACTUAL; los workers
+de gunicorn la abren (memory-mapped) en su siguiente búsqueda.
+Requiere SNAPSHOT_ENABLED=true en la aplicación para que se use.
+
+Uso:
+    python3 scripts/build_snapshot.py
+    python3 scripts/build_snapshot.py /ruta/al/snapshot
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()
+
+from app.utils.columnar import construir_snapshot
+
+
+def build_snapshot(directorio):
+    """Construir y publicar una nueva versión del snapshot"""
+
+    database_url = os.environ.get('ADMIN_DATABASE_URL') or os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("✗ ERROR: ADMIN_DATABASE_URL o DATABASE_URL no está configurada")
+        return False
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    print(f"\n{'=' * 80}")
+    print(f"CONSTRUYENDO SNAPSHOT COLUMNAR - {timestamp}")
+    print(f"{'=' * 80}\n")
+    print(f"Directorio: {directorio}")
+
+    engine = create_engine(database_url)
+
+    try:
+        start_time = datetime.now()
+
+        with engine.connect() as conn:
+            filas = construir_snapshot(conn, directorio)
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"\n✓ Snapshot publicado: {filas:,} contratos en {elapsed:.2f} segundos\n")
+        return True
+
+    except Exception as e:
+        print(f"\n✗ ERROR al construir snapshot: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    directorio = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('SNAPSHOT_DIR', 'data/snapshot')
+    success = build_snapshot(directorio)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script para calcular los puntajes de riesgo (banderas rojas) de todos los contratos.
+
+Recorre contratos.contratos en lotes con pandas (dos pasadas: estadísticas
+globales y banderas por contrato) y guarda el detalle en contratos.riesgo_banderas
+y el puntaje en contratos.contratos.riesgo_puntaje (indexado).
+Pensado para ejecutarse fuera de línea (cron) después de las cargas.
+
+Uso:
+    python3 scripts/calcular_riesgo.py
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+from app.services.riesgo_service import calcular_puntajes
+
+
+def calcular_riesgo():
+    """Crear (si no existen) las columnas/tablas de riesgo y recalcular los puntajes"""
+
+    database_url = os.environ.get('ADMIN_DATABASE_URL') or os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("✗ ERROR: ADMIN_DATABASE_URL o DATABASE_URL no está configurada")
+        return False
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    print(f"\n{'=' * 80}")
+    print(f"CALCULANDO PUNTAJES DE RIESGO - {timestamp}")
+    print(f"{'=' * 80}\n")
+
+    engine = create_engine(database_url)
+    sql_file = Path(__file__).parent.parent / 'migrations' / 'create_riesgo_tables.sql'
+
+    try:
+        start_time = datetime.now()
+
+        with engine.connect() as conn:
+            print("1. Verificando columnas y tablas de riesgo...")
+            conn.execute(text(sql_file.read_text()))
+            conn.commit()
+
+            print("2. Calculando banderas por lotes...")
+            resultado = calcular_puntajes(conn)
+            conn.commit()
+
+            print("3. Actualizando estadísticas del planner...")
+            conn.execute(text("ANALYZE contratos.riesgo_banderas"))
+            conn.execute(text("ANALYZE contratos.contratos"))
+            conn.commit()
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"\n✓ {resultado['contratos']:,} contratos calificados "
+              f"({resultado['con_banderas']:,} con banderas, {resultado['actualizados']:,} actualizados) "
+              f"en {elapsed:.2f} segundos\n")
+        if resultado['sin_huella']:
+            print(f"⚠️ {resultado['sin_huella']:,} contratos sin huella omitidos: "
+                  f"ejecuta scripts/backfill_huellas.py y vuelve a calcular\n")
+        return True
+
+    except Exception as e:
+        print(f"\n✗ ERROR al calcular puntajes de riesgo: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    success = calcular_riesgo()
+    sys.exit(0 if success else 1)
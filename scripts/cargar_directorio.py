@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Script para cargar muchos archivos de contratos sin el panel de administración
+(ej. el histórico de varios años).
+
+Usa la misma limpieza y carga que el panel (admin_app.procesar_archivo), incluido
+el manifiesto de cargas: los archivos ya cargados se omiten y una carga
+interrumpida se reanuda, así que el script se puede volver a correr sin costo.
+Acepta .csv, .csv.gz, .zip y .parquet. Al final actualiza una sola vez los
+resúmenes de todos los años cargados.
+
+Uso:
+    python3 scripts/cargar_directorio.py data/historico/
+    python3 scripts/cargar_directorio.py "data/historico/contratos_20*.csv.gz" --paralelo 2
+    python3 scripts/cargar_directorio.py data/historico/ --json > resultado.json   # Para cron
+
+Código de salida: 0 si todos los archivos se cargaron (u omitieron, incluidos los que
+otro proceso está cargando), 1 si alguno falló.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from admin_app import (
+    engine, procesar_archivo, actualizar_resumenes, verificar_indices, resumir_advertencias,
+    formato_archivo, anio_de_nombre, FORMATOS_CARGA, PROCESOS_LIMPIEZA, TAMANO_BLOQUE
+)
+from app.utils.manifiesto import crear_tabla_manifiesto, sha256_archivo, anios_cargados, CargaEnCurso
+from app.utils.version_datos import crear_tabla_version
+
+# Archivos cargados a la vez (cada uno limpia con su propio pool de procesos)
+PARALELO = int(os.environ.get('CARGA_PARALELO', 2))
+
+
+def buscar_archivos(rutas):
+    """Archivos de carga de los directorios o patrones glob indicados, sin repetir y en orden"""
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            candidatos = [os.path.join(ruta, nombre) for nombre in os.listdir(ruta)]
+        else:
+            candidatos = glob.glob(ruta)
+        archivos.extend(
+            c for c in candidatos
+            if os.path.isfile(c) and formato_archivo(c) is not None
+        )
+    return sorted(set(archivos))
+
+
+def cargar_archivo(ruta, procesos, tamano_bloque, forzar, actualizar):
+    """Carga un archivo y retorna su resultado (nunca lanza excepción)"""
+    inicio = datetime.now()
+    resultado = {'archivo': ruta, 'anio_archivo': anio_de_nombre(ruta)}
+    try:
+        resumen, cleaner = procesar_archivo(
+            ruta,
+            anio_archivo=resultado['anio_archivo'],
+            tamano_bloque=tamano_bloque,
+            procesos=procesos,
+            nombre_archivo=os.path.basename(ruta),
+            forzar=forzar,
+            actualizar=actualizar
+        )
+        resultado.update(resumen)
+        resultado['estado'] = 'omitido' if resumen['omitido'] else 'completado'
+        resultado['advertencias'] = resumir_advertencias(cleaner)
+    except CargaEnCurso as e:
+        # Otro proceso lo está cargando: se omite (esa carga lo termina)
+        resultado['estado'] = 'en_curso'
+        resultado['error'] = str(e)
+    except Exception as e:
+        resultado['estado'] = 'error'
+        resultado['error'] = str(e)
+        # Los bloques confirmados antes del error ya están en la tabla: sus años
+        # también se actualizan (el manifiesto los registra por bloque)
+        try:
+            resultado['anios'] = anios_cargados(engine, sha256_archivo(ruta), resultado['anio_archivo'])
+        except Exception:
+            resultado['anios'] = []
+
+    segundos = (datetime.now() - inicio).total_seconds()
+    resultado['segundos'] = round(segundos, 2)
+    # Solo cuentan las filas leídas en esta corrida (no las de una carga reanudada)
+    filas = resultado.get('registros_leidos', 0) - resultado.get('filas_previas', 0)
+    resultado['filas_por_segundo'] = round(filas / max(segundos, 0.001)) if resultado['estado'] == 'completado' else None
+    return resultado
+
+
+def cargar_directorio(rutas, paralelo=PARALELO, tamano_bloque=TAMANO_BLOQUE, forzar=False, actualizar=False,
+                      salida=sys.stdout):
+    """Carga los archivos encontrados; retorna el resumen de la corrida"""
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    print(f"\n{'=' * 80}", file=salida)
+    print(f"CARGA MASIVA DE ARCHIVOS - {timestamp}", file=salida)
+    print(f"{'=' * 80}\n", file=salida)
+
+    archivos = buscar_archivos(rutas)
+    if not archivos:
+        print(f"✗ No se encontraron archivos ({', '.join(FORMATOS_CARGA)}) en: {', '.join(rutas)}", file=salida)
+        return {'archivos': [], 'exito': False, 'error': 'Sin archivos'}
+
+    paralelo = max(1, min(paralelo, len(archivos)))
+    procesos = max(1, PROCESOS_LIMPIEZA // paralelo)
+    print(f"1. {len(archivos)} archivos, {paralelo} a la vez ({procesos} procesos de limpieza cada uno)", file=salida)
+
+    crear_tabla_manifiesto(engine)
+    crear_tabla_version(engine)
+    verificar_indices(usuario='cargar_directorio')
+
+    print("2. Cargando archivos...", file=salida)
+    start_time = datetime.now()
+    resultados = []
+    with ThreadPoolExecutor(max_workers=paralelo) as pool:
+        futuros = [pool.submit(cargar_archivo, ruta, procesos, tamano_bloque, forzar, actualizar) for ruta in archivos]
+        for futuro in as_completed(futuros):
+            r = futuro.result()
+            resultados.append(r)
+            nombre = os.path.basename(r['archivo'])
+            if r['estado'] == 'error':
+                print(f"   ✗ {nombre}: {r['error']}", file=salida)
+            elif r['estado'] == 'omitido':
+                print(f"   ✓ {nombre}: ya cargado, omitido", file=salida)
+            elif r['estado'] == 'en_curso':
+                print(f"   - {nombre}: se está cargando en otro proceso, omitido", file=salida)
+            else:
+                reanudado = f", reanudado en el bloque {r['reanudado_desde'] + 1}" if r['reanudado_desde'] else ''
+                actualizados = f"{r['registros_actualizados']:,} actualizados, " if actualizar else ''
+                print(
+                    f"   ✓ {nombre}: {r['registros_leidos']:,} leídos, {r['registros_insertados']:,} nuevos, "
+                    f"{actualizados}{r['registros_duplicados']:,} duplicados en {r['segundos']:.1f}s "
+                    f"({r['filas_por_segundo']:,} filas/s{reanudado})",
+                    file=salida
+                )
+
+    resultados.sort(key=lambda r: r['archivo'])
+    anios = sorted({a for r in resultados if r['estado'] in ('completado', 'error') for a in r['anios']})
+
+    resumenes = True
+    if anios:
+        print(f"3. Actualizando resúmenes de los años {', '.join(map(str, anios))}...", file=salida)
+        resumenes = actualizar_resumenes(anios)
+
+    elapsed = (datetime.now() - start_time).total_seconds()
+    errores = [r for r in resultados if r['estado'] == 'error']
+    total_leidos = sum(r.get('registros_leidos', 0) for r in resultados if r['estado'] == 'completado')
+
+    print(f"\n{'=' * 80}", file=salida)
+    if errores:
+        print(f"✗ {len(errores)} de {len(resultados)} archivos con error", file=salida)
+    else:
+        print(f"✓ {len(resultados)} archivos procesados en {elapsed:.2f} segundos", file=salida)
+    print(f"  - Filas leídas: {total_leidos:,}", file=salida)
+    print(f"  - Filas nuevas: {sum(r.get('registros_insertados', 0) for r in resultados):,}", file=salida)
+    if actualizar:
+        print(f"  - Filas actualizadas: {sum(r.get('registros_actualizados', 0) for r in resultados):,}", file=salida)
+    print(f"{'=' * 80}\n", file=salida)
+
+    return {
+        'inicio': timestamp,
+        'segundos': round(elapsed, 2),
+        'archivos': resultados,
+        'anios_actualizados': anios,
+        'resumenes_actualizados': resumenes,
+        'exito': not errores
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Carga masiva de archivos de contratos')
+    parser.add_argument('rutas', nargs='+', help='Directorios o patrones glob de archivos')
+    parser.add_argument('--paralelo', type=int, default=PARALELO, help='Archivos cargados a la vez')
+    parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE, help='Filas por bloque')
+    parser.add_argument('--forzar', action='store_true', help='Recargar archivos ya cargados')
+    parser.add_argument('--actualizar', action='store_true',
+                        help='Actualizar los contratos existentes cuyo contenido cambió')
+    parser.add_argument('--json', action='store_true',
+                        help='Imprimir el resultado como JSON en stdout (el avance va a stderr)')
+    args = parser.parse_args()
+
+    try:
+        resultado = cargar_directorio(
+            args.rutas,
+            paralelo=args.paralelo,
+            tamano_bloque=args.tamano_bloque,
+            forzar=args.forzar,
+            actualizar=args.actualizar,
+            salida=sys.stderr if args.json else sys.stdout
+        )
+    except Exception as e:
+        print(f"✗ ERROR: {str(e)}", file=sys.stderr)
+        resultado = {'archivos': [], 'exito': False, 'error': str(e)}
+
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2, default=str))
+    sys.exit(0 if resultado['exito'] else 1)
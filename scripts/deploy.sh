@@ -52,8 +52,10 @@ fi
 # 7. Configurar Gunicorn como servicio
 echo "[6/8] Configurando Gunicorn..."
 cp scripts/lalupa.service /etc/systemd/system/
+cp scripts/lalupa-worker.service /etc/systemd/system/
 systemctl daemon-reload
 systemctl enable lalupa
+systemctl enable lalupa-worker
 
 # 8. Configurar Nginx
 echo "[7/8] Configurando Nginx..."
@@ -72,6 +74,7 @@ chmod -R 755 $APP_DIR
 # 10. Iniciar servicios
 echo "Iniciando servicios..."
 systemctl restart lalupa
+systemctl restart lalupa-worker
 systemctl restart nginx
 
 echo ""
@@ -82,7 +85,7 @@ echo ""
 echo "Pasos siguientes:"
 echo "1. Edita /var/www/lalupa/.env con tus credenciales de BD"
 echo "2. Edita /etc/nginx/sites-available/lalupa con tu dominio"
-echo "3. Reinicia: sudo systemctl restart lalupa nginx"
+echo "3. Reinicia: sudo systemctl restart lalupa lalupa-worker nginx"
 echo ""
 echo "Para HTTPS con Let's Encrypt:"
 echo "  sudo apt install certbot python3-certbot-nginx"
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Script para crear y reconstruir las tablas de perfiles pre-calculados
+(resumen por proveedor y perfil por institución).
+
+Requiere el rollup de contratos actualizado (scripts/refresh_rollups.py).
+El panel de administración actualiza los años cargados después de cada carga;
+este script sirve para la creación inicial o para una reconstrucción completa.
+
+Uso:
+    python3 scripts/refresh_perfiles.py              # Reconstruir todo
+    python3 scripts/refresh_perfiles.py 2023 2024    # Solo lo afectado por esos años
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+from app.services.proveedor_service import refrescar_resumen_proveedores
+from app.services.institucion_service import refrescar_perfiles_instituciones
+
+
+def refresh_perfiles(anios=None):
+    """Crear (si no existen) y reconstruir las tablas de perfiles"""
+
+    database_url = os.environ.get('ADMIN_DATABASE_URL') or os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("✗ ERROR: ADMIN_DATABASE_URL o DATABASE_URL no está configurada")
+        return False
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    print(f"\n{'=' * 80}")
+    print(f"RECONSTRUYENDO PERFILES - {timestamp}")
+    print(f"{'=' * 80}\n")
+
+    engine = create_engine(database_url)
+    sql_file = Path(__file__).parent.parent / 'migrations' / 'create_perfiles_tables.sql'
+
+    try:
+        start_time = datetime.now()
+
+        with engine.connect() as conn:
+            print("1. Verificando tablas de perfiles...")
+            conn.execute(text(sql_file.read_text()))
+            conn.commit()
+
+            print(f"2. Recalculando perfiles de proveedores (años: {anios or 'todos'})...")
+            proveedores = refrescar_resumen_proveedores(conn, anios=anios)
+            conn.commit()
+
+            print(f"3. Recalculando perfiles de instituciones (años: {anios or 'todos'})...")
+            instituciones = refrescar_perfiles_instituciones(conn, anios=anios)
+            conn.commit()
+
+            print("4. Actualizando estadísticas del planner...")
+            conn.execute(text("ANALYZE contratos.resumen_proveedores"))
+            conn.execute(text("ANALYZE contratos.perfil_instituciones"))
+            conn.commit()
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"\n✓ Perfiles reconstruidos: {proveedores:,} proveedores, {instituciones:,} perfiles de instituciones en {elapsed:.2f} segundos\n")
+        return True
+
+    except Exception as e:
+        print(f"\n✗ ERROR al reconstruir perfiles: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    anios = [int(a) for a in sys.argv[1:]] or None
+    success = refresh_perfiles(anios)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Script para crear y reconstruir los rollups pre-agregados de contratos
+(incluye el cubo mensual y los sketches HyperLogLog de conteos distintos).
+
+El panel de administración actualiza los años cargados después de cada carga;
+este script sirve para la creación inicial o para una reconstrucción completa.
+
+Uso:
+    python3 scripts/refresh_rollups.py              # Reconstruir todo
+    python3 scripts/refresh_rollups.py 2023 2024    # Solo esos años
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()
+
+from app.services.rollup_service import refrescar_rollups, refrescar_cubo_mensual
+from app.services.cardinalidad_service import refrescar_sketches
+
+
+def refresh_rollups(anios=None):
+    """Crear (si no existe) y reconstruir el rollup de contratos"""
+
+    database_url = os.environ.get('ADMIN_DATABASE_URL') or os.environ.get('DATABASE_URL')
+    if not database_url:
+        print("✗ ERROR: ADMIN_DATABASE_URL o DATABASE_URL no está configurada")
+        return False
+
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    print(f"\n{'=' * 80}")
+    print(f"RECONSTRUYENDO ROLLUPS - {timestamp}")
+    print(f"{'=' * 80}\n")
+
+    engine = create_engine(database_url)
+    sql_file = Path(__file__).parent.parent / 'migrations' / 'create_rollup_tables.sql'
+
+    try:
+        start_time = datetime.now()
+
+        with engine.connect() as conn:
+            print("1. Verificando tabla de rollup...")
+            conn.execute(text(sql_file.read_text()))
+            conn.commit()
+
+            print(f"2. Recalculando celdas (años: {anios or 'todos'})...")
+            celdas = refrescar_rollups(conn, anios=anios)
+            conn.commit()
+
+            print("3. Recalculando cubo mensual...")
+            celdas_mes = refrescar_cubo_mensual(conn, anios=anios)
+            conn.commit()
+
+            print("4. Construyendo sketches HyperLogLog...")
+            celdas_hll = refrescar_sketches(conn, anios=anios)
+            conn.commit()
+
+            print("5. Actualizando estadísticas del planner...")
+            conn.execute(text("ANALYZE contratos.rollup_contratos"))
+            conn.execute(text("ANALYZE contratos.cubo_mensual"))
+            conn.execute(text("ANALYZE contratos.rollup_hll"))
+            conn.commit()
+
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"\n✓ Rollup reconstruido: {celdas:,} celdas ({celdas_mes:,} mensuales, {celdas_hll:,} con sketches) en {elapsed:.2f} segundos\n")
+        return True
+
+    except Exception as e:
+        print(f"\n✗ ERROR al reconstruir rollups: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    anios = [int(a) for a in sys.argv[1:]] or None
+    success = refresh_rollups(anios)
+    sys.exit(0 if success else 1)
@@ -7,6 +7,10 @@ Ejemplo de crontab:
 0 2 * * * cd /path/to/lalupa && python3 scripts/refresh_stats_view.py >> logs/refresh_stats.log 2>&1
 
 Esto ejecutará el refresh todos los días a las 2:00 AM.
+
+Las cargas ya refrescan la vista (admin_app.actualizar_resumenes); este cron es
+el respaldo. También sube la versión de los datos para que los workers web
+descarten su caché de estadísticas.
 """
 
 import os
@@ -19,6 +23,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sqlalchemy import create_engine, text
 
+from app.utils.version_datos import incrementar_version
+
 def refresh_materialized_view():
     """Refrescar la vista materializada de estadísticas"""
 
@@ -44,6 +50,13 @@ def refresh_materialized_view():
             conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY contratos.stats_summary"))
             conn.commit()
 
+            try:
+                incrementar_version(conn)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  No se pudo actualizar la versión de los datos: {str(e)}")
+
             elapsed = (datetime.now() - start_time).total_seconds()
 
             # Verificar los datos actualizados
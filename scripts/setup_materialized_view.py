@@ -40,21 +40,24 @@ def create_materialized_view():
             conn.commit()
 
             print("2. Creando vista materializada...")
-            conn.execute(text("""
+            conn.execute(text(r"""
                 CREATE MATERIALIZED VIEW contratos.stats_summary AS
                 SELECT
                     COUNT(*) as total_contratos,
                     SUM(importe) as total_importe,
                     COUNT(DISTINCT proveedor_contratista) as proveedores_unicos,
                     COUNT(DISTINCT siglas_institucion) as instituciones_unicas,
-                    MAX(fecha_inicio) as ultima_actualizacion,
-                    MAX(anio_fuente) as ultimo_anio
+                    MAX(created_at) as ultima_actualizacion,
+                    MAX(CASE WHEN anio_fuente::text ~ '^\d{4}$' THEN anio_fuente::text::integer END) as ultimo_anio,
+                    COUNT(DISTINCT rfc) as empresas_unicas,
+                    1 as id
                 FROM contratos.contratos
             """))
             conn.commit()
 
             print("3. Creando índice único...")
-            conn.execute(text("CREATE UNIQUE INDEX idx_stats_summary_unique ON contratos.stats_summary ((1))"))
+            # REFRESH CONCURRENTLY requiere un índice único sobre columnas (no expresiones)
+            conn.execute(text("CREATE UNIQUE INDEX idx_stats_summary_unique ON contratos.stats_summary (id)"))
             conn.commit()
 
             print("4. Configurando permisos...")
@@ -65,7 +68,7 @@ def create_materialized_view():
             conn.execute(text("""
                 COMMENT ON MATERIALIZED VIEW contratos.stats_summary IS
                 'Vista materializada que contiene estadísticas pre-calculadas de la base de datos de contratos.
-                Se actualiza diariamente mediante un cron job o manualmente con: REFRESH MATERIALIZED VIEW CONCURRENTLY contratos.stats_summary;'
+                Se actualiza después de cada carga de datos, diariamente mediante un cron job o manualmente con: REFRESH MATERIALIZED VIEW CONCURRENTLY contratos.stats_summary;'
             """))
             conn.commit()
 
@@ -93,8 +96,7 @@ def create_materialized_view():
                 print("   - Usar pg_cron (si está instalado en PostgreSQL)")
                 print("   - O usar un cron job del sistema:")
                 print("     Agregar a crontab: 0 2 * * * python3 /path/to/refresh_stats_view.py")
-                print("\n2. Modificar el endpoint /api/stats para usar la vista materializada")
-                print("\n3. Para refrescar manualmente:")
+                print("\n2. Para refrescar manualmente:")
                 print("   REFRESH MATERIALIZED VIEW CONCURRENTLY contratos.stats_summary;")
 
                 return True
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Worker de trabajos en segundo plano del panel de administración (cargas,
+reemplazo de un año completo, limpieza de duplicados y construcción de índices).
+
+Toma los trabajos pendientes de contratos.trabajos con FOR UPDATE SKIP LOCKED,
+así que se pueden correr varios workers a la vez. Debe ver el mismo CARGA_DIR
+que el panel (donde quedan los archivos subidos).
+
+Uso:
+    python3 scripts/worker_trabajos.py            # Atender la cola indefinidamente
+    python3 scripts/worker_trabajos.py --una-vez  # Procesar los pendientes y salir
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from datetime import datetime
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from admin_app import engine, EJECUTORES_TRABAJO
+from app.utils.trabajos import crear_tabla_trabajos, reclamar_trabajo, terminar_trabajo, liberar_huerfanos
+from app.utils.manifiesto import crear_tabla_manifiesto
+from app.utils.version_datos import crear_tabla_version
+
+# Segundos entre consultas a la cola cuando no hay trabajos
+INTERVALO = int(os.environ.get('TRABAJOS_INTERVALO', 5))
+
+
+def ejecutar(trabajo):
+    """Ejecuta un trabajo reclamado y registra su resultado"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"\n{'=' * 80}")
+    print(f"TRABAJO #{trabajo['id']} ({trabajo['tipo']}) - {timestamp}")
+    print(f"{'=' * 80}\n")
+
+    ejecutor = EJECUTORES_TRABAJO.get(trabajo['tipo'])
+    if ejecutor is None:
+        print(f"✗ Tipo de trabajo desconocido: {trabajo['tipo']}")
+        terminar_trabajo(engine, trabajo['id'], 'error', mensaje=f"Tipo de trabajo desconocido: {trabajo['tipo']}")
+        return False
+
+    start_time = datetime.now()
+    try:
+        estado, resultado = ejecutor(trabajo)
+        terminar_trabajo(engine, trabajo['id'], estado, resultado=resultado)
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"✓ Trabajo #{trabajo['id']} {estado} en {elapsed:.2f} segundos")
+        return True
+    except Exception as e:
+        print(f"✗ ERROR en el trabajo #{trabajo['id']}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        terminar_trabajo(engine, trabajo['id'], 'error', mensaje=str(e))
+        return False
+
+
+def main(una_vez=False):
+    try:
+        crear_tabla_trabajos(engine)
+        crear_tabla_manifiesto(engine)
+        crear_tabla_version(engine)
+        huerfanos = liberar_huerfanos(engine)
+        if huerfanos:
+            print(f"⚠️  {huerfanos} trabajos abandonados marcados como error")
+    except Exception as e:
+        print(f"✗ ERROR al preparar la cola de trabajos: {str(e)}")
+        return False
+
+    print(f"✓ Worker iniciado (tipos: {', '.join(EJECUTORES_TRABAJO)})")
+
+    while True:
+        try:
+            # El trabajo conserva su lock mientras se ejecuta (ver liberar_huerfanos)
+            with reclamar_trabajo(engine, tipos=list(EJECUTORES_TRABAJO)) as trabajo:
+                if trabajo is not None:
+                    ejecutar(trabajo)
+                    continue
+        except Exception as e:
+            print(f"✗ ERROR al consultar la cola: {str(e)}")
+
+        if una_vez:
+            return True
+        time.sleep(INTERVALO)
+
+
+if __name__ == '__main__':
+    try:
+        success = main(una_vez='--una-vez' in sys.argv[1:])
+    except KeyboardInterrupt:
+        print("\nWorker detenido")
+        success = True
+    sys.exit(0 if success else 1)
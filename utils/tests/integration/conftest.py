@@ -0,0 +1,65 @@
+"""
+Pruebas de integración contra PostgreSQL. Corren solo con LALUPA_TEST_DATABASE_URL
+apuntando a una base de datos desechable: cada prueba borra y vuelve a crear el
+esquema contratos.
+"""
+import os
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+MIGRACIONES = Path(__file__).parent.parent.parent.parent / 'migrations'
+
+# contratos.contratos no tiene migración (se creó antes que ellas): mismas columnas que app/models/contrato.py
+TABLA_CONTRATOS = """
+    CREATE TABLE contratos.contratos (
+        codigo_contrato VARCHAR PRIMARY KEY,
+        codigo_expediente VARCHAR,
+        titulo_contrato TEXT,
+        titulo_expediente TEXT,
+        descripcion_contrato TEXT,
+        tipo_contratacion VARCHAR,
+        tipo_procedimiento VARCHAR,
+        proveedor_contratista VARCHAR,
+        rfc VARCHAR,
+        institucion VARCHAR,
+        siglas_institucion VARCHAR,
+        importe NUMERIC,
+        importe_contrato VARCHAR,
+        moneda VARCHAR,
+        fecha_inicio_contrato DATE,
+        fecha_fin_contrato DATE,
+        estatus_contrato VARCHAR,
+        direccion_anuncio TEXT,
+        anio_fuente INTEGER,
+        anio_fundacion_empresa INTEGER,
+        riesgo_puntaje SMALLINT,
+        huella_contenido UUID,
+        created_at TIMESTAMP DEFAULT NOW()
+    )
+"""
+
+
+@pytest.fixture
+def engine():
+    url = os.getenv('LALUPA_TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('LALUPA_TEST_DATABASE_URL no está configurada')
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS contratos CASCADE"))
+        conn.execute(text("CREATE SCHEMA contratos"))
+        conn.execute(text(TABLA_CONTRATOS))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def migrar(engine):
+    """Corre migraciones/<nombre>.sql sobre la base de pruebas"""
+    def migrar(*nombres):
+        with engine.begin() as conn:
+            for nombre in nombres:
+                conn.execute(text((MIGRACIONES / f'{nombre}.sql').read_text()))
+    return migrar
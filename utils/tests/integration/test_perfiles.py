@@ -0,0 +1,120 @@
+"""
+Refresco incremental de perfiles (proveedor_service, institucion_service):
+un año que se recarga sin un proveedor o una institución no deja sus
+perfiles con los totales anteriores.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.services.institucion_service import refrescar_perfiles_instituciones
+from app.services.proveedor_service import refrescar_resumen_proveedores
+from app.services.rollup_service import refrescar_rollups
+
+PROVEEDOR = ('AAA010101AA1', True)
+
+
+def _contrato(conn, codigo, anio, importe, rfc='AAA010101AA1', siglas='IMSS'):
+    conn.execute(text("""
+        INSERT INTO contratos.contratos (
+            codigo_contrato, proveedor_contratista, rfc, siglas_institucion, institucion,
+            tipo_procedimiento, importe, fecha_inicio_contrato, anio_fuente
+        )
+        VALUES (:codigo, 'PROVEEDOR ' || :rfc, :rfc, :siglas, 'INSTITUTO ' || :siglas,
+                'ADJUDICACIÓN DIRECTA', :importe, make_date(:anio, 3, 1), :anio)
+    """), {'codigo': codigo, 'anio': anio, 'importe': importe, 'rfc': rfc, 'siglas': siglas})
+
+
+def _refrescar(engine, anios=None):
+    with engine.begin() as conn:
+        refrescar_rollups(conn, anios=anios)
+        refrescar_resumen_proveedores(conn, anios=anios)
+        refrescar_perfiles_instituciones(conn, anios=anios)
+
+
+def _perfil(engine, clave):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT num_contratos, monto_total, por_anio, top_instituciones
+            FROM contratos.resumen_proveedores
+            WHERE rfc_group_key = :clave AND clave_es_rfc = :es_rfc
+        """), {'clave': clave[0], 'es_rfc': clave[1]}).fetchone()
+
+
+@pytest.fixture
+def contratos(engine, migrar):
+    migrar('create_rollup_tables', 'create_perfiles_tables')
+    with engine.begin() as conn:
+        _contrato(conn, 'C-2022', 2022, 100)
+        _contrato(conn, 'C-2023', 2023, 50, siglas='SEP')
+        _contrato(conn, 'OTRO-2023', 2023, 10, rfc='BBB010101BB1')
+    _refrescar(engine)
+    return engine
+
+
+def test_proveedor_que_sale_de_un_anio(contratos):
+    assert _perfil(contratos, PROVEEDOR).num_contratos == 2
+
+    # Se recarga 2023 sin los contratos del proveedor
+    with contratos.begin() as conn:
+        conn.execute(text("DELETE FROM contratos.contratos WHERE codigo_contrato = 'C-2023'"))
+    _refrescar(contratos, anios=[2023])
+
+    perfil = _perfil(contratos, PROVEEDOR)
+    assert perfil.num_contratos == 1
+    assert perfil.monto_total == 100
+    assert [a['anio'] for a in perfil.por_anio] == [2022]
+    assert [i['siglas'] for i in perfil.top_instituciones] == ['IMSS']
+
+
+def test_proveedor_sin_contratos_se_borra(contratos):
+    with contratos.begin() as conn:
+        conn.execute(text("DELETE FROM contratos.contratos WHERE codigo_contrato = 'OTRO-2023'"))
+    _refrescar(contratos, anios=[2023])
+
+    assert _perfil(contratos, ('BBB010101BB1', True)) is None
+    assert _perfil(contratos, PROVEEDOR).num_contratos == 2
+
+
+def test_lista_de_anios_vacia_no_cambia_nada(contratos):
+    with contratos.begin() as conn:
+        conn.execute(text("DELETE FROM contratos.contratos"))
+    _refrescar(contratos, anios=[])
+    assert _perfil(contratos, PROVEEDOR).num_contratos == 2
+
+
+def _perfiles_institucion(engine, siglas):
+    with engine.connect() as conn:
+        return {
+            fila.anio_fuente: fila
+            for fila in conn.execute(text("""
+                SELECT anio_fuente, num_contratos, monto_total, num_proveedores, top10_share
+                FROM contratos.perfil_instituciones WHERE siglas_institucion = :siglas
+            """), {'siglas': siglas})
+        }
+
+
+def test_institucion_que_sale_de_un_anio(contratos):
+    with contratos.begin() as conn:
+        _contrato(conn, 'SEP-2022', 2022, 30, rfc='CCC010101CC1', siglas='SEP')
+    _refrescar(contratos)
+    assert _perfiles_institucion(contratos, 'SEP')[None].num_contratos == 2
+
+    # Se recarga 2023 sin contratos de la SEP
+    with contratos.begin() as conn:
+        conn.execute(text("DELETE FROM contratos.contratos WHERE codigo_contrato = 'C-2023'"))
+    _refrescar(contratos, anios=[2023])
+
+    perfiles = _perfiles_institucion(contratos, 'SEP')
+    assert set(perfiles) == {2022, None}
+    assert perfiles[None].num_contratos == 1
+    assert perfiles[None].monto_total == 30
+    assert perfiles[None].num_proveedores == 1
+
+
+def test_institucion_sin_contratos_se_borra(contratos):
+    with contratos.begin() as conn:
+        conn.execute(text("DELETE FROM contratos.contratos WHERE codigo_contrato = 'C-2023'"))
+    _refrescar(contratos, anios=[2023])
+
+    assert _perfiles_institucion(contratos, 'SEP') == {}
+    assert set(_perfiles_institucion(contratos, 'IMSS')) == {2022, 2023, None}
@@ -0,0 +1,40 @@
+"""
+Trabajos huérfanos (app/utils/trabajos.py): solo se marcan como error los
+trabajos en_proceso cuyo worker ya no tiene el lock, no los que llevan mucho
+tiempo corriendo sin reportar progreso.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.utils.trabajos import encolar_trabajo, liberar_huerfanos, obtener_trabajo, reclamar_trabajo
+
+
+@pytest.fixture
+def trabajos(engine, migrar):
+    migrar('create_trabajos_tables')
+    return engine
+
+
+def test_trabajo_en_ejecucion_no_es_huerfano(trabajos):
+    trabajo_id = encolar_trabajo(trabajos, 'carga')
+    with reclamar_trabajo(trabajos) as trabajo:
+        assert trabajo['id'] == trabajo_id
+        # Sin progreso desde hace horas, pero el worker sigue vivo
+        with trabajos.begin() as conn:
+            conn.execute(text("UPDATE contratos.trabajos SET actualizado_en = NOW() - INTERVAL '1 day'"))
+        assert liberar_huerfanos(trabajos) == 0
+        assert obtener_trabajo(trabajos, trabajo_id)['estado'] == 'en_proceso'
+
+
+def test_trabajo_sin_worker_es_huerfano(trabajos):
+    trabajo_id = encolar_trabajo(trabajos, 'carga')
+    # El worker suelta el lock sin terminar el trabajo (como si hubiera muerto)
+    with reclamar_trabajo(trabajos):
+        pass
+    assert liberar_huerfanos(trabajos) == 1
+    assert obtener_trabajo(trabajos, trabajo_id)['estado'] == 'error'
+
+
+def test_sin_pendientes(trabajos):
+    with reclamar_trabajo(trabajos) as trabajo:
+        assert trabajo is None
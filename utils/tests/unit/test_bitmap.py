@@ -0,0 +1,87 @@
+"""Pruebas de app/utils/bitmap.py: popcount y conteos de facetas contra un conteo directo"""
+import numpy as np
+import pytest
+
+from app.utils import bitmap
+from app.utils.bitmap import FACETAS_BITMAP, IndiceBitmap, escribir_bitmaps, popcount
+
+
+def test_popcount_de_cada_byte():
+    bytes_ = np.arange(256, dtype=np.uint8)
+    esperado = [bin(b).count('1') for b in range(256)]
+    assert [int(popcount(np.array([b], dtype=np.uint8))) for b in bytes_] == esperado
+
+
+def test_popcount_igual_a_unpackbits():
+    rng = np.random.default_rng(31)
+    matriz = rng.integers(0, 256, size=(7, 1001), dtype=np.uint8)
+    np.testing.assert_array_equal(popcount(matriz), np.unpackbits(matriz, axis=1).sum(axis=1))
+    assert popcount(matriz[0]) == np.unpackbits(matriz[0]).sum()
+
+
+def _indice(tmp_path, filas=1003):
+    """Snapshot sintético (filas no múltiplo de 8 para probar el último byte)"""
+    rng = np.random.default_rng(7)
+    diccionarios = {
+        'siglas_institucion': ['IMSS', 'ISSSTE', 'SEP', 'CFE'],
+        'tipo_contratacion': ['ADQUISICIONES', 'SERVICIOS', 'OBRA PUBLICA'],
+        'tipo_procedimiento': ['ADJUDICACION DIRECTA', 'LICITACION PUBLICA'],
+        'anio_fuente': [2022, 2023, 2024],
+        'estatus_contrato': ['ACTIVO', 'EXPIRADO']
+    }
+    columnas = {
+        dimension: rng.integers(0, len(valores), size=filas)
+        for dimension, valores in diccionarios.items()
+    }
+    escribir_bitmaps(tmp_path, columnas, diccionarios)
+    return IndiceBitmap(tmp_path, diccionarios, filas), columnas, diccionarios
+
+
+def _mascara(columnas, diccionarios, filters, excluir=None):
+    """Filtro fila por fila, para comparar con los bitsets"""
+    mascara = np.ones(len(columnas['anio_fuente']), dtype=bool)
+    for faceta, dimension in FACETAS_BITMAP.items():
+        if faceta == excluir or not filters.get(faceta):
+            continue
+        codigos = [i for i, v in enumerate(diccionarios[dimension]) if str(v) in map(str, filters[faceta])]
+        mascara &= np.isin(columnas[dimension], codigos)
+    return mascara
+
+
+def test_resolver_sin_filtros_son_todas_las_filas(tmp_path):
+    indice, _, _ = _indice(tmp_path)
+    bits = indice.resolver({})
+    assert popcount(bits) == indice.filas
+    np.testing.assert_array_equal(indice.filas_de(bits), np.arange(indice.filas))
+
+
+@pytest.mark.parametrize('bytes_buffer, bitwise_count', [
+    (bitmap.BYTES_BUFFER, bitmap._BITWISE_COUNT),
+    # Buffer de un valor por tramo y conteo con la tabla de bytes (numpy < 2.0)
+    (1, None)
+])
+def test_resolver_y_conteos_igual_al_filtro_directo(tmp_path, monkeypatch, bytes_buffer, bitwise_count):
+    monkeypatch.setattr(bitmap, 'BYTES_BUFFER', bytes_buffer)
+    monkeypatch.setattr(bitmap, '_BITWISE_COUNT', bitwise_count)
+    indice, columnas, diccionarios = _indice(tmp_path)
+    filters = {'instituciones': ['IMSS', 'SEP'], 'anios': ['2023', 2024], 'estatus': ['ACTIVO']}
+
+    bits = indice.resolver(filters)
+    mascara = _mascara(columnas, diccionarios, filters)
+    assert popcount(bits) == mascara.sum()
+    np.testing.assert_array_equal(indice.filas_de(bits), np.flatnonzero(mascara))
+
+    conteos = indice.conteos_facetas(filters)
+    for faceta, dimension in FACETAS_BITMAP.items():
+        base = _mascara(columnas, diccionarios, filters, excluir=faceta)
+        esperado = {}
+        for codigo, valor in enumerate(diccionarios[dimension]):
+            n = int((base & (columnas[dimension] == codigo)).sum())
+            if n:
+                esperado[str(valor)] = n
+        assert conteos[faceta] == esperado
+
+
+def test_valor_desconocido_no_selecciona_filas(tmp_path):
+    indice, _, _ = _indice(tmp_path)
+    assert popcount(indice.resolver({'instituciones': ['NO EXISTE']})) == 0
@@ -0,0 +1,74 @@
+"""
+Pruebas de limpiar_bloques_sin_repetidos y codigos_cargados (admin_app.py): al
+reanudar una carga, los códigos de los bloques ya confirmados se reconstruyen del
+archivo crudo sin limpiarlo. Los bloques pendientes deben cargar exactamente las
+mismas filas que en una carga sin interrupción.
+"""
+import io
+
+import pandas as pd
+import pytest
+
+from admin_app import codigos_cargados, limpiar_bloque, limpiar_bloques_sin_repetidos
+
+CSV = """Código del contrato,Título del contrato,Importe DRC
+C-1,uno,10
+C-2,dos,20
+,sin código,30
+C-1,uno repetido,40
+  ,solo espacios,50
+ C-3 ,con espacios,60
+C-2,dos repetido,70
+1001,numérico,80
+C-3,sin espacios,90
+,otro sin código,100
+1001,numérico repetido,110
+C-4,cuatro,120
+ C-3 ,con espacios repetido,130
+C-5,cinco,140
+"""
+
+
+def _bloques(tamano):
+    return list(pd.read_csv(io.StringIO(CSV), chunksize=tamano))
+
+
+def _cargar(bloques, saltar=0):
+    """Lo que procesar_archivo cargaría de los bloques pendientes"""
+    cargados = [limpio for _, limpio, _, _ in limpiar_bloques_sin_repetidos(bloques, '2024', procesos=1, saltar=saltar)]
+    return pd.concat(cargados) if cargados else pd.DataFrame()
+
+
+def _sin_autos(df):
+    # Los códigos AUTO_ son únicos en cada limpieza: se comparan las demás columnas
+    return df.assign(codigo_contrato=df['codigo_contrato'].where(
+        ~df['codigo_contrato'].astype(str).str.startswith('AUTO_'), 'AUTO'
+    )).drop(columns='huella_contenido')
+
+
+@pytest.mark.parametrize('tamano', [1, 2, 3, 5])
+def test_reanudar_carga_las_mismas_filas(tamano):
+    bloques = _bloques(tamano)
+    completa = _cargar(bloques)
+    for saltar in range(1, len(bloques)):
+        reanudada = _cargar(_bloques(tamano), saltar=saltar)
+        pendientes = sum(len(b) for b in bloques[:saltar])
+        esperado = completa[completa.index >= pendientes]
+        pd.testing.assert_frame_equal(_sin_autos(reanudada), _sin_autos(esperado))
+
+
+def test_codigos_iguales_a_los_de_la_limpieza():
+    for bloque in _bloques(4):
+        limpio, _, _ = limpiar_bloque(bloque, '2024')
+        codigos = set(limpio['codigo_contrato'].astype(str))
+        assert codigos_cargados(bloque) == {c for c in codigos if not c.startswith('AUTO_')}
+
+
+def test_bloque_sin_columna_de_codigo():
+    assert codigos_cargados(pd.DataFrame({'Título del contrato': ['x']})) == set()
+    assert codigos_cargados(pd.DataFrame({'Código del contrato': []})) == set()
+
+
+def test_todos_los_bloques_saltados():
+    bloques = _bloques(4)
+    assert list(limpiar_bloques_sin_repetidos(bloques, '2024', procesos=1, saltar=len(bloques))) == []
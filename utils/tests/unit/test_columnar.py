@@ -0,0 +1,33 @@
+"""Pruebas de app/utils/columnar.py: un snapshot escrito se abre completo y uno incompleto falla"""
+import pytest
+
+from app.utils.columnar import SnapshotColumnar, escribir_snapshot
+
+
+def _version(tmp_path):
+    filas = [
+        ('a' * 32, 'AAA010101AA1', 'IMSS', 2023, 'SERVICIOS', 'ADJUDICACION DIRECTA', 'ACTIVO', 202303, 10.0,
+         'PROVEEDOR A', 'AAA010101AA1', 'INSTITUTO IMSS'),
+        ('b' * 32, 'BBB010101BB1', 'SEP', 2024, 'ADQUISICIONES', 'LICITACION PUBLICA', 'EXPIRADO', 202401, 5.0,
+         'PROVEEDOR B', 'BBB010101BB1', 'SECRETARIA SEP')
+    ]
+    escribir_snapshot([filas], tmp_path)
+    return tmp_path / (tmp_path / 'ACTUAL').read_text()
+
+
+def test_snapshot_completo(tmp_path):
+    snapshot = SnapshotColumnar(_version(tmp_path))
+    posiciones, faltantes = snapshot.filas(['b' * 32, 'c' * 32])
+    assert faltantes == 1
+    agregados = snapshot.agregar(posiciones)
+    assert agregados['monto_total'] == 5.0
+    assert agregados['contratos_por_mes'] == [{'mes': '2024-01', 'num_contratos': 1, 'monto_total': 5.0}]
+    assert snapshot.bitmaps is not None
+
+
+@pytest.mark.parametrize('archivo', ['huella_contenido.npy', 'mes.npy', 'bitmap_siglas_institucion.npy'])
+def test_snapshot_incompleto_pide_reconstruir(tmp_path, archivo):
+    ruta = _version(tmp_path)
+    (ruta / archivo).unlink()
+    with pytest.raises(FileNotFoundError, match=f'faltan {archivo}.*build_snapshot'):
+        SnapshotColumnar(ruta)
@@ -0,0 +1,176 @@
+"""
+Pruebas de la limpieza vectorizada de DataCleaner (admin_app.py): debe dar lo mismo
+que la limpieza celda por celda anterior, copiada aquí como referencia.
+"""
+import io
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from admin_app import DataCleaner
+
+
+class LimpiezaPorCelda:
+    """Limpieza celda por celda de DataCleaner antes de vectorizarla"""
+
+    def __init__(self):
+        self.stats = {'rfc_intercambiados': 0, 'rfc_vacios': 0, 'importes_cero': 0, 'fechas_invalidas': 0}
+
+    def intercambiados(self, rfc, proveedor):
+        if not rfc or not proveedor:
+            return rfc, proveedor
+        rfc_str = str(rfc).strip()
+        prov_str = str(proveedor).strip()
+        if len(rfc_str) > 20 and len(prov_str) <= 13:
+            self.stats['rfc_intercambiados'] += 1
+            return prov_str, rfc_str
+        return rfc_str, prov_str
+
+    def texto(self, texto):
+        if pd.isna(texto):
+            return None
+        texto = str(texto).strip()
+        texto = re.sub(r'\s+', ' ', texto)
+        texto = re.sub(r'\.{3,}', '...', texto)
+        return texto if texto else None
+
+    def rfc(self, rfc):
+        if pd.isna(rfc) or not rfc:
+            self.stats['rfc_vacios'] += 1
+            return None
+        rfc = re.sub(r'[^A-Z0-9]', '', str(rfc).strip().upper())
+        return rfc if rfc else None
+
+    def importe(self, importe_str):
+        if pd.isna(importe_str):
+            return None
+        try:
+            importe = str(importe_str).replace(',', '').replace(' ', '').strip()
+            valor = float(re.sub(r'[$€£¥]', '', importe))
+            if valor == 0:
+                self.stats['importes_cero'] += 1
+            return valor
+        except ValueError:
+            return None
+
+    def fecha(self, fecha):
+        if pd.isna(fecha):
+            return None
+        try:
+            fecha_str = str(fecha).strip()
+            for formato in ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S']:
+                try:
+                    return datetime.strptime(fecha_str, formato).date()
+                except ValueError:
+                    continue
+            return pd.to_datetime(fecha).date()
+        except Exception:
+            self.stats['fechas_invalidas'] += 1
+            return None
+
+
+TEXTOS = [
+    '  Servicio   de\tlimpieza ', 'Compra....', 'ok', '', '   ', None, np.nan, 5, 'Á  é  ñ', 'a...b......c'
+]
+RFCS = [
+    ' abc-010203-xy9 ', 'XAXX010101000', 'ab', '', None, np.nan, '---', 'rfc con espacios 12', 0,
+    'CONSTRUCTORA DEL NORTE SA DE CV'
+]
+IMPORTES = [
+    '$1,234.50', ' 1 000 ', 'abc', '1_000', '-5', '0', '0.00', '€ 12', 'nan', 'inf', None, np.nan, '', '1e3', 7
+]
+FECHAS = [
+    '01/09/2025', '2025-03-21', '21-03-2025', '2025/03/21', '2025-03-21 00:00:00', '31/02/2025',
+    'March 3, 2024', 'xx', '2025-3-1', '1/9/2025', '', None, np.nan, ' 2024-12-31 '
+]
+
+
+def _nulo(valor):
+    return valor is None or (not isinstance(valor, str) and pd.isna(valor))
+
+
+def _iguales(nuevos, referencia):
+    assert len(nuevos) == len(referencia)
+    for nuevo, ref in zip(nuevos, referencia):
+        if _nulo(ref):
+            assert _nulo(nuevo), (nuevo, ref)
+        else:
+            assert nuevo == ref and type(nuevo) is type(ref), (nuevo, ref)
+
+
+@pytest.mark.parametrize('valores', [TEXTOS, TEXTOS[::-1]])
+def test_limpiar_texto(valores):
+    serie = pd.Series(valores, dtype=object)
+    _iguales(list(DataCleaner().limpiar_texto(serie)), [LimpiezaPorCelda().texto(v) for v in valores])
+
+
+def test_limpiar_rfc():
+    cleaner, referencia = DataCleaner(), LimpiezaPorCelda()
+    serie = pd.Series(RFCS, dtype=object)
+    _iguales(list(cleaner.limpiar_rfc(serie)), [referencia.rfc(v) for v in RFCS])
+    assert cleaner.stats['rfc_vacios'] == referencia.stats['rfc_vacios']
+
+
+def test_limpiar_importe():
+    cleaner, referencia = DataCleaner(), LimpiezaPorCelda()
+    serie = pd.Series(IMPORTES, dtype=object)
+    _iguales(list(cleaner.limpiar_importe(serie)), [referencia.importe(v) for v in IMPORTES])
+    assert cleaner.stats['importes_cero'] == referencia.stats['importes_cero']
+
+
+def test_limpiar_fecha():
+    cleaner, referencia = DataCleaner(), LimpiezaPorCelda()
+    serie = pd.Series(FECHAS, dtype=object)
+    _iguales(list(cleaner.limpiar_fecha(serie)), [referencia.fecha(v) for v in FECHAS])
+    assert cleaner.stats['fechas_invalidas'] == referencia.stats['fechas_invalidas']
+
+
+def test_rfc_proveedor_intercambiados():
+    rfcs = ['CONSTRUCTORA DEL NORTE SA DE CV', ' ABC010203XY9 ', None, 'EMPRESA MUY LARGA SA DE CV', '']
+    proveedores = ['CNO010203AB1', ' Proveedor ', 'Sin RFC', 'NOMBRE LARGO DE VERDAD SA', 'X']
+    cleaner, referencia = DataCleaner(), LimpiezaPorCelda()
+    df = cleaner.detectar_rfc_proveedor_intercambiados(
+        pd.DataFrame({'rfc': rfcs, 'proveedor_contratista': proveedores})
+    )
+    esperado = [referencia.intercambiados(r, p) for r, p in zip(rfcs, proveedores)]
+    assert list(zip(df['rfc'], df['proveedor_contratista'])) == esperado
+    assert cleaner.stats['rfc_intercambiados'] == referencia.stats['rfc_intercambiados'] == 1
+
+
+def test_limpiar_dataframe_igual_a_la_limpieza_por_celda():
+    # Mismos tipos que entrega leer_csv_por_bloques (read_csv sin dtype)
+    n = 60
+    crudo = pd.DataFrame({
+        'Código del contrato': [f'C-{i % 45}' for i in range(n)],
+        'Título del contrato': [TEXTOS[i % len(TEXTOS)] for i in range(n)],
+        'Proveedor o contratista': [TEXTOS[(i + 3) % len(TEXTOS)] for i in range(n)],
+        'rfc': [RFCS[i % len(RFCS)] for i in range(n)],
+        'Importe DRC': [IMPORTES[i % len(IMPORTES)] for i in range(n)],
+        'Monto sin imp./mínimo': [IMPORTES[(i + 1) % len(IMPORTES)] for i in range(n)],
+        'Fecha de inicio del contrato': [FECHAS[i % len(FECHAS)] for i in range(n)],
+    })
+    crudo = pd.read_csv(io.StringIO(crudo.to_csv(index=False)))
+    limpio = DataCleaner().limpiar_dataframe(crudo.copy(), anio_archivo='2024')
+
+    referencia = LimpiezaPorCelda()
+    df = crudo.rename(columns=DataCleaner.COLUMN_MAPPING)
+    df[['rfc', 'proveedor_contratista']] = df.apply(
+        lambda fila: pd.Series(referencia.intercambiados(fila['rfc'], fila['proveedor_contratista'])), axis=1
+    )
+    for columna in ('titulo_contrato', 'proveedor_contratista'):
+        df[columna] = df[columna].apply(referencia.texto)
+    df['rfc'] = df['rfc'].apply(referencia.rfc)
+    df['importe'] = df['importe'].apply(referencia.importe)
+    df['importe_contrato'] = df['importe_contrato'].apply(
+        lambda x: str(x).replace(',', '').strip() if pd.notna(x) else None
+    )
+    df['fecha_inicio_contrato'] = df['fecha_inicio_contrato'].apply(referencia.fecha)
+    df['anio_fuente'] = '2024'
+    df = df.drop_duplicates(subset=['codigo_contrato'], keep='first')
+
+    assert list(limpio.index) == list(df.index)
+    for columna in df.columns:
+        _iguales(list(limpio[columna]), list(df[columna]))
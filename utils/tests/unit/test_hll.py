@@ -0,0 +1,52 @@
+"""Pruebas de app/utils/hll.py: precisión de la estimación y unión de sketches"""
+import numpy as np
+import pytest
+
+from app.utils.hll import HyperLogLog, hash_valores
+
+
+def _sketch(valores, p=11):
+    sketch = HyperLogLog(p=p)
+    sketch.agregar(valores)
+    return sketch
+
+
+@pytest.mark.parametrize('n', [50, 1_000, 20_000, 200_000])
+def test_estimacion_dentro_del_error(n):
+    sketch = _sketch([f'RFC{i:09d}' for i in range(n)])
+    # 4 errores estándar: la prueba no depende de la suerte del hash
+    assert abs(sketch.cardinalidad() - n) <= 4 * sketch.error_relativo * n + 1
+
+
+def test_repetidos_y_nulos_no_cuentan():
+    valores = [f'P{i}' for i in range(500)]
+    sketch = _sketch(valores * 5 + [None, np.nan])
+    assert sketch.cardinalidad() == _sketch(valores).cardinalidad()
+
+
+def test_union_igual_al_sketch_de_todos_los_valores():
+    a = [f'P{i}' for i in range(0, 30_000)]
+    b = [f'P{i}' for i in range(20_000, 50_000)]
+    unido = _sketch(a).unir(_sketch(b))
+    directo = _sketch(a + b)
+    np.testing.assert_array_equal(unido.registros, directo.registros)
+    assert abs(unido.cardinalidad() - 50_000) <= 4 * unido.error_relativo * 50_000
+
+
+def test_union_con_otra_precision_falla():
+    with pytest.raises(ValueError):
+        HyperLogLog(p=11).unir(HyperLogLog(p=12))
+
+
+def test_serializacion_ida_y_vuelta():
+    sketch = _sketch([f'X{i}' for i in range(3_000)], p=12)
+    copia = HyperLogLog.from_bytes(memoryview(sketch.to_bytes()))
+    assert copia.p == 12
+    np.testing.assert_array_equal(copia.registros, sketch.registros)
+    assert copia.cardinalidad() == sketch.cardinalidad()
+
+
+def test_hash_estable():
+    # Los sketches guardados en la BD se unen con los nuevos: el hash no puede cambiar
+    assert hash_valores(['ABC010203XYZ']).tolist() == [14977783417815555522]
+    assert hash_valores(['a', 'b']).dtype == np.dtype('<u8')
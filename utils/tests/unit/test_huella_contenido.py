@@ -0,0 +1,69 @@
+"""
+Pruebas de DataCleaner.huella_contenido (admin_app.py): la huella de una fila
+limpia es la misma que la de esa fila leída de vuelta de contratos.contratos
+(NUMERIC como Decimal, DATE como date, NULL como None), que es lo que calcula
+scripts/backfill_huellas.py.
+"""
+import io
+from decimal import Decimal
+
+import pandas as pd
+
+from admin_app import DataCleaner
+
+CSV = """Código del contrato,Título del contrato,Proveedor o contratista,rfc,Importe DRC,Monto sin imp./mínimo,Fecha de inicio del contrato,Fecha de fin del contrato,Moneda
+C-1,  Servicio   de limpieza ,PROVEEDOR UNO,abc-010203-xy9,"$1,234.567",1000,01/02/2024,2024-12-31,MXN
+C-2,Compra de equipo....,PROVEEDOR DOS,,0.1,,2024-03-21,,MXN
+C-3,Obra,PROVEEDOR TRES,XAXX010101000,-0.0,-,21-03-2024,2025/01/15,
+C-4,Obra,PROVEEDOR TRES,XAXX010101000,2500000.10,2500000.10,March 3 2024,xx,USD
+,Sin código,PROVEEDOR CUATRO,XAXX010101000,1e3,1000,01/02/2024,01/02/2024,MXN
+"""
+
+
+def _limpio(anio_archivo='2024'):
+    crudo = pd.read_csv(io.StringIO(CSV))
+    return DataCleaner().limpiar_dataframe(crudo, anio_archivo=anio_archivo)
+
+
+def _como_en_la_bd(limpio):
+    """Filas como las regresa psycopg2 después de cargarlas con COPY"""
+    filas = []
+    # Las columnas que el archivo no trae quedan en NULL
+    for _, fila in limpio.reindex(columns=DataCleaner.CAMPOS_HUELLA).iterrows():
+        valores = {}
+        for campo, valor in fila.items():
+            if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+                valores[campo] = None
+            elif campo == 'importe':
+                # COPY recibe el float como texto y NUMERIC lo guarda tal cual
+                valores[campo] = Decimal(str(valor))
+            else:
+                valores[campo] = valor
+        filas.append(valores)
+    return pd.DataFrame(filas, columns=DataCleaner.CAMPOS_HUELLA)
+
+
+def test_misma_huella_limpio_y_en_la_bd():
+    limpio = _limpio()
+    en_bd = DataCleaner.huella_contenido(_como_en_la_bd(limpio))
+    assert list(limpio['huella_contenido']) == list(en_bd)
+
+
+def test_huellas_distintas_por_contenido():
+    huellas = _limpio()['huella_contenido']
+    assert huellas.is_unique
+    assert all(len(h) == 36 for h in huellas)
+
+
+def test_codigo_generado_y_anio_no_cuentan():
+    # El código AUTO_ cambia en cada carga y el año es el del archivo: misma huella
+    primera = _limpio('2024')['huella_contenido']
+    segunda = _limpio('2025')['huella_contenido']
+    assert list(primera) == list(segunda)
+
+
+def test_importe_redondeado_a_centavos():
+    assert DataCleaner._centavos(1234.567) == DataCleaner._centavos(Decimal('1234.567')) == '1234.57'
+    assert DataCleaner._centavos(0.1 + 0.2) == DataCleaner._centavos(Decimal('0.3')) == '0.30'
+    assert DataCleaner._centavos(-0.0) == DataCleaner._centavos(Decimal('0')) == '0.00'
+    assert DataCleaner._centavos(float('nan')) == ''
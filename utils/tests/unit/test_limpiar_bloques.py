@@ -0,0 +1,64 @@
+"""
+Pruebas de limpiar_bloques (admin_app.py): con un pool de procesos entrega los
+bloques en el orden de lectura, así que el primer contrato de cada código sigue
+siendo el que se conserva (keep='first'), igual que limpiando todo el archivo.
+"""
+import pandas as pd
+
+from admin_app import limpiar_bloques
+
+
+def _bloques():
+    """Bloques con códigos repetidos entre ellos; el primero es el más lento de limpiar"""
+    tamanos = [4000, 50, 300, 50, 1200, 10]
+    bloques, inicio = [], 0
+    for numero, tamano in enumerate(tamanos):
+        filas = range(inicio, inicio + tamano)
+        bloques.append(pd.DataFrame({
+            'Código del contrato': [f'C{i % 700}' for i in filas],
+            'Título del contrato': [f'bloque {numero} fila {i}' for i in filas],
+            'Importe DRC': [str(i) for i in filas],
+            'Fecha de inicio del contrato': ['01/02/2024'] * tamano
+        }))
+        inicio += tamano
+    return bloques
+
+
+def _cargados(resultados):
+    """Mismo filtro de códigos entre bloques que procesar_archivo"""
+    vistos, partes = set(), []
+    for filas_leidas, limpio, _, _ in resultados:
+        codigos = limpio['codigo_contrato'].astype(str)
+        repetidos = codigos.isin(vistos).to_numpy()
+        partes.append(limpio[~repetidos])
+        vistos.update(codigos[~repetidos])
+    return pd.concat(partes)
+
+
+def test_pool_entrega_los_bloques_en_orden():
+    bloques = _bloques()
+    secuencial = list(limpiar_bloques(iter(bloques), '2024', procesos=1))
+    en_pool = list(limpiar_bloques(iter(bloques), '2024', procesos=3))
+
+    assert [r[0] for r in en_pool] == [len(b) for b in bloques]
+    for (_, esperado, _, _), (_, obtenido, _, _) in zip(secuencial, en_pool):
+        pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def test_se_conserva_el_primer_contrato_de_cada_codigo():
+    bloques = _bloques()
+    cargados = _cargados(limpiar_bloques(iter(bloques), '2024', procesos=3))
+
+    todo = pd.concat(bloques, ignore_index=True)
+    esperado = todo.drop_duplicates(subset=['Código del contrato'], keep='first')
+    assert list(cargados['codigo_contrato']) == list(esperado['Código del contrato'])
+    assert list(cargados['titulo_contrato']) == list(esperado['Título del contrato'])
+
+
+def test_estrategia_de_anio_del_primer_bloque():
+    # Sin año en el nombre: el primer bloque no trae columna de año, así que todos
+    # los bloques infieren el año de la fecha aunque uno traiga años válidos
+    bloques = _bloques()[:3]
+    bloques[2] = bloques[2].assign(origen='2019')
+    resultados = list(limpiar_bloques(iter(bloques), None, procesos=2))
+    assert all((limpio['anio_fuente'] == '2024').all() for _, limpio, _, _ in resultados)